@@ -0,0 +1,106 @@
+"""Shared fixtures for the benchmark suite.
+
+Tunables come from the environment so the same suite can model a fast LAN
+or a slow, flaky remote site:
+
+- ``BENCH_ROWS``: UPC rows in generated CSV files (default 10000)
+- ``BENCH_LOOKUPS``: UPCs looked up per network benchmark (default 50)
+- ``BENCH_LIST_ROWS``: lookup records behind the list view benchmark
+  (default 100000; set 5000000 for the production-sized case)
+- ``BENCH_LATENCY_MS``: stub server latency per request (default 0)
+- ``BENCH_ERROR_RATE``: fraction of UPCs answered with HTTP 500 (default 0)
+- ``BENCH_NOT_FOUND_RATE``: fraction of UPCs answered with 404 (default 0)
+"""
+
+import os
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+
+from csv_upc_omg import barcode_lookup
+from csv_upc_omg.config import LookupConfig
+
+from .stub_server import PAGE_PADDING, PRODUCT_PAGE, StubProductServer, StubTransport
+
+BENCH_ROWS = int(os.environ.get("BENCH_ROWS", "10000"))
+BENCH_LOOKUPS = int(os.environ.get("BENCH_LOOKUPS", "50"))
+BENCH_LIST_ROWS = int(os.environ.get("BENCH_LIST_ROWS", "100000"))
+
+
+def make_upcs(count: int, offset: int = 0) -> list[str]:
+    """Generate distinct 12-digit UPC strings."""
+    return [f"{offset + i:012d}" for i in range(count)]
+
+
+@pytest.fixture
+def csv_factory(tmp_path: Path) -> Callable[..., Path]:
+    """Write a CSV of generated UPCs and return its path."""
+
+    def factory(rows: int = BENCH_ROWS, name: str = "bench.csv") -> Path:
+        csv_path = tmp_path / name
+        with csv_path.open("w", encoding="utf-8") as file:
+            for upc in make_upcs(rows):
+                file.write(f"{upc},Some product description,1\n")
+        return csv_path
+
+    return factory
+
+
+@pytest.fixture
+def product_page() -> str:
+    """HTML for one fixture product page."""
+    return PRODUCT_PAGE.format(upc="012345678905", padding=PAGE_PADDING)
+
+
+@pytest.fixture(scope="session")
+def stub_server() -> Iterator[StubProductServer]:
+    """Run the stub product server for the whole session."""
+    server = StubProductServer(
+        latency=float(os.environ.get("BENCH_LATENCY_MS", "0")) / 1000,
+        error_rate=float(os.environ.get("BENCH_ERROR_RATE", "0")),
+        not_found_rate=float(os.environ.get("BENCH_NOT_FOUND_RATE", "0")),
+    )
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def route_to_stub(
+    stub_server: StubProductServer, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[StubProductServer]:
+    """Point every httpx.Client created by the lookup code at the stub."""
+    client_class = httpx.Client
+
+    def client_factory(*args: Any, **kwargs: Any) -> httpx.Client:
+        if kwargs.get("transport") is None:
+            kwargs["transport"] = StubTransport(stub_server.port)
+        return client_class(*args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", client_factory)
+    previous = barcode_lookup.set_default_config(LookupConfig())
+    # Measure the network path: later rounds would otherwise hit the cache.
+    barcode_lookup.configure_cache(maxsize=0)
+    monkeypatch.setenv("CSV_UPC_OMG_CACHE_SIZE", "0")
+    yield stub_server
+    barcode_lookup.configure_cache(maxsize=barcode_lookup.DEFAULT_CACHE_SIZE)
+    barcode_lookup.set_default_config(previous).close()
+
+
+@pytest.fixture(scope="session")
+def replay_archive(
+    stub_server: StubProductServer, tmp_path_factory: pytest.TempPathFactory
+) -> Path:
+    """Record BENCH_LOOKUPS stub responses once, for offline replay."""
+    from csv_upc_omg.replay import RecordingTransport, ResponseArchive
+
+    path = tmp_path_factory.mktemp("replay") / "responses.zip"
+    with ResponseArchive(path, "a") as archive:
+        recorder = RecordingTransport(archive, StubTransport(stub_server.port))
+        with httpx.Client(transport=recorder) as client:
+            for upc in make_upcs(BENCH_LOOKUPS):
+                client.get(f"https://www.barcodelookup.com/{upc}")
+    return path
@@ -0,0 +1,117 @@
+"""Local HTTP server that imitates barcodelookup.com product pages."""
+
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+# Filler markup so parsing cost resembles a real product page.
+PAGE_PADDING = "".join(
+    f'<li class="nav-item"><a href="/category/{i}">Category {i}</a></li>'
+    for i in range(400)
+)
+
+PRODUCT_PAGE = """<!DOCTYPE html>
+<html>
+<head><title>{upc} | Barcode Lookup</title></head>
+<body>
+<nav><ul>{padding}</ul></nav>
+<div class="product-details">
+<h4>Benchmark Product {upc}</h4>
+<div class="product-text-label">Barcode Formats: UPC-A {upc}</div>
+</div>
+<footer><ul>{padding}</ul></footer>
+</body>
+</html>
+"""
+
+
+class StubProductServer:
+    """Serve fixture product pages with configurable latency and failures.
+
+    Whether a UPC fails or is missing is decided by a PRNG seeded with the
+    UPC, so repeated runs see the same responses.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        not_found_rate: float = 0.0,
+    ) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.not_found_rate = not_found_rate
+        self.requests = 0
+        self.connections = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep connections alive between requests, as the real site does.
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                stub.connections += 1
+
+            def do_GET(self) -> None:  # noqa: N802
+                stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                upc = self.path.strip("/")
+                roll = random.Random(upc).random()
+                if roll < stub.error_rate:
+                    self._send_empty(500)
+                    return
+                if roll < stub.error_rate + stub.not_found_rate:
+                    self._send_empty(404)
+                    return
+
+                body = PRODUCT_PAGE.format(upc=upc, padding=PAGE_PADDING).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_empty(self, status: int) -> None:
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        return Handler
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class StubTransport(httpx.HTTPTransport):
+    """Transport that sends every request to the stub server instead."""
+
+    def __init__(self, port: int, **kwargs: object) -> None:
+        super().__init__(**kwargs)  # type: ignore[arg-type]
+        self.port = port
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(
+            scheme="http", host="127.0.0.1", port=self.port
+        )
+        return super().handle_request(request)
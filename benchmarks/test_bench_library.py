@@ -0,0 +1,129 @@
+"""Benchmarks for the core library and CLI."""
+
+from collections.abc import Callable
+from pathlib import Path
+
+from click.testing import CliRunner
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from csv_upc_omg import barcode_lookup
+from csv_upc_omg.barcode_lookup import fetch_product_title_sync, parse_product_title
+from csv_upc_omg.config import LookupConfig
+from csv_upc_omg.csv_utils import extract_upcs_from_csv, extract_upcs_from_csvs
+from csv_upc_omg.main import cli
+
+from .conftest import BENCH_LOOKUPS, BENCH_ROWS, make_upcs
+from .stub_server import StubProductServer
+
+
+def test_extract_upcs_from_csv(
+    benchmark: BenchmarkFixture, csv_factory: Callable[..., Path]
+) -> None:
+    """Parse a single large CSV."""
+    csv_path = csv_factory()
+    upcs = benchmark(extract_upcs_from_csv, csv_path)
+    assert len(upcs) == BENCH_ROWS
+
+
+def test_extract_upcs_from_many_csvs(
+    benchmark: BenchmarkFixture, csv_factory: Callable[..., Path]
+) -> None:
+    """Parse a directory's worth of CSVs across worker processes."""
+    paths = [csv_factory(BENCH_ROWS // 10, f"store{i}.csv") for i in range(20)]
+    results = benchmark(extract_upcs_from_csvs, paths)
+    assert len(results) == len(paths)
+
+
+def test_parse_product_title(benchmark: BenchmarkFixture, product_page: str) -> None:
+    """Parse the title out of one product page."""
+    title = benchmark(parse_product_title, product_page)
+    assert title == "Benchmark Product 012345678905"
+
+
+def test_fetch_product_title_sync(
+    benchmark: BenchmarkFixture, route_to_stub: StubProductServer
+) -> None:
+    """Fetch and parse titles one request at a time."""
+    upcs = make_upcs(BENCH_LOOKUPS)
+
+    def fetch_all() -> None:
+        for upc in upcs:
+            try:
+                fetch_product_title_sync(upc)
+            except Exception:
+                pass
+
+    benchmark(fetch_all)
+
+
+def test_fetch_reuses_connections(
+    benchmark: BenchmarkFixture, route_to_stub: StubProductServer
+) -> None:
+    """Fetch titles over one kept-alive connection, stopping after each title."""
+    upcs = make_upcs(BENCH_LOOKUPS)
+
+    def fetch_all() -> None:
+        for upc in upcs:
+            fetch_product_title_sync(upc)
+
+    opened = route_to_stub.connections
+    benchmark.pedantic(fetch_all, rounds=1, iterations=1)
+    # The rest of each stub page is small enough to drain after the title,
+    # so the pooled connection is reused instead of reopened per lookup.
+    assert route_to_stub.connections - opened == 1
+
+
+def test_fetch_product_title_replayed(
+    benchmark: BenchmarkFixture, replay_archive: Path
+) -> None:
+    """Fetch and parse titles from a recorded archive, fully offline."""
+    from csv_upc_omg.replay import open_archive
+
+    upcs = make_upcs(BENCH_LOOKUPS)
+    barcode_lookup.configure_cache(maxsize=0)
+    archive, transport = open_archive(replay_archive)
+    config = LookupConfig(transport=transport)
+    try:
+
+        def fetch_all() -> None:
+            for upc in upcs:
+                try:
+                    fetch_product_title_sync(upc, config=config)
+                except Exception:
+                    pass
+
+        benchmark(fetch_all)
+    finally:
+        barcode_lookup.configure_cache(maxsize=barcode_lookup.DEFAULT_CACHE_SIZE)
+        config.close()
+        archive.close()
+
+
+def test_fetch_product_title_cached(
+    benchmark: BenchmarkFixture, route_to_stub: StubProductServer
+) -> None:
+    """Serve repeat lookups from the in-process result cache."""
+    upcs = make_upcs(BENCH_LOOKUPS)
+    barcode_lookup.configure_cache(maxsize=barcode_lookup.DEFAULT_CACHE_SIZE)
+    for upc in upcs:
+        fetch_product_title_sync(upc)
+
+    def fetch_all() -> None:
+        for upc in upcs:
+            fetch_product_title_sync(upc)
+
+    benchmark(fetch_all)
+    assert barcode_lookup.cache_stats().hits >= BENCH_LOOKUPS
+
+
+def test_titles_command(
+    benchmark: BenchmarkFixture,
+    csv_factory: Callable[..., Path],
+    route_to_stub: StubProductServer,
+) -> None:
+    """Run the titles command end to end on one CSV."""
+    csv_path = csv_factory(BENCH_LOOKUPS)
+    runner = CliRunner()
+
+    result = benchmark(runner.invoke, cli, ["titles", str(csv_path.parent)])
+    assert result.exit_code == 0
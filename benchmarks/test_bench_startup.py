@@ -0,0 +1,57 @@
+"""Startup-time benchmarks for the CLI.
+
+The CLI is run thousands of times a day from scanner scripts, so import cost
+is measured with ``python -X importtime`` and held to a budget
+(``BENCH_IMPORT_BUDGET_MS``, default 75ms).
+"""
+
+import os
+import subprocess
+import sys
+from collections.abc import Callable
+from pathlib import Path
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+IMPORT_BUDGET_MS = float(os.environ.get("BENCH_IMPORT_BUDGET_MS", "75"))
+HEAVY_MODULES = ("httpx", "bs4", "multiprocessing")
+
+
+def import_time_us(module: str) -> dict[str, int]:
+    """Return cumulative import time in microseconds per imported module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative_us)
+    return times
+
+
+def test_cli_import_time(benchmark: BenchmarkFixture) -> None:
+    """Import csv_upc_omg.main within budget and without the HTTP stack."""
+    times = benchmark.pedantic(
+        import_time_us, args=("csv_upc_omg.main",), rounds=5, iterations=1
+    )
+    main_ms = times["csv_upc_omg.main"] / 1000
+    benchmark.extra_info["csv_upc_omg.main_ms"] = main_ms
+
+    assert not [name for name in times if name.split(".")[0] in HEAVY_MODULES]
+    assert main_ms < IMPORT_BUDGET_MS
+
+
+def test_upcs_command_startup(
+    benchmark: BenchmarkFixture, csv_factory: Callable[..., Path]
+) -> None:
+    """Run ``upcs`` as a fresh process on a small CSV."""
+    csv_path = csv_factory(10)
+    command = [sys.executable, "-m", "csv_upc_omg.main", "upcs", str(csv_path.parent)]
+
+    result = benchmark(subprocess.run, command, capture_output=True, check=True)
+    assert result.stdout.count(b"\n") == 10
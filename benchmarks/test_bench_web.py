@@ -0,0 +1,205 @@
+"""Benchmarks for the Django service layer."""
+
+import os
+import sys
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from .conftest import BENCH_LIST_ROWS, BENCH_LOOKUPS, BENCH_ROWS, make_upcs
+from .stub_server import StubProductServer
+
+pytest.importorskip("django")
+
+WEB_DIR = Path(__file__).resolve().parent.parent / "web"
+
+
+@pytest.fixture(scope="module")
+def django_db() -> Iterator[Any]:
+    """Configure Django against a throwaway test database."""
+    sys.path.insert(0, str(WEB_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+
+    import django
+    from django.conf import settings
+    from django.test.utils import (
+        setup_databases,
+        setup_test_environment,
+        teardown_databases,
+        teardown_test_environment,
+    )
+
+    django.setup()
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+
+    from django.contrib.auth.models import User
+
+    with tempfile.TemporaryDirectory() as media_root:
+        settings.MEDIA_ROOT = media_root
+        yield User.objects.create_user(username="bench", password="bench")
+
+    teardown_databases(old_config, verbosity=0)
+    teardown_test_environment()
+
+
+def _csv_upload(user: Any, rows: int) -> Any:
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from inventory.models import CSVUpload
+
+    content = "".join(f"{upc}\n" for upc in make_upcs(rows)).encode()
+    return CSVUpload.objects.create(
+        user=user,
+        filename="bench.csv",
+        file=SimpleUploadedFile("bench.csv", content, content_type="text/csv"),
+    )
+
+
+def _upload_with_records(user: Any, rows: int, status: str) -> Any:
+    from inventory.models import LookupRecord
+
+    upload = _csv_upload(user, 0)
+    LookupRecord.objects.bulk_create(
+        LookupRecord(
+            csv_upload=upload,
+            upc=upc,
+            status=status,
+            product_title="Benchmark Product" if status == "success" else None,
+        )
+        for upc in make_upcs(rows)
+    )
+    return upload
+
+
+def test_process_upload(benchmark: BenchmarkFixture, django_db: Any) -> None:
+    """Parse an uploaded CSV into pending LookupRecords."""
+    from inventory.services import UploadService
+
+    def setup() -> tuple[tuple[Any], dict[str, Any]]:
+        return (_csv_upload(django_db, BENCH_ROWS),), {}
+
+    count = benchmark.pedantic(
+        UploadService.process_upload, setup=setup, rounds=5, iterations=1
+    )
+    assert count == BENCH_ROWS
+
+
+@pytest.mark.parametrize("strategy", ["bulk_create", "copy"])
+def test_ingest_upcs(
+    benchmark: BenchmarkFixture, django_db: Any, strategy: str
+) -> None:
+    """Load parsed UPCs into LookupRecords with each ingestion strategy.
+
+    The COPY path needs PostgreSQL: point DATABASE_URL at a Postgres server.
+    """
+    from django.db import connection
+    from inventory.services import UploadService
+
+    if strategy == "copy" and connection.vendor != "postgresql":
+        pytest.skip("COPY ingestion requires PostgreSQL")
+    ingest = getattr(UploadService, f"ingest_with_{strategy}")
+    upcs = make_upcs(BENCH_ROWS)
+
+    def setup() -> tuple[tuple[Any, list[str]], dict[str, Any]]:
+        return (_csv_upload(django_db, 0), upcs), {}
+
+    count = benchmark.pedantic(ingest, setup=setup, rounds=5, iterations=1)
+    assert count == BENCH_ROWS
+
+
+def test_batch_lookup(
+    benchmark: BenchmarkFixture, django_db: Any, route_to_stub: StubProductServer
+) -> None:
+    """Look up every pending record of an upload against the stub server."""
+    from inventory.services import UploadService
+
+    def setup() -> tuple[tuple[Any], dict[str, Any]]:
+        return (_upload_with_records(django_db, BENCH_LOOKUPS, "pending"),), {}
+
+    results = benchmark.pedantic(
+        UploadService.batch_lookup, setup=setup, rounds=3, iterations=1
+    )
+    assert sum(results.values()) == BENCH_LOOKUPS
+
+
+def test_export_to_csv(benchmark: BenchmarkFixture, django_db: Any) -> None:
+    """Export a completed upload's records to CSV."""
+    from inventory.services import UploadService
+
+    upload = _upload_with_records(django_db, BENCH_ROWS, "success")
+    output = benchmark(UploadService.export_to_csv, upload)
+    assert output.getvalue().count(b"\n") == BENCH_ROWS + 1
+
+
+# Uploads the list benchmark's records are spread over; the list view pages
+# across all of them.
+LIST_UPLOADS = 10
+
+
+@pytest.fixture(scope="module")
+def list_user(django_db: Any) -> Any:
+    """A user owning BENCH_LIST_ROWS lookup records over several uploads."""
+    from django.contrib.auth.models import User
+    from inventory.models import CSVUpload, LookupRecord
+
+    user = User.objects.create_user(username="bench-list", password="bench")
+    uploads = [
+        CSVUpload.objects.create(user=user, filename=f"list-{n}.csv")
+        for n in range(LIST_UPLOADS)
+    ]
+    batch = 50_000
+    for start in range(0, BENCH_LIST_ROWS, batch):
+        LookupRecord.objects.bulk_create(
+            LookupRecord(
+                csv_upload=uploads[i % LIST_UPLOADS],
+                upc=f"{i:012d}",
+                status="success",
+                product_title="Benchmark Product",
+            )
+            for i in range(start, min(start + batch, BENCH_LIST_ROWS))
+        )
+    return user
+
+
+@pytest.mark.parametrize("page", ["first", "keyset", "offset"])
+def test_lookup_list_page(
+    benchmark: BenchmarkFixture, list_user: Any, page: str
+) -> None:
+    """Render a page of a user's lookups, which span several uploads.
+
+    ``first`` is the list as opened; ``keyset`` follows a cursor near the
+    end the way the list view's "Older" link does; ``offset`` is the
+    page-number path near the end, used when sorting by a column.
+    """
+    from django.core.cache import cache
+    from django.test import RequestFactory
+    from inventory.models import LookupRecord
+    from inventory.pagination import encode_cursor
+    from inventory.views import LookupListView
+
+    per_page = 25
+    params = {}
+    if page == "keyset":
+        anchor = (
+            LookupRecord.objects.filter(user=list_user)
+            .order_by("created_at", "pk")
+            .only("created_at")[per_page]
+        )
+        params = {"cursor": encode_cursor(anchor)}
+    elif page == "offset":
+        params = {"sort": "-created_at", "page": str(BENCH_LIST_ROWS // per_page)}
+
+    view = LookupListView.as_view()
+    request = RequestFactory().get("/lookups/", params)
+    request.user = list_user
+
+    def render() -> Any:
+        cache.clear()
+        return view(request).render()
+
+    response = benchmark(render)
+    assert response.status_code == 200
@@ -0,0 +1,95 @@
+"""Adaptive limit on concurrent lookups, tuned to how the site is coping."""
+
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from . import metrics
+
+
+@dataclass
+class Slot:
+    """One admitted request. Set ``overloaded`` if the site pushed back."""
+
+    overloaded: bool = False
+
+
+class AdaptiveLimiter:
+    """Additive-increase, multiplicative-decrease (AIMD) concurrency limit.
+
+    Every request answered within ``latency_target`` seconds raises the limit
+    by ``1 / limit``, so it grows by about one per round of requests. A
+    request the site pushed back on (429, 5xx, timeout) or that was slower
+    than the target cuts the limit by ``backoff``. Only requests started
+    after the previous cut can cut it again, so one bad moment is not
+    punished once per request that was in flight during it.
+
+    Callers beyond the current limit wait in :meth:`slot` until a request
+    finishes. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        maximum: int,
+        minimum: int = 1,
+        initial: int | None = None,
+        latency_target: float = 2.0,
+        backoff: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not 1 <= minimum <= maximum:
+            raise ValueError("Need 1 <= minimum <= maximum")
+        self.maximum = maximum
+        self.minimum = minimum
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self._clock = clock
+        self._limit = float(min(max(initial or minimum, minimum), maximum))
+        self._in_flight = 0
+        self._last_cut = float("-inf")
+        self._changed = threading.Condition()
+        metrics.record_concurrency_limit(self.limit)
+
+    @property
+    def limit(self) -> int:
+        """Requests currently allowed in flight at once."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @contextmanager
+    def slot(self) -> Iterator[Slot]:
+        """Wait for room under the limit, then hold a slot for one request.
+
+        An exception escaping the block leaves the limit alone unless
+        ``Slot.overloaded`` was set.
+        """
+        with self._changed:
+            while self._in_flight >= self.limit:
+                self._changed.wait()
+            self._in_flight += 1
+        slot = Slot()
+        started = self._clock()
+        try:
+            yield slot
+        except BaseException:
+            self._finish(started, slot.overloaded, succeeded=False)
+            raise
+        self._finish(started, slot.overloaded, succeeded=True)
+
+    def _finish(self, started: float, overloaded: bool, succeeded: bool) -> None:
+        now = self._clock()
+        with self._changed:
+            self._in_flight -= 1
+            if overloaded or now - started > self.latency_target:
+                if started >= self._last_cut:
+                    self._limit = max(self._limit * self.backoff, self.minimum)
+                    self._last_cut = now
+            elif succeeded:
+                self._limit = min(self._limit + 1 / self._limit, self.maximum)
+            self._changed.notify_all()
+        metrics.record_concurrency_limit(self.limit)
@@ -1,19 +1,176 @@
-"""Utilities for fetching product information from barcode lookup services."""
+"""Utilities for fetching product information from barcode lookup services.
 
-import httpx
-from bs4 import BeautifulSoup
+httpx and bs4 dominate the CLI's import time, so they are imported on first
+use rather than at module load; ``upcs`` and other commands that never hit
+the network don't pay for them.
+"""
+
+import codecs
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Any
+
+from . import metrics
+from .config import LookupConfig
+from .lru import CacheStats, TTLCache
+from .singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    import httpx
+
+DEFAULT_CACHE_SIZE = 10_000
+DEFAULT_CACHE_TTL = 3600.0
+
+
+def __getattr__(name: str) -> Any:
+    # Keep ``barcode_lookup.httpx`` reachable for callers and tests that
+    # patch the client, without importing it eagerly.
+    if name == "httpx":
+        import httpx
+
+        return httpx
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class BarcodeAPIError(Exception):
-    """Exception raised when barcode lookup fails."""
+    """Exception raised when barcode lookup fails.
+
+    ``overloaded`` is set when the site pushed back (429, 5xx or a timeout)
+    rather than the lookup failing on its own.
+    """
+
+    def __init__(self, message: str, *, overloaded: bool = False) -> None:
+        super().__init__(message)
+        self.overloaded = overloaded
+
+
+@dataclass(frozen=True)
+class Validators:
+    """HTTP cache validators for a product page, as sent by the site."""
+
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def __bool__(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+    def request_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass(frozen=True)
+class ProductPage:
+    """Result of fetching one product page.
+
+    ``not_modified`` means the site answered 304 to a conditional request:
+    the previously fetched title still stands and ``title`` is None.
+    """
+
+    title: str | None
+    validators: Validators
+    not_modified: bool = False
+
+
+def parse_product_title(html: str) -> str | None:
+    """Extract the product title from a barcodelookup.com product page.
+
+    Args:
+        html: The product page HTML
+
+    Returns:
+        Product title if the page has one, None otherwise
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    title_element = soup.select_one(".product-details h4")
+    if title_element is None:
+        return None
+    title_text: str = title_element.text
+    return title_text.strip()
+
+
+# Recent results and lookups currently running in this process, by UPC.
+_cache: TTLCache[str | None] = TTLCache(DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL)
+_flights: SingleFlight[str | None] = SingleFlight()
+
+
+def configure_cache(maxsize: int | None = None, ttl: float | None = None) -> None:
+    """Resize the in-process result cache or change its TTL (seconds).
+
+    A ``maxsize`` of 0 turns the cache off.
+    """
+    _cache.configure(maxsize, ttl)
+
+
+def cache_stats() -> CacheStats:
+    """Hits, misses and size of the in-process result cache."""
+    return _cache.stats()
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
+# Used by lookups that are not given a config of their own.
+_default_config = LookupConfig()
+
+
+def default_config() -> LookupConfig:
+    return _default_config
+
+
+def set_default_config(config: LookupConfig) -> LookupConfig:
+    """Use ``config`` for lookups called without one.
+
+    Returns:
+        The previous default, which the caller may want to close or restore
+    """
+    global _default_config
+    previous, _default_config = _default_config, config
+    return previous
+
+
+def cached_title(upc: str) -> tuple[bool, str | None]:
+    """Look ``upc`` up in the result cache only.
+
+    Returns:
+        Whether a live result was cached, and that result
+    """
+    if _cache.maxsize <= 0:
+        return False, None
+    hit, title = _cache.get(upc)
+    metrics.record_cache(hit)
+    return hit, title
 
 
-def fetch_product_title_sync(upc: str, timeout: float = 10.0) -> str | None:
+def fetch_product_title_sync(
+    upc: str,
+    timeout: float = 10.0,
+    *,
+    use_cache: bool = True,
+    config: LookupConfig | None = None,
+) -> str | None:
     """Fetch product title from barcodelookup.com.
 
+    Titles (and not-found results) are kept in a bounded in-process cache
+    for a while; see :func:`configure_cache`. Errors are never cached.
+    Concurrent calls for the same UPC within a process share one request;
+    every caller gets its result (or its error).
+
     Args:
         upc: The UPC code to lookup
         timeout: Request timeout in seconds
+        use_cache: Check the cache before fetching (pass False if the caller
+            already has); the fetched result is cached either way
+        config: Client and headers to use (default: :func:`default_config`)
 
     Returns:
         Product title if found, None if not found
@@ -21,45 +178,217 @@ def fetch_product_title_sync(upc: str, timeout: float = 10.0) -> str | None:
     Raises:
         BarcodeAPIError: If there's an error fetching or parsing the page
     """
+    if use_cache:
+        hit, cached = cached_title(upc)
+        if hit:
+            return cached
+
+    title, shared = _flights.do(
+        upc, lambda: _fetch_and_cache(upc, timeout, config or _default_config)
+    )
+    if shared:
+        metrics.record_coalesced()
+    return title
+
+
+def fetch_product_page(
+    upc: str,
+    timeout: float = 10.0,
+    validators: Validators | None = None,
+    *,
+    config: LookupConfig | None = None,
+) -> ProductPage:
+    """Fetch a product page, conditionally when ``validators`` are given.
+
+    Used to revalidate titles fetched earlier: a 304 answer skips the
+    download and parse, and is counted as a cache hit. Unlike
+    :func:`fetch_product_title_sync` this always goes to the site, then
+    refreshes the in-process cache with any new title.
+
+    Args:
+        upc: The UPC code to lookup
+        timeout: Request timeout in seconds
+        validators: ETag / Last-Modified from the previous fetch
+        config: Client and headers to use (default: :func:`default_config`)
+
+    Returns:
+        The title and the validators to send next time
+
+    Raises:
+        BarcodeAPIError: If there's an error fetching or parsing the page
+    """
+    validators = validators or Validators()
+    page = _fetch_page(upc, timeout, validators, config or _default_config)
+    if page.not_modified:
+        metrics.record_cache(hit=True)
+        if not page.validators:
+            # A 304 need not repeat the validators; keep the ones we sent.
+            page = replace(page, validators=validators)
+    else:
+        _cache.set(upc, page.title)
+    return page
+
+
+def _fetch_and_cache(upc: str, timeout: float, config: LookupConfig) -> str | None:
+    title = _fetch_page(upc, timeout, Validators(), config).title
+    _cache.set(upc, title)
+    return title
+
+
+def _fetch_page(
+    upc: str, timeout: float, validators: Validators, config: LookupConfig
+) -> ProductPage:
+    if config.limiter is None:
+        return _fetch_page_now(upc, timeout, validators, config)
+    with config.limiter.slot() as slot:
+        try:
+            return _fetch_page_now(upc, timeout, validators, config)
+        except BarcodeAPIError as e:
+            slot.overloaded = e.overloaded
+            raise
+
+
+def _fetch_page_now(
+    upc: str, timeout: float, validators: Validators, config: LookupConfig
+) -> ProductPage:
     url = f"https://www.barcodelookup.com/{upc}"
+    headers = config.headers()
+    if validators:
+        headers = {**headers, **validators.request_headers()}
+
+    if not metrics.is_enabled():
+        return _fetch(upc, url, headers, timeout, config)
+
+    with metrics.in_flight():
+        try:
+            page = _fetch(upc, url, headers, timeout, config, metrics.StageTracer())
+        except BarcodeAPIError:
+            metrics.record_lookup("failed")
+            raise
+    if not page.not_modified:
+        metrics.record_lookup("success" if page.title else "not_found")
+    return page
+
+
+# Start of the element holding the title: a class attribute naming
+# product-details, not just the bare word (e.g. in a stylesheet URL).
+_DETAILS = re.compile(r"""class\s*=\s*["']?[^"'>]*(?<![\w-])product-details(?![\w-])""")
+# Text carried over between chunks when searching for markers that may
+# straddle them; longer than any plausible class attribute.
+_OVERLAP = 256
+# Most of a page left unread after its title that is still downloaded, so
+# the connection can go back to the pool.
+_DRAIN_LIMIT = 64 * 1024
+
+
+def _parse_title(html: str) -> str | None:
+    with metrics.timed_stage("parse"):
+        return parse_product_title(html)
+
+
+def _read_title(response: "httpx.Response", limit: int) -> tuple[str | None, bool]:
+    """Read a page only as far as its title, then parse it.
+
+    Once ``.product-details`` is followed by a closing ``</h4>``, the text
+    read so far is parsed. If that finds the title, the rest of the page is
+    only downloaded when it is small (see :func:`_drain`); otherwise reading
+    goes on, parsing again at each later ``</h4>``, until the page ends or
+    ``limit`` bytes have been read.
+
+    Returns:
+        The title (None if the page has none), and whether the byte limit
+        cut the page short
+    """
+    decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(
+        errors="replace"
+    )
+    text = ""
+    size = 0
+    details = -1
+    checked = 0
+    chunks = response.iter_bytes()
+    for chunk in chunks:
+        size += len(chunk)
+        start = max(len(text) - _OVERLAP, 0)
+        text += decoder.decode(chunk)
+        if details < 0:
+            match = _DETAILS.search(text, start)
+            details = match.end() if match else -1
+        if details >= 0 and text.find("</h4>", max(details, checked, start)) >= 0:
+            title = _parse_title(text)
+            if title is not None:
+                _drain(response, chunks)
+                return title, False
+            # A false start; only a later </h4> is worth parsing again for.
+            checked = max(len(text) - len("</h4>") + 1, 0)
+        if size >= limit:
+            return _parse_title(text), True
+    return _parse_title(text + decoder.decode(b"", final=True)), False
+
+
+def _drain(response: "httpx.Response", chunks: Iterator[bytes]) -> None:
+    """Read the rest of a page if its Content-Length shows little is left.
+
+    httpx closes a connection whose response body was not read to the end
+    rather than returning it to the pool, and the next lookup then pays for
+    a new TCP and TLS handshake. That costs more than a few more kilobytes,
+    but less than a large remainder, or one of unknown size, which is left
+    unread.
+    """
+    length = response.headers.get("content-length", "")
+    if not length.isdigit():
+        return
+    if int(length) - response.num_bytes_downloaded <= _DRAIN_LIMIT:
+        for _ in chunks:
+            pass
+
+
+def _fetch(
+    upc: str,
+    url: str,
+    headers: dict[str, str],
+    timeout: float,
+    config: LookupConfig,
+    tracer: metrics.StageTracer | None = None,
+) -> ProductPage:
+    import httpx
 
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:138.0) "
-            "Gecko/20100101 Firefox/138.0"
-        ),
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-        "Alt-Used": "www.barcodelookup.com",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-        "Sec-Fetch-Dest": "document",
-        "Sec-Fetch-Mode": "navigate",
-        "Sec-Fetch-Site": "none",
-        "Sec-Fetch-User": "?1",
-        "DNT": "1",
-        "Sec-GPC": "1",
-        "Priority": "u=0, i",
-    }
+    request_options: dict[str, Any] = {"headers": headers, "timeout": timeout}
+    if tracer is not None:
+        request_options["extensions"] = {"trace": tracer}
 
     try:
-        with httpx.Client(timeout=timeout) as client:
-            response = client.get(url, headers=headers)
+        client = config.client()
+        with client.stream("GET", url, **request_options) as response:
+            validators = Validators(
+                response.headers.get("etag"), response.headers.get("last-modified")
+            )
+            if response.status_code == 304:
+                return ProductPage(None, validators, not_modified=True)
             response.raise_for_status()
+            title, truncated = _read_title(response, config.max_response_bytes)
+            metrics.record_response_bytes(response.num_bytes_downloaded)
 
-            soup = BeautifulSoup(response.text, "html.parser")
+        if title is None and truncated:
+            raise BarcodeAPIError(
+                f"Response for UPC {upc} exceeded {config.max_response_bytes} bytes"
+            )
+        return ProductPage(title, validators)
 
-            title_element = soup.select_one(".product-details h4")
-            if title_element is None:
-                return None
-            title_text: str = title_element.text
-            return title_text.strip()
+    except BarcodeAPIError:
+        raise
 
     except httpx.TimeoutException:
-        raise BarcodeAPIError(f"Timeout while fetching product for UPC {upc}")
+        raise BarcodeAPIError(
+            f"Timeout while fetching product for UPC {upc}", overloaded=True
+        )
     except httpx.HTTPStatusError as e:
-        if e.response.status_code == 404:
-            return None
-        raise BarcodeAPIError(f"HTTP error {e.response.status_code} for UPC {upc}")
+        status = e.response.status_code
+        if status == 404:
+            return ProductPage(None, Validators())
+        raise BarcodeAPIError(
+            f"HTTP error {status} for UPC {upc}",
+            overloaded=status == 429 or status >= 500,
+        )
     except Exception as e:
         raise BarcodeAPIError(f"Error fetching product for UPC {upc}: {e}")
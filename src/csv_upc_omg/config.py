@@ -0,0 +1,131 @@
+"""Settings for reaching barcodelookup.com, built once per run or process.
+
+A :class:`LookupConfig` owns the HTTP client and the request headers, so
+both are built the first time they are needed and then shared by every
+lookup instead of being rebuilt per request. httpx is only imported when
+the client is first built.
+"""
+
+import importlib.util
+import itertools
+import threading
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import httpx
+
+    from .adaptive import AdaptiveLimiter
+
+DEFAULT_MAX_RESPONSE_BYTES = 2 * 1024 * 1024
+DEFAULT_MAX_CONNECTIONS = 10
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:138.0) "
+    "Gecko/20100101 Firefox/138.0"
+)
+
+# Sent with every request, after the User-Agent.
+BASE_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Alt-Used": "www.barcodelookup.com",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+    "DNT": "1",
+    "Sec-GPC": "1",
+    "Priority": "u=0, i",
+}
+
+
+@dataclass(frozen=True)
+class LookupConfig:
+    """How lookups talk to barcodelookup.com.
+
+    Build one from CLI options or Django settings and pass it to every
+    lookup. The client is created on first use and reused, keeping its
+    connection pool warm; call :meth:`close` when finished with it.
+
+    Attributes:
+        user_agents: User-Agent strings, used in turn one request at a time
+        proxy: Proxy URL for every request, or None to connect directly
+        max_connections: Most connections the client opens at once
+        max_keepalive_connections: Idle connections kept open for reuse
+        http2: Negotiate HTTP/2 (needs the ``http2`` extra installed)
+        max_response_bytes: Stop reading a product page after this many bytes
+        transport: Custom httpx transport, e.g. to record or replay lookups
+        limiter: Adapts how many lookups sharing this config run at once
+    """
+
+    user_agents: tuple[str, ...] = (DEFAULT_USER_AGENT,)
+    proxy: str | None = None
+    max_connections: int = DEFAULT_MAX_CONNECTIONS
+    max_keepalive_connections: int = DEFAULT_MAX_CONNECTIONS
+    http2: bool = False
+    max_response_bytes: int = DEFAULT_MAX_RESPONSE_BYTES
+    transport: "httpx.BaseTransport | None" = field(default=None, compare=False)
+    limiter: "AdaptiveLimiter | None" = field(default=None, compare=False)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        if not self.user_agents:
+            raise ValueError("At least one user agent is required")
+        if self.http2 and importlib.util.find_spec("h2") is None:
+            raise ValueError(
+                "HTTP/2 needs the h2 package: pip install 'csv-upc-omg[http2]'"
+            )
+
+    @cached_property
+    def header_sets(self) -> tuple[dict[str, str], ...]:
+        """The full request headers for each user agent, built once."""
+        return tuple(
+            {"User-Agent": user_agent, **BASE_HEADERS}
+            for user_agent in self.user_agents
+        )
+
+    @cached_property
+    def _rotation(self) -> Iterator[dict[str, str]]:
+        return itertools.cycle(self.header_sets)
+
+    def headers(self) -> dict[str, str]:
+        """Headers for the next request, rotating through the user agents.
+
+        The same dict objects are handed out every time; copy before
+        changing one.
+        """
+        return next(self._rotation)
+
+    def client(self) -> "httpx.Client":
+        """The shared client, created on first call. Safe to use from threads."""
+        with self._lock:
+            client: httpx.Client | None = self.__dict__.get("_client")
+            if client is None:
+                client = self.__dict__["_client"] = self._build_client()
+            return client
+
+    def _build_client(self) -> "httpx.Client":
+        import httpx
+
+        return httpx.Client(
+            proxy=self.proxy,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+            ),
+            http2=self.http2,
+            transport=self.transport,
+        )
+
+    def close(self) -> None:
+        """Close the client, if one was created. A later lookup opens a new one."""
+        with self._lock:
+            client = self.__dict__.pop("_client", None)
+        if client is not None:
+            client.close()
@@ -1,8 +1,17 @@
 """Utilities for CSV file processing."""
 
+import codecs
 import csv
+import hashlib
+import os
+import re
+from collections.abc import Iterator
 from pathlib import Path
 
+# Line endings as recognised by universal-newlines mode; "\r" alone only
+# counts once the next character is known not to be "\n".
+_LINE_END = re.compile(r"(\r\n|\r(?=.)|\n)", re.DOTALL)
+
 
 def find_most_recent_csv(directory: str) -> Path | None:
     """Find the most recently modified CSV file in a directory.
@@ -31,17 +40,36 @@ def find_most_recent_csv(directory: str) -> Path | None:
     return most_recent
 
 
-def extract_upcs_from_csv(csv_path: Path) -> list[str]:
-    """Extract UPCs from the first column of a CSV file.
+def find_csv_files(directory: str, pattern: str = "*.csv") -> list[Path]:
+    """Find all CSV files in a directory matching a glob pattern.
 
     Args:
-        csv_path: Path to the CSV file
+        directory: Path to the directory to search
+        pattern: Glob pattern relative to the directory, e.g. ``**/*.csv``
 
     Returns:
-        List of UPCs (as strings) from the first column
+        Sorted list of matching file paths
     """
-    upcs = []
+    dir_path = Path(directory)
+
+    if not dir_path.exists():
+        raise FileNotFoundError(f"Directory does not exist: {directory}")
+
+    if not dir_path.is_dir():
+        raise NotADirectoryError(f"Path is not a directory: {directory}")
 
+    return sorted(path for path in dir_path.glob(pattern) if path.is_file())
+
+
+def iter_upcs_from_csv(csv_path: Path) -> Iterator[str]:
+    """Stream UPCs from the first column of a CSV file, one row at a time.
+
+    Args:
+        csv_path: Path to the CSV file
+
+    Yields:
+        UPCs (as strings) from the first column, in file order
+    """
     try:
         with csv_path.open(encoding="utf-8") as file:
             reader = csv.reader(file)
@@ -49,11 +77,141 @@ def extract_upcs_from_csv(csv_path: Path) -> list[str]:
             for row in reader:
                 # Check if row exists and first cell not empty
                 if row and row[0].strip():
-                    upcs.append(row[0].strip())
+                    yield row[0].strip()
 
     except FileNotFoundError:
         raise FileNotFoundError(f"CSV file not found: {csv_path}")
     except Exception as e:
         raise RuntimeError(f"Error reading CSV file {csv_path}: {e}") from e
 
-    return upcs
+
+def extract_upcs_from_csv(csv_path: Path) -> list[str]:
+    """Extract UPCs from the first column of a CSV file.
+
+    Args:
+        csv_path: Path to the CSV file
+
+    Returns:
+        List of UPCs (as strings) from the first column
+    """
+    return list(iter_upcs_from_csv(csv_path))
+
+
+def _ends_in_quotes(line: str, in_quotes: bool) -> bool:
+    """Return whether a quoted field is still open after ``line``.
+
+    Follows the default ``csv`` dialect: quotes only open a field at its
+    start, and ``""`` inside a quoted field is an escaped quote.
+    """
+    at_field_start = not in_quotes
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if in_quotes:
+            if char == '"':
+                if line[i + 1 : i + 2] == '"':
+                    i += 1
+                else:
+                    in_quotes = False
+        elif char == '"' and at_field_start:
+            in_quotes = True
+        at_field_start = not in_quotes and char == ","
+        i += 1
+    return in_quotes
+
+
+class IncrementalUPCParser:
+    """Parse UPCs from CSV bytes fed in arbitrary chunks.
+
+    Produces the same UPCs as :func:`extract_upcs_from_csv` without needing
+    the whole file, so uploads can be parsed while they are still arriving.
+    Rows are only parsed once complete: a chunk may end mid-line, inside a
+    quoted field or mid-character.
+    """
+
+    def __init__(self, encoding: str = "utf-8") -> None:
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._record = ""
+        self._partial_line = ""
+        self._in_quotes = False
+        self.rows = 0
+
+    def feed(self, data: bytes) -> list[str]:
+        """Parse a chunk, returning UPCs from the rows it completed."""
+        return self._parse(self._decoder.decode(data), final=False)
+
+    def close(self) -> list[str]:
+        """Flush the final row, returning any UPC it held."""
+        return self._parse(self._decoder.decode(b"", final=True), final=True)
+
+    def _parse(self, text: str, final: bool) -> list[str]:
+        # split() alternates line bodies and their line endings; endings are
+        # normalized to "\n" as universal-newlines mode would.
+        parts = _LINE_END.split(self._partial_line + text)
+        records = []
+        for body in parts[:-1:2]:
+            line = body + "\n"
+            self._record += line
+            if self._in_quotes or '"' in line:
+                self._in_quotes = _ends_in_quotes(line, self._in_quotes)
+            if not self._in_quotes:
+                records.append(self._record)
+                self._record = ""
+        self._partial_line = parts[-1]
+
+        if final and self._record + self._partial_line:
+            records.append(self._record + self._partial_line)
+            self._record = self._partial_line = ""
+
+        upcs = []
+        for row in csv.reader(records):
+            self.rows += 1
+            # Check if row exists and first cell not empty
+            if row and row[0].strip():
+                upcs.append(row[0].strip())
+        return upcs
+
+
+def extract_upcs_from_csvs(
+    csv_paths: list[Path], workers: int | None = None
+) -> dict[Path, list[str]]:
+    """Extract UPCs from many CSV files, parsing them in worker processes.
+
+    Args:
+        csv_paths: Paths to the CSV files
+        workers: Number of worker processes (defaults to the CPU count);
+            1 parses serially in the current process
+
+    Returns:
+        Mapping of each CSV path to its UPCs, in the order given
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(csv_paths) <= 1:
+        return {csv_path: extract_upcs_from_csv(csv_path) for csv_path in csv_paths}
+
+    # Imported here: multiprocessing is costly to import and only needed
+    # for multi-file runs.
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Batch several files per task so small files don't pay IPC per file.
+    chunksize = max(1, len(csv_paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=min(workers, len(csv_paths))) as executor:
+        results = executor.map(extract_upcs_from_csv, csv_paths, chunksize=chunksize)
+        return dict(zip(csv_paths, results, strict=True))
+
+
+def file_sha256(csv_path: Path, chunk_size: int = 64 * 1024) -> str:
+    """Compute the SHA-256 hex digest of a file without loading it whole.
+
+    Args:
+        csv_path: Path to the file to hash
+        chunk_size: Number of bytes to read per chunk
+
+    Returns:
+        Hex-encoded SHA-256 digest of the file contents
+    """
+    hasher = hashlib.sha256()
+    with csv_path.open("rb") as file:
+        while chunk := file.read(chunk_size):
+            hasher.update(chunk)
+    return hasher.hexdigest()
@@ -0,0 +1,33 @@
+"""Time budgets for runs made up of many lookups."""
+
+import time
+from collections.abc import Callable
+
+
+class Deadline:
+    """A point in time after which a run stops starting new lookups.
+
+    ``Deadline(None)`` never expires, so callers can thread one through
+    unconditionally.
+    """
+
+    def __init__(
+        self, seconds: float | None, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._clock = clock
+        self.expires_at = None if seconds is None else clock() + seconds
+
+    def remaining(self) -> float | None:
+        """Seconds left, or None when there is no deadline."""
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - self._clock(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def clamp(self, timeout: float) -> float:
+        """Shorten a per-request timeout so the request ends by the deadline."""
+        remaining = self.remaining()
+        return timeout if remaining is None else min(timeout, remaining)
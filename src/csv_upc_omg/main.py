@@ -1,15 +1,232 @@
 """Main entry point for the CSV UPC OMG application."""
 
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import replace
+from pathlib import Path
+from typing import Any
+
 import click
 
-from .barcode_lookup import BarcodeAPIError, fetch_product_title_sync
-from .csv_utils import extract_upcs_from_csv, find_most_recent_csv
+from . import metrics
+from .barcode_lookup import (
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_CACHE_TTL,
+    BarcodeAPIError,
+    configure_cache,
+    fetch_product_title_sync,
+)
+from .config import (
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MAX_RESPONSE_BYTES,
+    DEFAULT_USER_AGENT,
+    LookupConfig,
+)
+from .csv_utils import (
+    extract_upcs_from_csv,
+    extract_upcs_from_csvs,
+    find_csv_files,
+    find_most_recent_csv,
+)
+from .deadline import Deadline
+from .output import (
+    EXTENSIONS,
+    FORMATS,
+    LookupResult,
+    ResultWriter,
+    TextWriter,
+    open_writer,
+)
+from .profiling import DEFAULT_PROFILE_DIR, profile_run
+from .watch import ProcessedFileIndex, scan_for_new_csvs, watch_directory
+
+DEFAULT_STATE_FILENAME = ".csv-upc-omg-watch.json"
+
+
+def batch_options(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Add the options for processing every matching CSV in one run."""
+    options = [
+        click.option(
+            "--all",
+            "all_files",
+            is_flag=True,
+            help="Process every CSV in the directory, not just the newest",
+        ),
+        click.option(
+            "--glob",
+            "pattern",
+            default=None,
+            help="Process every file matching this pattern (implies --all)",
+        ),
+        click.option(
+            "--workers",
+            default=None,
+            type=click.IntRange(min=1),
+            help="Worker processes for parsing (default: CPU count)",
+        ),
+        click.option(
+            "--output-dir",
+            type=click.Path(file_okay=False),
+            default=None,
+            help="Write one result file per CSV here instead of to stdout",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
 
 
 @click.group()
-def cli() -> None:
+@click.option(
+    "--stats",
+    is_flag=True,
+    help="Print lookup throughput and per-stage latency to stderr on exit",
+)
+@click.option("--profile", is_flag=True, help="Record a cProfile profile of the run")
+@click.option(
+    "--profile-dir",
+    default=DEFAULT_PROFILE_DIR,
+    envvar="CSV_UPC_OMG_PROFILE_DIR",
+    show_default=True,
+    type=click.Path(file_okay=False),
+    help="Directory for profile dumps",
+)
+@click.option(
+    "--profile-memory",
+    is_flag=True,
+    help="Also dump a tracemalloc snapshot (implies --profile)",
+)
+@click.option(
+    "--cache-size",
+    default=DEFAULT_CACHE_SIZE,
+    envvar="CSV_UPC_OMG_CACHE_SIZE",
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="Lookup results to keep in memory (0 disables the cache)",
+)
+@click.option(
+    "--cache-ttl",
+    default=DEFAULT_CACHE_TTL,
+    envvar="CSV_UPC_OMG_CACHE_TTL",
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Seconds a cached lookup result stays valid",
+)
+@click.option(
+    "--max-response-bytes",
+    default=DEFAULT_MAX_RESPONSE_BYTES,
+    envvar="CSV_UPC_OMG_MAX_RESPONSE_BYTES",
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Stop reading a product page after this many bytes",
+)
+@click.option(
+    "--user-agent",
+    "user_agents",
+    multiple=True,
+    help="User-Agent to send; repeat to rotate between several",
+)
+@click.option(
+    "--proxy",
+    envvar="CSV_UPC_OMG_PROXY",
+    default=None,
+    help="Send lookups through this proxy URL",
+)
+@click.option(
+    "--max-connections",
+    default=DEFAULT_MAX_CONNECTIONS,
+    envvar="CSV_UPC_OMG_MAX_CONNECTIONS",
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Most connections open to the lookup site at once",
+)
+@click.option(
+    "--http2",
+    is_flag=True,
+    envvar="CSV_UPC_OMG_HTTP2",
+    help="Use HTTP/2 for lookups (needs the http2 extra)",
+)
+@click.option(
+    "--record",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Save every lookup response to this archive",
+)
+@click.option(
+    "--replay",
+    type=click.Path(exists=True, dir_okay=False),
+    envvar="CSV_UPC_OMG_REPLAY",
+    default=None,
+    help="Answer lookups from this recorded archive instead of the network",
+)
+@click.pass_context
+def cli(
+    ctx: click.Context,
+    stats: bool,
+    profile: bool,
+    profile_dir: str,
+    profile_memory: bool,
+    cache_size: int,
+    cache_ttl: float,
+    max_response_bytes: int,
+    user_agents: tuple[str, ...],
+    proxy: str | None,
+    max_connections: int,
+    http2: bool,
+    record: str | None,
+    replay: str | None,
+) -> None:
     """CSV UPC OMG - A Python application for CSV and UPC processing."""
-    pass
+    configure_cache(maxsize=cache_size, ttl=cache_ttl)
+
+    if record and replay:
+        raise click.UsageError("--record and --replay cannot be used together")
+    transport = None
+    archive_path = record or replay
+    if archive_path:
+        from .replay import open_archive
+
+        archive, transport = open_archive(archive_path, record=bool(record))
+        ctx.call_on_close(archive.close)
+    try:
+        config = LookupConfig(
+            user_agents=user_agents or (DEFAULT_USER_AGENT,),
+            proxy=proxy,
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            http2=http2,
+            max_response_bytes=max_response_bytes,
+            transport=transport,
+        )
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    ctx.obj = config
+    # Runs before the archive is closed, so a recording sees every response.
+    ctx.call_on_close(config.close)
+    if stats:
+        metrics.REGISTRY.reset()
+        metrics.enable()
+        ctx.call_on_close(_report_stats)
+
+    if profile or profile_memory:
+        name = ctx.invoked_subcommand or "cli"
+        # Close callbacks run last-in first-out: register the report first so
+        # it runs after the profiler has written its files.
+        ctx.call_on_close(lambda: _report_profile(written))
+        written = ctx.with_resource(
+            profile_run(name, profile_dir, memory=profile_memory)
+        )
+
+
+def _report_profile(written: list[Path]) -> None:
+    """Tell the user where the profile dumps went."""
+    for path in written:
+        click.echo(f"Profile written to {path}", err=True)
+
+
+def _report_stats() -> None:
+    """Print the metrics summary and stop recording."""
+    click.echo(metrics.format_summary(), err=True)
+    metrics.disable()
 
 
 @cli.command()
@@ -17,9 +234,23 @@ def cli() -> None:
     "directory", type=click.Path(exists=True, file_okay=False, dir_okay=True)
 )
 @click.option("--verbose", "-v", is_flag=True, help="Enable verbose output")
-def upcs(directory: str, verbose: bool) -> None:
+@batch_options
+def upcs(
+    directory: str,
+    verbose: bool,
+    all_files: bool,
+    pattern: str | None,
+    workers: int | None,
+    output_dir: str | None,
+) -> None:
     """Extract UPCs from the most recently updated CSV in a directory."""
     try:
+        if all_files or pattern:
+            upcs_by_file = _extract_many(directory, pattern, workers, verbose)
+            for file_path, upc_list in upcs_by_file.items():
+                _write_file_result(directory, file_path, upc_list, output_dir)
+            return
+
         csv_path = find_most_recent_csv(directory)
 
         if csv_path is None:
@@ -52,41 +283,115 @@ def upcs(directory: str, verbose: bool) -> None:
 )
 @click.option("--verbose", "-v", is_flag=True, help="Enable verbose output")
 @click.option("--timeout", default=10.0, help="Request timeout in seconds", type=float)
-def titles(directory: str, verbose: bool, timeout: float) -> None:
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(FORMATS),
+    default="text",
+    help="Output format",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Write results to this file instead of stdout",
+)
+@click.option(
+    "--deadline",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Stop looking up after this many seconds and write partial results",
+)
+@batch_options
+@click.pass_obj
+def titles(
+    config: LookupConfig,
+    directory: str,
+    verbose: bool,
+    timeout: float,
+    fmt: str,
+    output: Path | None,
+    deadline: float | None,
+    all_files: bool,
+    pattern: str | None,
+    workers: int | None,
+    output_dir: str | None,
+) -> None:
     """Extract UPCs from CSV and fetch product titles from barcodelookup.com."""
+    # Keep stdout machine-parseable when emitting structured formats.
+    to_stderr = fmt != "text"
+    budget = Deadline(deadline)
     try:
+        if all_files or pattern:
+            upcs_by_file = _extract_many(
+                directory, pattern, workers, verbose, to_stderr
+            )
+            # Look each UPC up once, however many files it appears in.
+            unique_upcs = dict.fromkeys(
+                upc for upc_list in upcs_by_file.values() for upc in upc_list
+            )
+            if verbose:
+                click.echo(
+                    f"Found {len(unique_upcs)} unique UPCs, fetching product titles...",
+                    err=to_stderr,
+                )
+            results = {
+                result.upc: result
+                for result in _lookup_all(unique_upcs, timeout, verbose, budget, config)
+            }
+            _report_deadline(len(unique_upcs) - len(results))
+
+            if output_dir is not None:
+                for file_path, upc_list in upcs_by_file.items():
+                    result_path = _result_path(
+                        directory, file_path, output_dir, EXTENSIONS[fmt]
+                    )
+                    with open_writer(fmt, result_path) as writer:
+                        for upc in upc_list:
+                            if upc in results:
+                                _write_result(writer, results[upc], verbose)
+                return
+
+            with open_writer(fmt, output, include_source=True) as writer:
+                for file_path, upc_list in upcs_by_file.items():
+                    writer.begin_file(str(file_path))
+                    for upc in upc_list:
+                        if upc in results:
+                            result = replace(results[upc], source=str(file_path))
+                            _write_result(writer, result, verbose)
+            return
+
         csv_path = find_most_recent_csv(directory)
 
         if csv_path is None:
-            click.echo("No CSV files found in the specified directory.")
+            click.echo("No CSV files found in the specified directory.", err=to_stderr)
             return
 
         if verbose:
-            click.echo(f"Processing most recent CSV: {csv_path}")
+            click.echo(f"Processing most recent CSV: {csv_path}", err=to_stderr)
 
         upc_list = extract_upcs_from_csv(csv_path)
 
         if not upc_list:
-            click.echo("No UPCs found in the CSV file.")
+            click.echo("No UPCs found in the CSV file.", err=to_stderr)
             return
 
         if verbose:
-            click.echo(f"Found {len(upc_list)} UPCs, fetching product titles...")
+            click.echo(
+                f"Found {len(upc_list)} UPCs, fetching product titles...",
+                err=to_stderr,
+            )
 
-        for upc in upc_list:
-            try:
-                title = fetch_product_title_sync(upc, timeout=timeout)
-                if title:
-                    click.echo(f"{upc}: {title}")
-                else:
-                    click.echo(f"{upc}: Product not found")
-
-            except BarcodeAPIError as e:
-                if verbose:
-                    click.echo(f"{upc}: Error - {e}", err=True)
-                else:
-                    click.echo(f"{upc}: Lookup failed")
+        done = 0
+        with open_writer(fmt, output) as writer:
+            for result in _lookup_all(upc_list, timeout, verbose, budget, config):
+                _write_result(writer, result, verbose)
+                done += 1
+        _report_deadline(len(upc_list) - done)
 
+    except click.UsageError:
+        raise
     except (FileNotFoundError, NotADirectoryError) as e:
         click.echo(f"Error: {e}", err=True)
         raise click.Abort()
@@ -95,6 +400,184 @@ def titles(directory: str, verbose: bool, timeout: float) -> None:
         raise click.Abort()
 
 
+def _lookup(
+    upc: str, timeout: float, verbose: bool, config: LookupConfig
+) -> LookupResult:
+    """Look up a UPC, reporting errors on stderr in verbose mode."""
+    try:
+        title = fetch_product_title_sync(upc, timeout=timeout, config=config)
+        if title:
+            return LookupResult(upc, title, "success")
+        return LookupResult(upc, None, "not_found")
+
+    except BarcodeAPIError as e:
+        if verbose:
+            click.echo(f"{upc}: Error - {e}", err=True)
+        return LookupResult(upc, None, "failed", str(e))
+
+
+def _lookup_all(
+    upcs: Iterable[str],
+    timeout: float,
+    verbose: bool,
+    deadline: Deadline,
+    config: LookupConfig,
+) -> Iterator[LookupResult]:
+    """Look up each UPC in turn until the deadline passes.
+
+    Request timeouts are cut short to end by the deadline. A lookup that
+    fails once the deadline has passed is dropped with the rest, since it
+    was most likely cut off rather than genuinely failing.
+    """
+    for upc in upcs:
+        if deadline.expired:
+            return
+        result = _lookup(upc, deadline.clamp(timeout), verbose, config)
+        if result.status == "failed" and deadline.expired:
+            return
+        yield result
+
+
+def _report_deadline(skipped: int) -> None:
+    if skipped:
+        click.echo(f"Deadline reached; {skipped} UPCs were not looked up.", err=True)
+
+
+def _write_result(writer: ResultWriter, result: LookupResult, verbose: bool) -> None:
+    """Write a result, skipping text lines for errors already on stderr."""
+    if verbose and result.status == "failed" and isinstance(writer, TextWriter):
+        return
+    writer.write(result)
+
+
+def _echo_titles(
+    upc_list: list[str], timeout: float, verbose: bool, config: LookupConfig
+) -> None:
+    """Look up and print a title for each UPC."""
+    for upc in upc_list:
+        result = _lookup(upc, timeout, verbose, config)
+        if not (verbose and result.status == "failed"):
+            click.echo(result.text_line())
+
+
+def _extract_many(
+    directory: str,
+    pattern: str | None,
+    workers: int | None,
+    verbose: bool,
+    to_stderr: bool = False,
+) -> dict[Path, list[str]]:
+    """Parse every matching CSV in a directory across worker processes."""
+    csv_paths = find_csv_files(directory, pattern or "*.csv")
+    if not csv_paths:
+        click.echo("No CSV files found in the specified directory.", err=True)
+    elif verbose:
+        click.echo(f"Processing {len(csv_paths)} CSV files", err=to_stderr)
+    return extract_upcs_from_csvs(csv_paths, workers)
+
+
+def _result_path(
+    directory: str, csv_path: Path, output_dir: str, extension: str
+) -> Path:
+    """Map an input CSV to its result file, mirroring subdirectories."""
+    relative = csv_path.relative_to(directory).with_suffix(extension)
+    result_path = Path(output_dir) / relative
+    result_path.parent.mkdir(parents=True, exist_ok=True)
+    return result_path
+
+
+def _write_file_result(
+    directory: str, csv_path: Path, lines: list[str], output_dir: str | None
+) -> None:
+    """Emit one CSV's results, to stdout or a per-file output file."""
+    lines = [line for line in lines if line]
+    if output_dir is None:
+        click.echo(f"==> {csv_path} <==")
+        for line in lines:
+            click.echo(line)
+        return
+
+    result_path = _result_path(directory, csv_path, output_dir, ".txt")
+    result_path.write_text("".join(f"{line}\n" for line in lines), encoding="utf-8")
+
+
+@cli.command()
+@click.argument(
+    "directory", type=click.Path(exists=True, file_okay=False, dir_okay=True)
+)
+@click.option("--verbose", "-v", is_flag=True, help="Enable verbose output")
+@click.option(
+    "--titles",
+    "fetch_titles",
+    is_flag=True,
+    help="Fetch product titles instead of printing bare UPCs",
+)
+@click.option("--timeout", default=10.0, help="Request timeout in seconds", type=float)
+@click.option(
+    "--interval",
+    default=2.0,
+    type=float,
+    help="Seconds between rescans when inotify is unavailable",
+)
+@click.option(
+    "--settle",
+    default=1.0,
+    type=float,
+    help="Seconds a CSV must stay unchanged before it is processed",
+)
+@click.option(
+    "--state-file",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="File remembering processed CSVs (default: inside DIRECTORY)",
+)
+@click.option("--once", is_flag=True, help="Process new files once, then exit")
+@click.pass_obj
+def watch(
+    config: LookupConfig,
+    directory: str,
+    verbose: bool,
+    fetch_titles: bool,
+    timeout: float,
+    interval: float,
+    settle: float,
+    state_file: str | None,
+    once: bool,
+) -> None:
+    """Watch a directory and process only new or changed CSVs."""
+    state_path = (
+        Path(state_file) if state_file else Path(directory) / DEFAULT_STATE_FILENAME
+    )
+    try:
+        index = ProcessedFileIndex(state_path)
+        if once:
+            csv_paths = iter(scan_for_new_csvs(Path(directory), index))
+        else:
+            csv_paths = watch_directory(
+                directory, index, interval=interval, settle=settle
+            )
+
+        for csv_path in csv_paths:
+            if verbose:
+                click.echo(f"Processing new CSV: {csv_path}")
+
+            upc_list = extract_upcs_from_csv(csv_path)
+            if fetch_titles:
+                _echo_titles(upc_list, timeout, verbose, config)
+            else:
+                for upc in upc_list:
+                    click.echo(upc)
+
+            index.mark_processed(csv_path)
+            index.save()
+
+    except KeyboardInterrupt:
+        index.save()
+    except Exception as e:
+        click.echo(f"Error watching directory: {e}", err=True)
+        raise click.Abort()
+
+
 @cli.command()
 @click.option("--verbose", "-v", is_flag=True, help="Enable verbose output")
 def hello(verbose: bool) -> None:
@@ -0,0 +1,371 @@
+"""Lightweight, Prometheus-compatible metrics for the lookup hot path.
+
+Metrics are disabled by default. While disabled every helper returns
+immediately after a single boolean check, so instrumented code pays almost
+nothing. Enable them with :func:`enable` (the CLI's ``--stats`` flag and the
+Django ``METRICS_ENABLED`` setting both do this).
+"""
+
+import math
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    math.inf,
+)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], Any] = {}
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _label_text(self, key: tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{value}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key: tuple[str, ...], value: Any) -> list[str]:
+        return [f"{self.name}{self._label_text(key)} {value}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return float(self._values.get(self._key(labels), 0.0))
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += 1
+            state[2] += value
+
+    def stats(self, **labels: str) -> tuple[int, float]:
+        """Return (count, sum) of observations for a label set."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return (state[1], state[2]) if state else (0, 0.0)
+
+    def _render_value(self, key: tuple[str, ...], value: Any) -> list[str]:
+        bucket_counts, count, total = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, bucket_counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == math.inf else repr(bound)
+            label_text = self._label_text(key, f'le="{le}"')
+            lines.append(f"{self.name}_bucket{label_text} {cumulative}")
+        lines.append(f"{self.name}_count{self._label_text(key)} {count}")
+        lines.append(f"{self.name}_sum{self._label_text(key)} {total}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics that renders in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.started_at = time.monotonic()
+        self._metrics: list[_Metric] = []
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        metric = Gauge(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def reset(self) -> None:
+        self.started_at = time.monotonic()
+        for metric in self._metrics:
+            metric.reset()
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGES = ("connect", "tls", "server", "download", "parse", "db_write")
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "csv_upc_omg_lookup_stage_seconds",
+    "Time spent in each stage of a UPC lookup.",
+    ["stage"],
+)
+LOOKUPS_TOTAL = REGISTRY.counter(
+    "csv_upc_omg_lookups_total",
+    "UPC lookups by outcome.",
+    ["status"],
+)
+CACHE_REQUESTS_TOTAL = REGISTRY.counter(
+    "csv_upc_omg_cache_requests_total",
+    "Lookup cache requests by result (hit or miss).",
+    ["result"],
+)
+LOOKUPS_COALESCED_TOTAL = REGISTRY.counter(
+    "csv_upc_omg_lookups_coalesced_total",
+    "Lookups answered by sharing a concurrent lookup of the same UPC.",
+)
+RESPONSE_BYTES_TOTAL = REGISTRY.counter(
+    "csv_upc_omg_response_bytes_total",
+    "Bytes of product pages downloaded.",
+)
+LOOKUPS_IN_FLIGHT = REGISTRY.gauge(
+    "csv_upc_omg_lookups_in_flight",
+    "UPC lookups currently waiting on the network.",
+)
+CONCURRENCY_LIMIT = REGISTRY.gauge(
+    "csv_upc_omg_lookup_concurrency_limit",
+    "Concurrent lookups currently allowed by the adaptive limiter.",
+)
+
+
+def enable() -> None:
+    """Start recording metrics."""
+    REGISTRY.enabled = True
+
+
+def disable() -> None:
+    """Stop recording metrics."""
+    REGISTRY.enabled = False
+
+
+def is_enabled() -> bool:
+    """Return whether metrics are being recorded."""
+    return REGISTRY.enabled
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    if REGISTRY.enabled:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def record_lookup(status: str) -> None:
+    if REGISTRY.enabled:
+        LOOKUPS_TOTAL.inc(status=status)
+
+
+def record_coalesced() -> None:
+    if REGISTRY.enabled:
+        LOOKUPS_COALESCED_TOTAL.inc()
+
+
+def record_response_bytes(count: int) -> None:
+    if REGISTRY.enabled:
+        RESPONSE_BYTES_TOTAL.inc(count)
+
+
+def record_concurrency_limit(limit: int) -> None:
+    if REGISTRY.enabled:
+        CONCURRENCY_LIMIT.set(limit)
+
+
+def record_cache(hit: bool) -> None:
+    if REGISTRY.enabled:
+        CACHE_REQUESTS_TOTAL.inc(result="hit" if hit else "miss")
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """Time the enclosed block as one lookup stage."""
+    if not REGISTRY.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+@contextmanager
+def in_flight() -> Iterator[None]:
+    """Count the enclosed block as an in-flight lookup."""
+    if not REGISTRY.enabled:
+        yield
+        return
+    LOOKUPS_IN_FLIGHT.inc()
+    try:
+        yield
+    finally:
+        LOOKUPS_IN_FLIGHT.dec()
+
+
+# httpcore trace events (minus the .started/.complete suffix) per stage.
+_TRACE_STAGES = {
+    "connection.connect_tcp": "connect",
+    "connection.start_tls": "tls",
+    "http11.receive_response_headers": "server",
+    "http2.receive_response_headers": "server",
+    "http11.receive_response_body": "download",
+    "http2.receive_response_body": "download",
+}
+
+
+class StageTracer:
+    """httpx ``trace`` extension that times connection and transfer stages.
+
+    DNS resolution happens inside httpcore's TCP connect, so it is reported
+    as part of the ``connect`` stage.
+    """
+
+    def __init__(self) -> None:
+        self._started: dict[str, float] = {}
+
+    def __call__(self, event_name: str, info: dict[str, Any]) -> None:
+        prefix, _, phase = event_name.rpartition(".")
+        stage = _TRACE_STAGES.get(prefix)
+        if stage is None:
+            return
+        if phase == "started":
+            self._started[stage] = time.perf_counter()
+        elif phase in ("complete", "failed") and stage in self._started:
+            observe_stage(stage, time.perf_counter() - self._started.pop(stage))
+
+
+def summary() -> dict[str, Any]:
+    """Summarize recorded metrics for human-readable reporting."""
+    elapsed = time.monotonic() - REGISTRY.started_at
+    statuses = {
+        status: int(LOOKUPS_TOTAL.value(status=status))
+        for status in ("success", "not_found", "failed")
+    }
+    total = sum(statuses.values())
+    hits = CACHE_REQUESTS_TOTAL.value(result="hit")
+    misses = CACHE_REQUESTS_TOTAL.value(result="miss")
+    stages = {}
+    for stage in STAGES:
+        count, seconds = STAGE_SECONDS.stats(stage=stage)
+        if count:
+            stages[stage] = {"count": count, "mean_ms": seconds / count * 1000}
+    return {
+        "elapsed_seconds": elapsed,
+        "lookups": statuses,
+        "lookups_per_second": total / elapsed if elapsed > 0 else 0.0,
+        "cache_hit_ratio": hits / (hits + misses) if hits + misses else None,
+        "concurrency_limit": int(CONCURRENCY_LIMIT.value()) or None,
+        "stages": stages,
+    }
+
+
+def format_summary() -> str:
+    """Render :func:`summary` as a short multi-line report."""
+    data = summary()
+    lookups = data["lookups"]
+    lines = [
+        f"Lookups: {sum(lookups.values())} "
+        f"(success {lookups['success']}, not found {lookups['not_found']}, "
+        f"failed {lookups['failed']}) in {data['elapsed_seconds']:.2f}s "
+        f"({data['lookups_per_second']:.1f}/s)",
+    ]
+    if data["cache_hit_ratio"] is not None:
+        lines.append(f"Cache hit ratio: {data['cache_hit_ratio']:.1%}")
+    if data["concurrency_limit"] is not None:
+        lines.append(f"Concurrency limit: {data['concurrency_limit']}")
+    for stage, stats in data["stages"].items():
+        lines.append(
+            f"  {stage:<9} {stats['count']:>6} x {stats['mean_ms']:8.2f} ms mean"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,249 @@
+"""Buffered, machine-readable writers for lookup results."""
+
+import csv
+import io
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import IO, Any
+
+import click
+
+FORMATS = ("text", "jsonl", "csv", "parquet")
+EXTENSIONS = {"text": ".txt", "jsonl": ".jsonl", "csv": ".csv", "parquet": ".parquet"}
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_FLUSH_INTERVAL = 1.0
+FILE_BUFFER_SIZE = 1 << 16
+
+
+@dataclass
+class LookupResult:
+    """Outcome of looking up a single UPC."""
+
+    upc: str
+    title: str | None
+    status: str
+    error: str = ""
+    source: str | None = None
+
+    def text_line(self) -> str:
+        """Format the result the way the ``titles`` command always has."""
+        if self.status == "success":
+            return f"{self.upc}: {self.title}"
+        if self.status == "not_found":
+            return f"{self.upc}: Product not found"
+        return f"{self.upc}: Lookup failed"
+
+
+class ResultWriter:
+    """Base writer that batches rows and writes each batch in one call.
+
+    Rows are serialized into an in-memory buffer and flushed every
+    ``batch_size`` rows, so piping many thousands of results costs a handful
+    of writes instead of one per row. Slow lookups still show up: a row
+    written ``flush_interval`` seconds after the last flush flushes the
+    buffer too, and text on an interactive terminal is written line by line.
+    Writes go to ``path`` when given and to stdout otherwise.
+    """
+
+    binary = False
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        include_source: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float | None = DEFAULT_FLUSH_INTERVAL,
+    ) -> None:
+        self.path = path
+        self.include_source = include_source
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        if path is None and not self.binary and _stdout_is_tty():
+            self.batch_size = 1
+        self._last_flush = time.monotonic()
+        self._pending = 0
+        self._buffer = io.StringIO()
+        self._file: IO[Any] | None = None
+        if path is not None:
+            if self.binary:
+                self._file = path.open("wb")
+            else:
+                self._file = path.open(
+                    "w", encoding="utf-8", newline="", buffering=FILE_BUFFER_SIZE
+                )
+
+    @property
+    def fields(self) -> list[str]:
+        fields = ["upc", "title", "status", "error"]
+        if self.include_source:
+            fields.append("source")
+        return fields
+
+    def begin_file(self, source: str) -> None:
+        """Mark the start of results for one input file."""
+
+    def write(self, result: LookupResult) -> None:
+        """Queue one result, flushing when the batch is full or has waited long."""
+        self._serialize(result)
+        self._pending += 1
+        if self._pending >= self.batch_size or (
+            self.flush_interval is not None
+            and time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def _serialize(self, result: LookupResult) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Write out all buffered rows."""
+        data = self._buffer.getvalue()
+        if data:
+            if self._file is not None:
+                self._file.write(data)
+            else:
+                click.echo(data, nl=False)
+        self._buffer = io.StringIO()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        """Flush remaining rows and close the output file."""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class TextWriter(ResultWriter):
+    """Human-readable ``upc: title`` lines."""
+
+    def begin_file(self, source: str) -> None:
+        self._buffer.write(f"==> {source} <==\n")
+
+    def _serialize(self, result: LookupResult) -> None:
+        self._buffer.write(result.text_line() + "\n")
+
+
+class JSONLWriter(ResultWriter):
+    """One JSON object per line."""
+
+    def _serialize(self, result: LookupResult) -> None:
+        row = {field: getattr(result, field) for field in self.fields}
+        self._buffer.write(json.dumps(row) + "\n")
+
+
+class CSVWriter(ResultWriter):
+    """CSV with a header row."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._csv = csv.writer(self._buffer)
+        self._csv.writerow(self.fields)
+
+    def _serialize(self, result: LookupResult) -> None:
+        row = asdict(result)
+        self._csv.writerow([row[field] or "" for field in self.fields])
+
+    def flush(self) -> None:
+        super().flush()
+        self._csv = csv.writer(self._buffer)
+
+
+class ParquetWriter(ResultWriter):
+    """Parquet file written one row group per batch (requires pyarrow)."""
+
+    binary = True
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # Nobody reads a Parquet file half-written; timed flushes would only
+        # fragment it into small row groups.
+        self.flush_interval = None
+        if self._file is None:
+            raise click.UsageError("Parquet output requires --output FILE.")
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            self._file.close()
+            raise click.UsageError(
+                "Parquet output requires pyarrow: pip install 'csv-upc-omg[parquet]'"
+            ) from e
+
+        self._pa = pa
+        self._schema = pa.schema([(field, pa.string()) for field in self.fields])
+        self._writer = pq.ParquetWriter(self._file, self._schema)
+        self._rows: list[LookupResult] = []
+
+    def _serialize(self, result: LookupResult) -> None:
+        self._rows.append(result)
+
+    def flush(self) -> None:
+        if self._rows:
+            columns = {
+                field: [getattr(row, field) for row in self._rows]
+                for field in self.fields
+            }
+            self._writer.write_table(
+                self._pa.Table.from_pydict(columns, schema=self._schema)
+            )
+        self._rows = []
+        self._pending = 0
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+        super().close()
+
+
+def _stdout_is_tty() -> bool:
+    try:
+        return sys.stdout.isatty()
+    except (AttributeError, ValueError):
+        # No stdout at all, or a closed one.
+        return False
+
+
+WRITERS: dict[str, type[ResultWriter]] = {
+    "text": TextWriter,
+    "jsonl": JSONLWriter,
+    "csv": CSVWriter,
+    "parquet": ParquetWriter,
+}
+
+
+def open_writer(
+    fmt: str,
+    path: Path | None = None,
+    include_source: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    flush_interval: float | None = DEFAULT_FLUSH_INTERVAL,
+) -> ResultWriter:
+    """Create a result writer for a format.
+
+    Args:
+        fmt: One of ``FORMATS``
+        path: File to write to; stdout when None
+        include_source: Add a ``source`` column naming the input CSV
+        batch_size: Rows to buffer between writes
+        flush_interval: Most seconds a row may wait in the buffer before the
+            next write flushes it; None to flush on batch size only
+
+    Returns:
+        A writer; use it as a context manager so the last batch is flushed
+    """
+    return WRITERS[fmt](
+        path,
+        include_source=include_source,
+        batch_size=batch_size,
+        flush_interval=flush_interval,
+    )
@@ -0,0 +1,101 @@
+"""Opt-in profiling of whole runs for diagnosing production slowdowns."""
+
+import os
+import sys
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_PROFILE_DIR = "profiles"
+
+
+def _profiler_active() -> bool:
+    """Whether a profiler is already running, e.g. an enclosing profile_run."""
+    monitoring = getattr(sys, "monitoring", None)
+    if monitoring is not None:
+        # Python 3.12+: one profiler per process, and enabling a second
+        # raises ValueError.
+        return monitoring.get_tool(monitoring.PROFILER_ID) is not None
+    return sys.getprofile() is not None
+
+
+@contextmanager
+def profile_run(
+    name: str, output_dir: str | Path = DEFAULT_PROFILE_DIR, memory: bool = False
+) -> Iterator[list[Path]]:
+    """Profile the enclosed block and dump the results to a directory.
+
+    A cProfile stats file (``.prof``, readable with ``pstats`` or snakeviz)
+    is always written, covering threads started during the run as well, such
+    as a lookup pool's. With ``memory`` a tracemalloc snapshot
+    (``.tracemalloc``, loadable with ``tracemalloc.Snapshot.load``) is written
+    as well.
+
+    A run started while another profiler is active, such as a task run
+    inline inside a profiled task, is not profiled separately: it is already
+    part of the enclosing profile, and nothing is written for it.
+
+    Args:
+        name: Run name used as the file name prefix, e.g. the command or task
+        output_dir: Directory for the dumps; created if missing
+        memory: Also trace memory allocations (noticeably slower)
+
+    Yields:
+        A list that is filled with the written file paths on exit
+    """
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    written: list[Path] = []
+    if _profiler_active():
+        yield written
+        return
+
+    output_path = Path(output_dir)
+    # The random part keeps runs started within the same second apart.
+    stem = (
+        f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    )
+
+    started_tracemalloc = memory and not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    thread_profilers: list[cProfile.Profile] = []
+    # Before 3.12 a profiler only sees the thread that enabled it, so each
+    # new thread starts one of its own; from 3.12 one sees every thread.
+    per_thread = not hasattr(sys, "monitoring")
+
+    def profile_thread(*_args: object) -> None:
+        thread_profiler = cProfile.Profile()
+        thread_profilers.append(thread_profiler)
+        thread_profiler.enable()
+
+    if per_thread:
+        threading.setprofile(profile_thread)
+    profiler.enable()
+    try:
+        yield written
+    finally:
+        profiler.disable()
+        if per_thread:
+            threading.setprofile(None)
+        output_path.mkdir(parents=True, exist_ok=True)
+
+        stats_path = output_path / f"{stem}.prof"
+        stats = pstats.Stats(profiler)
+        for thread_profiler in thread_profilers:
+            stats.add(thread_profiler)
+        stats.dump_stats(stats_path)
+        written.append(stats_path)
+
+        if memory:
+            snapshot_path = output_path / f"{stem}.tracemalloc"
+            tracemalloc.take_snapshot().dump(str(snapshot_path))
+            written.append(snapshot_path)
+            if started_tracemalloc:
+                tracemalloc.stop()
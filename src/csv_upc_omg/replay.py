@@ -0,0 +1,160 @@
+"""Record barcode lookup responses and replay them without the network.
+
+Responses are kept in a zip archive with one deflated member per UPC. The
+zip central directory is the index, so replaying any UPC reads just that
+member. Each member's comment holds the status code and the few headers
+the lookup code cares about, as JSON.
+
+Import this module only when recording or replaying: it loads httpx.
+"""
+
+import json
+import threading
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Literal
+
+import httpx
+
+# Headers worth keeping; the rest only bloat the archive.
+KEPT_HEADERS = ("content-type", "etag", "last-modified")
+
+
+@dataclass(frozen=True)
+class RecordedResponse:
+    """One stored response."""
+
+    status_code: int
+    body: bytes
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+class ResponseArchive:
+    """Responses keyed by UPC, stored in a zip file.
+
+    Open with ``mode="r"`` to replay or ``mode="a"`` to record (creating
+    the file if needed). The first response recorded for a UPC is kept;
+    later ones are ignored. Safe to share between threads, but only one
+    process should record into a file at a time.
+    """
+
+    def __init__(self, path: str | Path, mode: Literal["r", "a"] = "r") -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._zip = zipfile.ZipFile(
+            self.path, mode, compression=zipfile.ZIP_DEFLATED, compresslevel=9
+        )
+        self._index = {info.filename: info for info in self._zip.infolist()}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, upc: str) -> bool:
+        return upc in self._index
+
+    def get(self, upc: str) -> RecordedResponse | None:
+        """Return the recorded response for ``upc``, or None."""
+        info = self._index.get(upc)
+        if info is None:
+            return None
+        meta = json.loads(info.comment)
+        with self._lock:
+            body = self._zip.read(info)
+        return RecordedResponse(meta["status"], body, meta["headers"])
+
+    def put(self, upc: str, response: RecordedResponse) -> bool:
+        """Store ``response`` unless ``upc`` is already recorded."""
+        with self._lock:
+            if upc in self._index:
+                return False
+            info = zipfile.ZipInfo(upc)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.comment = json.dumps(
+                {"status": response.status_code, "headers": response.headers},
+                separators=(",", ":"),
+            ).encode()
+            self._zip.writestr(info, response.body, compresslevel=9)
+            self._index[upc] = info
+        return True
+
+    def close(self) -> None:
+        with self._lock:
+            self._zip.close()
+
+    def __enter__(self) -> "ResponseArchive":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def _upc(request: httpx.Request) -> str:
+    return request.url.path.strip("/")
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """Answer lookup requests from an archive, never touching the network.
+
+    A UPC missing from the archive fails like a connection error, so an
+    incomplete recording cannot pass silently as "not found".
+    """
+
+    def __init__(self, archive: ResponseArchive) -> None:
+        self.archive = archive
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        recorded = self.archive.get(_upc(request))
+        if recorded is None:
+            raise httpx.ConnectError(
+                f"UPC {_upc(request)} is not in {self.archive.path}", request=request
+            )
+        return httpx.Response(
+            recorded.status_code,
+            headers=recorded.headers,
+            content=recorded.body,
+            request=request,
+        )
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """Send requests over ``transport`` and store each response."""
+
+    def __init__(
+        self, archive: ResponseArchive, transport: httpx.BaseTransport | None = None
+    ) -> None:
+        self.archive = archive
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        response = self.transport.handle_request(request)
+        body = response.read()
+        headers = {
+            name: response.headers[name]
+            for name in KEPT_HEADERS
+            if name in response.headers
+        }
+        self.archive.put(
+            _upc(request), RecordedResponse(response.status_code, body, headers)
+        )
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+def open_archive(
+    path: str | Path, record: bool = False
+) -> tuple[ResponseArchive, httpx.BaseTransport]:
+    """Open the archive at ``path`` and a transport that goes through it.
+
+    The transport replays responses from the archive, or with
+    ``record=True`` fetches from the network and adds each response to it.
+    Give it to a :class:`~csv_upc_omg.config.LookupConfig`. Close the
+    archive when done; a recording is not readable until it is closed.
+    """
+    archive = ResponseArchive(path, "a" if record else "r")
+    transport: httpx.BaseTransport = (
+        RecordingTransport(archive) if record else ReplayTransport(archive)
+    )
+    return archive, transport
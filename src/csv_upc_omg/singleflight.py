@@ -0,0 +1,61 @@
+"""Single-flight call coalescing: concurrent calls for one key share a result."""
+
+import threading
+from collections.abc import Callable, Hashable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: T | None = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight(Generic[T]):
+    """Run at most one call per key at a time, sharing its outcome.
+
+    The first caller for a key runs the function; callers arriving while it
+    is still running block until it finishes. They then receive the same
+    return value, or the same exception. Once the call finishes, the next
+    caller starts a fresh one, so nothing is cached.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call[T]] = {}
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> tuple[T, bool]:
+        """Call ``func`` for ``key`` unless a call is already in flight.
+
+        Args:
+            key: Identity of the call, e.g. the UPC being looked up
+            func: Zero-argument callable producing the result
+
+        Returns:
+            The result, and whether it was shared from another caller's call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True  # type: ignore[return-value]
+
+        try:
+            call.result = func()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
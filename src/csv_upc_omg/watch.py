@@ -0,0 +1,250 @@
+"""Incremental directory watching for newly dropped CSV files."""
+
+import json
+import os
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from stat import S_ISREG
+
+from .csv_utils import file_sha256
+
+
+@dataclass(frozen=True)
+class FileFingerprint:
+    """Identity of a processed file: location, size, mtime and content hash."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+class ProcessedFileIndex:
+    """Remembers which CSV files have already been processed.
+
+    Files are matched on (path, size, mtime) first, which costs a single
+    ``stat``; the content hash is only computed when those change, so a file
+    that was merely touched is not processed again.
+    """
+
+    def __init__(self, state_path: Path | None = None) -> None:
+        self.state_path = state_path
+        self._entries: dict[str, FileFingerprint] = {}
+        if state_path is not None and state_path.exists():
+            self._load(state_path)
+
+    def _load(self, state_path: Path) -> None:
+        try:
+            data = json.loads(state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            raise RuntimeError(f"Error reading watch state {state_path}: {e}") from e
+
+        for entry in data.get("files", []):
+            fingerprint = FileFingerprint(**entry)
+            self._entries[fingerprint.path] = fingerprint
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def needs_processing(self, csv_path: Path, stat: os.stat_result) -> bool:
+        """Return True if the file is new or its contents have changed."""
+        known = self._entries.get(str(csv_path))
+        if known is None:
+            return True
+        if known.size == stat.st_size and known.mtime_ns == stat.st_mtime_ns:
+            return False
+        if known.size == stat.st_size and known.sha256 == file_sha256(csv_path):
+            # Touched but unchanged; remember the new mtime to skip hashing.
+            self._entries[known.path] = FileFingerprint(
+                known.path, stat.st_size, stat.st_mtime_ns, known.sha256
+            )
+            return False
+        return True
+
+    def mark_processed(self, csv_path: Path) -> FileFingerprint:
+        """Record the current state of a file as processed."""
+        stat = csv_path.stat()
+        fingerprint = FileFingerprint(
+            str(csv_path), stat.st_size, stat.st_mtime_ns, file_sha256(csv_path)
+        )
+        self._entries[fingerprint.path] = fingerprint
+        return fingerprint
+
+    def save(self) -> None:
+        """Persist the index to its state file, if one was configured."""
+        if self.state_path is None:
+            return
+        data = {"files": [asdict(entry) for entry in self._entries.values()]}
+        tmp_path = self.state_path.with_suffix(self.state_path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        tmp_path.replace(self.state_path)
+
+
+def scan_for_new_csvs(directory: Path, index: ProcessedFileIndex) -> list[Path]:
+    """List CSV files in a directory that still need processing.
+
+    Args:
+        directory: Directory to scan
+        index: Index of files that were already processed
+
+    Returns:
+        Paths needing processing, oldest modification first
+    """
+    pending = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".csv") or not entry.is_file():
+                continue
+            stat = entry.stat()
+            csv_path = Path(entry.path)
+            if index.needs_processing(csv_path, stat):
+                pending.append((stat.st_mtime_ns, csv_path))
+
+    return [csv_path for _, csv_path in sorted(pending)]
+
+
+class _Settler:
+    """Holds back files until their size and mtime stop changing.
+
+    A file dropped into the directory may still be being written; it is
+    released once it has looked the same for ``quiet`` seconds.
+    """
+
+    def __init__(self, quiet: float) -> None:
+        self.quiet = quiet
+        self._waiting: dict[Path, tuple[tuple[int, int], float]] = {}
+
+    def add(self, paths: Iterable[Path]) -> None:
+        now = time.monotonic()
+        for path in paths:
+            if path not in self._waiting:
+                self._observe(path, now)
+
+    def _observe(self, path: Path, now: float) -> os.stat_result | None:
+        try:
+            stat = path.stat()
+        except OSError:
+            self._waiting.pop(path, None)
+            return None
+        signature = (stat.st_size, stat.st_mtime_ns)
+        known = self._waiting.get(path)
+        if known is None or known[0] != signature:
+            self._waiting[path] = (signature, now)
+        return stat
+
+    def ready(self) -> list[Path]:
+        """Files unchanged for ``quiet`` seconds, oldest modification first."""
+        now = time.monotonic()
+        settled = []
+        for path in list(self._waiting):
+            stat = self._observe(path, now)
+            if stat is not None and now - self._waiting[path][1] >= self.quiet:
+                del self._waiting[path]
+                settled.append((stat.st_mtime_ns, path))
+        return [path for _, path in sorted(settled)]
+
+
+def _changed_csvs(
+    directory: Path, changes: Iterable[tuple[object, str]], index: ProcessedFileIndex
+) -> list[Path]:
+    """The CSVs in ``directory`` among reported changes that need processing."""
+    resolved = directory.resolve()
+    changed = []
+    for _change, raw_path in changes:
+        reported = Path(raw_path)
+        if reported.suffix != ".csv" or reported.parent.resolve() != resolved:
+            continue
+        # Same form of the path as a scan gives, so the index matches.
+        csv_path = directory / reported.name
+        try:
+            stat = csv_path.stat()
+        except OSError:
+            continue  # Deleted or renamed away since.
+        if S_ISREG(stat.st_mode) and index.needs_processing(csv_path, stat):
+            changed.append(csv_path)
+    return changed
+
+
+def _poll_events(
+    directory: Path, interval: float, should_stop: Callable[[], bool]
+) -> Iterator[set | None]:
+    # Polling cannot tell what changed: None asks for a full rescan.
+    while not should_stop():
+        time.sleep(interval)
+        yield None
+
+
+def _inotify_events(
+    directory: Path, interval: float, should_stop: Callable[[], bool]
+) -> Iterator[set | None]:
+    import watchfiles
+
+    # Wakes up every interval even without changes (an empty set), so that
+    # files waiting to settle are checked again.
+    for changes in watchfiles.watch(
+        directory,
+        watch_filter=lambda _change, path: path.endswith(".csv"),
+        rust_timeout=int(interval * 1000),
+        yield_on_timeout=True,
+        recursive=False,
+    ):
+        if should_stop():
+            return
+        yield changes
+
+
+def watch_directory(
+    directory: str,
+    index: ProcessedFileIndex,
+    interval: float = 2.0,
+    use_inotify: bool | None = None,
+    should_stop: Callable[[], bool] = lambda: False,
+    settle: float = 1.0,
+) -> Iterator[Path]:
+    """Yield CSV files as they appear or change in a directory.
+
+    Files already present but not yet in the index are picked up first.
+    After that, only the files the filesystem reports as changed (via
+    ``watchfiles``/inotify when installed) are looked at; as a fallback, the
+    directory is rescanned every ``interval`` seconds. A file is only
+    yielded once its size and mtime have held still for ``settle`` seconds,
+    so one that is still being copied in is not read half-written.
+
+    Args:
+        directory: Directory to watch
+        index: Index of files that were already processed
+        interval: Polling interval (or inotify wake-up timeout) in seconds
+        use_inotify: Force or disable inotify; None picks it when available
+        should_stop: Callable checked between scans to end the watch
+        settle: Seconds a file must stay unchanged before it is yielded
+
+    Yields:
+        Paths of new or changed CSV files; callers should mark them processed
+    """
+    dir_path = Path(directory)
+    if not dir_path.is_dir():
+        raise NotADirectoryError(f"Path is not a directory: {directory}")
+
+    if use_inotify is None:
+        try:
+            import watchfiles  # noqa: F401
+
+            use_inotify = True
+        except ImportError:
+            use_inotify = False
+
+    events = (_inotify_events if use_inotify else _poll_events)(
+        dir_path, interval, should_stop
+    )
+
+    settler = _Settler(settle)
+    settler.add(scan_for_new_csvs(dir_path, index))
+    yield from settler.ready()
+    for changes in events:
+        if changes is None:
+            settler.add(scan_for_new_csvs(dir_path, index))
+        else:
+            settler.add(_changed_csvs(dir_path, changes, index))
+        yield from settler.ready()
@@ -0,0 +1,21 @@
+"""Shared fixtures for the test suite."""
+
+from collections.abc import Iterator
+
+import pytest
+
+from csv_upc_omg import barcode_lookup
+from csv_upc_omg.config import LookupConfig
+
+
+@pytest.fixture(autouse=True)
+def default_lookup_settings() -> Iterator[None]:
+    """Start every test with an empty cache and a fresh default config."""
+    barcode_lookup.clear_cache()
+    barcode_lookup.set_default_config(LookupConfig())
+    yield
+    barcode_lookup.configure_cache(
+        barcode_lookup.DEFAULT_CACHE_SIZE, barcode_lookup.DEFAULT_CACHE_TTL
+    )
+    barcode_lookup.set_default_config(LookupConfig()).close()
+    barcode_lookup.clear_cache()
@@ -0,0 +1,132 @@
+"""Tests for the adaptive module."""
+
+import threading
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from csv_upc_omg import metrics
+from csv_upc_omg.adaptive import AdaptiveLimiter
+from csv_upc_omg.barcode_lookup import BarcodeAPIError, fetch_product_title_sync
+from csv_upc_omg.config import LookupConfig
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _request(
+    limiter: AdaptiveLimiter,
+    clock: FakeClock,
+    seconds: float = 0.1,
+    overloaded: bool = False,
+) -> None:
+    with limiter.slot() as slot:
+        clock.now += seconds
+        slot.overloaded = overloaded
+
+
+def test_limit_grows_by_about_one_per_round() -> None:
+    """Test fast successes raise the limit additively, up to the maximum."""
+    clock = FakeClock()
+    limiter = AdaptiveLimiter(maximum=4, clock=clock)
+    assert limiter.limit == 1
+
+    _request(limiter, clock)
+    assert limiter.limit == 2
+    for _ in range(3):
+        _request(limiter, clock)
+    assert limiter.limit == 3
+
+    for _ in range(20):
+        _request(limiter, clock)
+    assert limiter.limit == 4
+
+
+def test_pushback_and_slow_responses_cut_the_limit() -> None:
+    """Test overload or latency past the target halves the limit."""
+    clock = FakeClock()
+    limiter = AdaptiveLimiter(maximum=16, initial=8, latency_target=1.0, clock=clock)
+
+    _request(limiter, clock, overloaded=True)
+    assert limiter.limit == 4
+    _request(limiter, clock, seconds=1.5)
+    assert limiter.limit == 2
+    _request(limiter, clock, overloaded=True)
+    _request(limiter, clock, overloaded=True)
+    assert limiter.limit == 1
+
+
+def test_requests_in_flight_during_a_cut_do_not_cut_again() -> None:
+    """Test one bad moment cuts the limit once, not once per request."""
+    clock = FakeClock()
+    limiter = AdaptiveLimiter(maximum=16, initial=8, clock=clock)
+
+    with limiter.slot() as first, limiter.slot() as second:
+        clock.now += 0.1
+        first.overloaded = second.overloaded = True
+
+    assert limiter.limit == 4
+
+
+def test_errors_without_pushback_leave_the_limit_alone() -> None:
+    """Test an ordinary failure neither grows nor cuts the limit."""
+    clock = FakeClock()
+    limiter = AdaptiveLimiter(maximum=8, initial=2, clock=clock)
+
+    with pytest.raises(RuntimeError), limiter.slot():
+        raise RuntimeError("parse failed")
+
+    assert (limiter.limit, limiter.in_flight) == (2, 0)
+
+
+def test_callers_wait_for_room_under_the_limit() -> None:
+    """Test a caller past the limit blocks until a slot frees up."""
+    limiter = AdaptiveLimiter(maximum=1)
+    entered = threading.Event()
+
+    def second() -> None:
+        with limiter.slot():
+            entered.set()
+
+    with limiter.slot():
+        thread = threading.Thread(target=second)
+        thread.start()
+        assert not entered.wait(0.05)
+    thread.join(1)
+    assert entered.is_set()
+
+
+def test_limiter_rejects_bad_bounds() -> None:
+    """Test the minimum must sit between 1 and the maximum."""
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(maximum=2, minimum=3)
+
+
+@patch("csv_upc_omg.barcode_lookup.httpx.Client")
+def test_fetch_reports_pushback_to_limiter(mock_client_class) -> None:
+    """Test a 429 cuts the shared limit and is published as a metric."""
+    response = httpx.Response(429, request=httpx.Request("GET", "https://x/"))
+    mock_client_class.return_value.stream.side_effect = httpx.HTTPStatusError(
+        "429", request=response.request, response=response
+    )
+    config = LookupConfig(limiter=AdaptiveLimiter(maximum=8, initial=4))
+    metrics.REGISTRY.reset()
+    metrics.enable()
+    try:
+        with pytest.raises(BarcodeAPIError) as excinfo:
+            fetch_product_title_sync("111111111111", config=config)
+        assert metrics.CONCURRENCY_LIMIT.value() == 2
+        assert "Concurrency limit: 2" in metrics.format_summary()
+    finally:
+        metrics.disable()
+        metrics.REGISTRY.reset()
+
+    assert excinfo.value.overloaded
+    assert config.limiter is not None
+    assert config.limiter.limit == 2
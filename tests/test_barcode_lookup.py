@@ -1,21 +1,64 @@
 """Tests for the barcode_lookup module."""
 
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, Mock, patch
 
 import httpx
 import pytest
 
 from csv_upc_omg.barcode_lookup import (
     BarcodeAPIError,
+    Validators,
+    cache_stats,
+    cached_title,
+    configure_cache,
+    fetch_product_page,
     fetch_product_title_sync,
+    parse_product_title,
+    set_default_config,
 )
+from csv_upc_omg.config import LookupConfig
+
+
+def _page(html: str = "", status_code: int = 200) -> httpx.Response:
+    request = httpx.Request("GET", "https://www.barcodelookup.com/")
+    return httpx.Response(status_code, text=html, request=request)
+
+
+def _serve(mock_client_class: MagicMock, html: str = "") -> MagicMock:
+    """Have the patched client stream ``html`` back; return the client mock."""
+    mock_client = MagicMock()
+    mock_client.stream.return_value.__enter__.return_value = _page(html)
+    mock_client_class.return_value = mock_client
+    return mock_client
+
+
+def _serve_chunks(
+    mock_client_class: MagicMock,
+    chunks: list[bytes],
+    headers: dict[str, str] | None = None,
+) -> list[bytes]:
+    """Have the patched client stream ``chunks``; return those actually read."""
+    read = []
+
+    class Chunks(httpx.SyncByteStream):
+        def __iter__(self):
+            for chunk in chunks:
+                read.append(chunk)
+                yield chunk
+
+    mock_client = _serve(mock_client_class)
+    mock_client.stream.return_value.__enter__.return_value = httpx.Response(
+        200, headers=headers, stream=Chunks(), request=_page().request
+    )
+    return read
 
 
 @patch("csv_upc_omg.barcode_lookup.httpx.Client")
 def test_fetch_product_title_sync_success(mock_client_class):
     """Test successful product title fetch."""
-    mock_response = Mock()
-    mock_response.text = """
+    mock_client = _serve(
+        mock_client_class,
+        """
     <html>
         <body>
             <div class="product-details">
@@ -23,19 +66,15 @@ def test_fetch_product_title_sync_success(mock_client_class):
             </div>
         </body>
     </html>
-    """
-    mock_response.raise_for_status.return_value = None
-
-    mock_client = Mock()
-    mock_client.get.return_value = mock_response
-    mock_client_class.return_value.__enter__.return_value = mock_client
+    """,
+    )
 
     result = fetch_product_title_sync("123456789012")
     assert result == "Test Product Name"
-    mock_client.get.assert_called_once()
+    mock_client.stream.assert_called_once()
     # Verify URL and headers were passed
-    call_args = mock_client.get.call_args
-    assert call_args[0][0] == "https://www.barcodelookup.com/123456789012"
+    call_args = mock_client.stream.call_args
+    assert call_args[0] == ("GET", "https://www.barcodelookup.com/123456789012")
     assert "headers" in call_args[1]
     assert "User-Agent" in call_args[1]["headers"]
 
@@ -43,19 +82,16 @@ def test_fetch_product_title_sync_success(mock_client_class):
 @patch("csv_upc_omg.barcode_lookup.httpx.Client")
 def test_fetch_product_title_sync_selector_not_found(mock_client_class):
     """Test when .product-details h4 selector is not found."""
-    mock_response = Mock()
-    mock_response.text = """
+    _serve(
+        mock_client_class,
+        """
     <html>
         <body>
             <h1>Some Other Title</h1>
         </body>
     </html>
-    """
-    mock_response.raise_for_status.return_value = None
-
-    mock_client = Mock()
-    mock_client.get.return_value = mock_response
-    mock_client_class.return_value.__enter__.return_value = mock_client
+    """,
+    )
 
     result = fetch_product_title_sync("123456789012")
     assert result is None
@@ -64,19 +100,16 @@ def test_fetch_product_title_sync_selector_not_found(mock_client_class):
 @patch("csv_upc_omg.barcode_lookup.httpx.Client")
 def test_fetch_product_title_sync_no_selector_match(mock_client_class):
     """Test when .product-details h4 selector doesn't match anything."""
-    mock_response = Mock()
-    mock_response.text = """
+    _serve(
+        mock_client_class,
+        """
     <html>
         <body>
             <p>No product information available</p>
         </body>
     </html>
-    """
-    mock_response.raise_for_status.return_value = None
-
-    mock_client = Mock()
-    mock_client.get.return_value = mock_response
-    mock_client_class.return_value.__enter__.return_value = mock_client
+    """,
+    )
 
     result = fetch_product_title_sync("123456789012")
     assert result is None
@@ -88,11 +121,10 @@ def test_fetch_product_title_sync_404_error(mock_client_class):
     mock_response = Mock()
     mock_response.status_code = 404
 
-    mock_client = Mock()
-    mock_client.get.side_effect = httpx.HTTPStatusError(
+    mock_client = _serve(mock_client_class)
+    mock_client.stream.side_effect = httpx.HTTPStatusError(
         "404 Not Found", request=Mock(), response=mock_response
     )
-    mock_client_class.return_value.__enter__.return_value = mock_client
 
     result = fetch_product_title_sync("123456789012")
     assert result is None
@@ -104,11 +136,10 @@ def test_fetch_product_title_sync_http_error(mock_client_class):
     mock_response = Mock()
     mock_response.status_code = 500
 
-    mock_client = Mock()
-    mock_client.get.side_effect = httpx.HTTPStatusError(
+    mock_client = _serve(mock_client_class)
+    mock_client.stream.side_effect = httpx.HTTPStatusError(
         "500 Server Error", request=Mock(), response=mock_response
     )
-    mock_client_class.return_value.__enter__.return_value = mock_client
 
     with pytest.raises(BarcodeAPIError, match="HTTP error 500"):
         fetch_product_title_sync("123456789012")
@@ -117,9 +148,8 @@ def test_fetch_product_title_sync_http_error(mock_client_class):
 @patch("csv_upc_omg.barcode_lookup.httpx.Client")
 def test_fetch_product_title_sync_timeout(mock_client_class):
     """Test handling of timeout errors."""
-    mock_client = Mock()
-    mock_client.get.side_effect = httpx.TimeoutException("Timeout")
-    mock_client_class.return_value.__enter__.return_value = mock_client
+    mock_client = _serve(mock_client_class)
+    mock_client.stream.side_effect = httpx.TimeoutException("Timeout")
 
     with pytest.raises(BarcodeAPIError, match="Timeout while fetching"):
         fetch_product_title_sync("123456789012")
@@ -128,9 +158,8 @@ def test_fetch_product_title_sync_timeout(mock_client_class):
 @patch("csv_upc_omg.barcode_lookup.httpx.Client")
 def test_fetch_product_title_sync_generic_error(mock_client_class):
     """Test handling of generic errors."""
-    mock_client = Mock()
-    mock_client.get.side_effect = Exception("Something went wrong")
-    mock_client_class.return_value.__enter__.return_value = mock_client
+    mock_client = _serve(mock_client_class)
+    mock_client.stream.side_effect = Exception("Something went wrong")
 
     with pytest.raises(BarcodeAPIError, match="Error fetching product"):
         fetch_product_title_sync("123456789012")
@@ -139,8 +168,9 @@ def test_fetch_product_title_sync_generic_error(mock_client_class):
 @patch("csv_upc_omg.barcode_lookup.httpx.Client")
 def test_fetch_product_title_sync_empty_title(mock_client_class):
     """Test when h4 element exists but is empty."""
-    mock_response = Mock()
-    mock_response.text = """
+    _serve(
+        mock_client_class,
+        """
     <html>
         <body>
             <div class="product-details">
@@ -148,12 +178,8 @@ def test_fetch_product_title_sync_empty_title(mock_client_class):
             </div>
         </body>
     </html>
-    """
-    mock_response.raise_for_status.return_value = None
-
-    mock_client = Mock()
-    mock_client.get.return_value = mock_response
-    mock_client_class.return_value.__enter__.return_value = mock_client
+    """,
+    )
 
     result = fetch_product_title_sync("123456789012")
     assert result == ""
@@ -162,8 +188,9 @@ def test_fetch_product_title_sync_empty_title(mock_client_class):
 @patch("csv_upc_omg.barcode_lookup.httpx.Client")
 def test_fetch_product_title_sync_whitespace_only(mock_client_class):
     """Test when h4 element contains only whitespace."""
-    mock_response = Mock()
-    mock_response.text = """
+    _serve(
+        mock_client_class,
+        """
     <html>
         <body>
             <div class="product-details">
@@ -171,12 +198,8 @@ def test_fetch_product_title_sync_whitespace_only(mock_client_class):
             </div>
         </body>
     </html>
-    """
-    mock_response.raise_for_status.return_value = None
-
-    mock_client = Mock()
-    mock_client.get.return_value = mock_response
-    mock_client_class.return_value.__enter__.return_value = mock_client
+    """,
+    )
 
     result = fetch_product_title_sync("123456789012")
     assert result == ""
@@ -185,8 +208,9 @@ def test_fetch_product_title_sync_whitespace_only(mock_client_class):
 @patch("csv_upc_omg.barcode_lookup.httpx.Client")
 def test_fetch_product_title_sync_custom_timeout(mock_client_class):
     """Test custom timeout parameter."""
-    mock_response = Mock()
-    mock_response.text = """
+    _serve(
+        mock_client_class,
+        """
     <html>
         <body>
             <div class="product-details">
@@ -194,15 +218,189 @@ def test_fetch_product_title_sync_custom_timeout(mock_client_class):
             </div>
         </body>
     </html>
-    """
-    mock_response.raise_for_status.return_value = None
-
-    mock_client = Mock()
-    mock_client.get.return_value = mock_response
-    mock_client_class.return_value.__enter__.return_value = mock_client
+    """,
+    )
 
     result = fetch_product_title_sync("123456789012", timeout=5.0)
     assert result == "Test Product"
 
-    # Verify timeout was passed to client
-    mock_client_class.assert_called_once_with(timeout=5.0)
+    # Verify timeout was passed with the request
+    assert mock_client_class.return_value.stream.call_args[1]["timeout"] == 5.0
+
+
+def test_parse_product_title():
+    """Test parsing a title directly from page HTML."""
+    html = '<div class="product-details"><h4> Parsed Product </h4></div>'
+    assert parse_product_title(html) == "Parsed Product"
+    assert parse_product_title("<html><body></body></html>") is None
+
+
+@patch("csv_upc_omg.barcode_lookup.httpx.Client")
+def test_fetch_product_title_sync_caches_results(mock_client_class):
+    """Test repeat lookups are served from the cache, errors are not cached."""
+    mock_client = _serve(mock_client_class)
+    mock_client.stream.return_value.__enter__.side_effect = [
+        _page('<div class="product-details"><h4>Widget</h4></div>'),
+        httpx.TimeoutException("Timeout"),
+        _page("<html></html>"),
+    ]
+
+    assert fetch_product_title_sync("111111111111") == "Widget"
+    assert fetch_product_title_sync("111111111111") == "Widget"
+    with pytest.raises(BarcodeAPIError):
+        fetch_product_title_sync("222222222222")
+    assert fetch_product_title_sync("222222222222") is None
+    assert fetch_product_title_sync("222222222222") is None
+
+    assert mock_client.stream.call_count == 3
+    stats = cache_stats()
+    assert (stats.hits, stats.misses, stats.size) == (2, 3, 2)
+
+
+@patch("csv_upc_omg.barcode_lookup.httpx.Client")
+def test_fetch_product_title_sync_cache_disabled(mock_client_class):
+    """Test a zero-size cache sends every lookup to the network."""
+    mock_client = _serve(mock_client_class, "<html></html>")
+
+    configure_cache(maxsize=0)
+    fetch_product_title_sync("111111111111")
+    fetch_product_title_sync("111111111111")
+
+    assert mock_client.stream.call_count == 2
+    assert cache_stats().misses == 0
+
+
+def test_fetch_product_page_revalidates() -> None:
+    """Test validators are sent back and a 304 keeps them without parsing."""
+    seen = []
+
+    def site(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(
+            200,
+            headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Jun 2026 00:00:00 GMT"},
+            text='<div class="product-details"><h4>Widget</h4></div>',
+        )
+
+    set_default_config(LookupConfig(transport=httpx.MockTransport(site)))
+    first = fetch_product_page("111111111111")
+    second = fetch_product_page("111111111111", validators=first.validators)
+
+    assert first.title == "Widget"
+    assert not first.not_modified
+    assert first.validators == Validators('"v1"', "Mon, 01 Jun 2026 00:00:00 GMT")
+    assert "If-None-Match" not in seen[0]
+    assert seen[1]["If-Modified-Since"] == "Mon, 01 Jun 2026 00:00:00 GMT"
+    assert second.not_modified
+    assert second.title is None
+    assert second.validators == first.validators
+    assert cached_title("111111111111") == (True, "Widget")
+
+
+@patch("csv_upc_omg.barcode_lookup.httpx.Client")
+def test_fetch_product_page_404(mock_client_class):
+    """Test a missing product is a page without a title or validators."""
+    mock_client = _serve(mock_client_class)
+    mock_client.stream.return_value.__enter__.return_value = _page(status_code=404)
+
+    page = fetch_product_page("000000000000")
+
+    assert page.title is None
+    assert not page.validators
+
+
+@patch("csv_upc_omg.barcode_lookup.httpx.Client")
+def test_fetch_stops_reading_after_title(mock_client_class):
+    """Test the body is not read past the closing title tag."""
+    chunks = [
+        b'<div class="product-',
+        b'details"><h4>Widget</',
+        b"h4></div>",
+        b"<footer>never read</footer>",
+    ]
+    read = _serve_chunks(mock_client_class, chunks)
+
+    assert fetch_product_title_sync("111111111111") == "Widget"
+    assert read == chunks[:3]
+
+
+@patch("csv_upc_omg.barcode_lookup.httpx.Client")
+def test_fetch_drains_small_remainder(mock_client_class):
+    """Test a small rest of the page is read so the connection is kept."""
+    chunks = [
+        b'<div class="product-details"><h4>Widget</h4></div>',
+        b"<footer>small</footer>",
+    ]
+    length = str(sum(len(chunk) for chunk in chunks))
+    read = _serve_chunks(mock_client_class, chunks, {"Content-Length": length})
+
+    assert fetch_product_title_sync("111111111111") == "Widget"
+    assert read == chunks
+
+
+@patch("csv_upc_omg.barcode_lookup.httpx.Client")
+def test_fetch_leaves_large_remainder_unread(mock_client_class):
+    """Test a large rest of the page is not downloaded just to keep the connection."""
+    chunks = [
+        b'<div class="product-details"><h4>Widget</h4></div>',
+        b"x" * (128 * 1024),
+    ]
+    length = str(sum(len(chunk) for chunk in chunks))
+    read = _serve_chunks(mock_client_class, chunks, {"Content-Length": length})
+
+    assert fetch_product_title_sync("111111111111") == "Widget"
+    assert read == chunks[:1]
+
+
+@patch("csv_upc_omg.barcode_lookup.httpx.Client")
+def test_fetch_ignores_product_details_outside_class(mock_client_class):
+    """Test a stylesheet URL and a nav heading do not end the read early."""
+    _serve_chunks(
+        mock_client_class,
+        [
+            b'<link href="/css/product-details.css"><nav><h4>Menu</h4></nav>',
+            b'<div class="product-details"><h4>Widget</h4></div>',
+        ],
+    )
+
+    assert fetch_product_title_sync("111111111111") == "Widget"
+
+
+@patch("csv_upc_omg.barcode_lookup.httpx.Client")
+def test_fetch_keeps_reading_when_early_parse_finds_nothing(mock_client_class):
+    """Test a false early stop reads on instead of reporting not found."""
+    chunks = [
+        b'<span class="product-details">x</span><h4>Menu</h4>',
+        b"<p>more</p>",
+        b'<div class="product-details"><h4>Widget</h4></div>',
+        b"<footer>never read</footer>",
+    ]
+    read = _serve_chunks(mock_client_class, chunks)
+
+    assert fetch_product_title_sync("111111111111") == "Widget"
+    assert read == chunks[:3]
+
+
+@patch("csv_upc_omg.barcode_lookup.httpx.Client")
+def test_fetch_aborts_at_byte_limit(mock_client_class):
+    """Test pages past the byte limit without a title fail, not 'not found'."""
+    _serve(mock_client_class, "<html>" + "x" * 5000)
+    config = LookupConfig(max_response_bytes=1000)
+    with pytest.raises(BarcodeAPIError, match="exceeded 1000 bytes"):
+        fetch_product_title_sync("111111111111", config=config)
+
+
+@patch("csv_upc_omg.barcode_lookup.httpx.Client")
+def test_fetch_decodes_declared_charset(mock_client_class):
+    """Test pages are decoded with the charset from Content-Type."""
+    mock_client = _serve(mock_client_class)
+    mock_client.stream.return_value.__enter__.return_value = httpx.Response(
+        200,
+        headers={"Content-Type": "text/html; charset=latin-1"},
+        content='<div class="product-details"><h4>Café</h4></div>'.encode("latin-1"),
+        request=_page().request,
+    )
+
+    assert fetch_product_title_sync("111111111111") == "Café"
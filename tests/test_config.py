@@ -0,0 +1,70 @@
+"""Tests for the config module."""
+
+import importlib.util
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from csv_upc_omg.barcode_lookup import Validators, fetch_product_page
+from csv_upc_omg.config import BASE_HEADERS, LookupConfig
+
+
+def test_headers_are_built_once_and_rotate() -> None:
+    """Test each request gets the next user agent's prebuilt header set."""
+    config = LookupConfig(user_agents=("first", "second"))
+
+    sent = [config.headers() for _ in range(3)]
+
+    assert [headers["User-Agent"] for headers in sent] == ["first", "second", "first"]
+    assert sent[0] is sent[2]
+    assert sent[0].items() >= BASE_HEADERS.items()
+
+
+def test_config_requires_a_user_agent() -> None:
+    """Test an empty user agent list is rejected up front."""
+    with pytest.raises(ValueError, match="user agent"):
+        LookupConfig(user_agents=())
+
+
+def test_http2_requires_h2(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test asking for HTTP/2 without the h2 package fails at build time."""
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+    with pytest.raises(ValueError, match="http2"):
+        LookupConfig(http2=True)
+
+
+@patch("csv_upc_omg.barcode_lookup.httpx.Client")
+def test_client_is_built_once(mock_client_class) -> None:
+    """Test the client is created lazily, reused, and rebuilt after close."""
+    config = LookupConfig(proxy="http://proxy:3128", max_connections=4)
+    mock_client_class.assert_not_called()
+
+    assert config.client() is config.client()
+    mock_client_class.assert_called_once()
+    options = mock_client_class.call_args[1]
+    assert options["proxy"] == "http://proxy:3128"
+    assert options["limits"] == httpx.Limits(
+        max_connections=4, max_keepalive_connections=10
+    )
+
+    config.close()
+    mock_client_class.return_value.close.assert_called_once()
+    config.client()
+    assert mock_client_class.call_count == 2
+
+
+def test_conditional_headers_leave_shared_headers_alone() -> None:
+    """Test validators are sent without changing the prebuilt header set."""
+    seen = []
+
+    def site(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers)
+        return httpx.Response(304)
+
+    config = LookupConfig(transport=httpx.MockTransport(site))
+    fetch_product_page("111111111111", validators=Validators('"v1"'), config=config)
+    config.close()
+
+    assert seen[0]["If-None-Match"] == '"v1"'
+    assert "If-None-Match" not in config.headers()
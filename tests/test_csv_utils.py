@@ -5,7 +5,15 @@ from pathlib import Path
 
 import pytest
 
-from csv_upc_omg.csv_utils import extract_upcs_from_csv, find_most_recent_csv
+from csv_upc_omg.csv_utils import (
+    IncrementalUPCParser,
+    extract_upcs_from_csv,
+    extract_upcs_from_csvs,
+    file_sha256,
+    find_csv_files,
+    find_most_recent_csv,
+    iter_upcs_from_csv,
+)
 
 
 def test_find_most_recent_csv_no_files() -> None:
@@ -105,6 +113,42 @@ def test_extract_upcs_whitespace_handling() -> None:
         assert result == ["123456789012", "987654321098"]
 
 
+def test_iter_upcs_streams_rows() -> None:
+    """Test iter_upcs_from_csv yields UPCs lazily in file order."""
+    with tempfile.NamedTemporaryFile(
+        mode="w", suffix=".csv", delete=False
+    ) as temp_file:
+        temp_file.write("123456789012,Product A\n,Empty\n987654321098,Product B")
+        temp_file.flush()
+
+        upcs = iter_upcs_from_csv(Path(temp_file.name))
+        assert next(upcs) == "123456789012"
+        assert list(upcs) == ["987654321098"]
+
+
+TRICKY_CSV = (
+    b'123,a\n456,b\r\n"789","multi\nline"\n12" x,y\n,empty\n\n'
+    b'  333  ,z\r"q""uote",1\n"a\r\nb",c\n\xc3\xa9111,\xe2\x82\xac\nlast'
+)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+def test_incremental_parser_matches_extract(chunk_size: int) -> None:
+    """Test chunked parsing yields the same UPCs as reading the whole file."""
+    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as temp_file:
+        temp_file.write(TRICKY_CSV)
+
+    parser = IncrementalUPCParser()
+    upcs = []
+    for start in range(0, len(TRICKY_CSV), chunk_size):
+        upcs.extend(parser.feed(TRICKY_CSV[start : start + chunk_size]))
+    upcs.extend(parser.close())
+
+    assert upcs == extract_upcs_from_csv(Path(temp_file.name))
+    assert upcs[-1] == "last"
+    assert parser.rows == 11
+
+
 def test_extract_upcs_nonexistent_file() -> None:
     """Test extracting UPCs from nonexistent file."""
     with pytest.raises(FileNotFoundError):
@@ -130,3 +174,54 @@ def test_extract_upcs_permission_error() -> None:
         # Restore permissions for cleanup
         csv_path.chmod(0o666)
         csv_path.unlink()
+
+
+def test_file_sha256_matches_hashlib() -> None:
+    """Test that file_sha256 hashes the full file contents."""
+    import hashlib
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_path = Path(temp_dir) / "test.csv"
+        csv_path.write_bytes(b"123456789012\n" * 1000)
+
+        expected = hashlib.sha256(csv_path.read_bytes()).hexdigest()
+        assert file_sha256(csv_path, chunk_size=7) == expected
+
+
+def test_find_csv_files_with_pattern() -> None:
+    """Test finding all CSV files, including via recursive patterns."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        (root / "b.csv").write_text("1")
+        (root / "a.csv").write_text("2")
+        (root / "nested").mkdir()
+        (root / "nested" / "c.csv").write_text("3")
+
+        assert find_csv_files(temp_dir) == [root / "a.csv", root / "b.csv"]
+        assert root / "nested" / "c.csv" in find_csv_files(temp_dir, "**/*.csv")
+
+
+def test_find_csv_files_nonexistent_directory() -> None:
+    """Test finding CSV files in nonexistent or non-directory paths."""
+    with pytest.raises(FileNotFoundError):
+        find_csv_files("/nonexistent/directory")
+
+    with tempfile.NamedTemporaryFile() as temp_file:
+        with pytest.raises(NotADirectoryError):
+            find_csv_files(temp_file.name)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_extract_upcs_from_csvs(workers: int) -> None:
+    """Test extracting UPCs from many files serially and in parallel."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = []
+        for i in range(3):
+            csv_path = Path(temp_dir) / f"file{i}.csv"
+            csv_path.write_text(f"{i}00000000001\n{i}00000000002\n")
+            paths.append(csv_path)
+
+        result = extract_upcs_from_csvs(paths, workers=workers)
+
+        assert list(result) == paths
+        assert result[paths[1]] == ["100000000001", "100000000002"]
@@ -0,0 +1,35 @@
+"""Tests for the deadline module."""
+
+from csv_upc_omg.deadline import Deadline
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_no_deadline_never_expires() -> None:
+    """Test Deadline(None) leaves timeouts alone."""
+    deadline = Deadline(None)
+    assert deadline.remaining() is None
+    assert not deadline.expired
+    assert deadline.clamp(10.0) == 10.0
+
+
+def test_deadline_counts_down_and_clamps() -> None:
+    """Test the remaining budget shrinks timeouts and then expires."""
+    clock = FakeClock()
+    deadline = Deadline(5.0, clock=clock)
+    assert deadline.clamp(10.0) == 5.0
+    assert deadline.clamp(2.0) == 2.0
+
+    clock.now = 103.0
+    assert deadline.remaining() == 2.0
+    assert not deadline.expired
+
+    clock.now = 106.0
+    assert deadline.remaining() == 0.0
+    assert deadline.expired
@@ -0,0 +1,67 @@
+"""Tests for the lru module."""
+
+from csv_upc_omg.lru import TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_evicts_least_recently_used() -> None:
+    """Test reading an entry protects it from eviction."""
+    cache: TTLCache[str] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    cache.get("a")
+    cache.set("c", "C")
+
+    assert cache.get("a") == (True, "A")
+    assert cache.get("b") == (False, None)
+    assert cache.get("c") == (True, "C")
+
+
+def test_entries_expire_after_ttl() -> None:
+    """Test an entry older than the TTL is a miss and is dropped."""
+    clock = FakeClock()
+    cache: TTLCache[str | None] = TTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set("a", None)
+    clock.now = 4.9
+    assert cache.get("a") == (True, None)
+    clock.now = 5.0
+    assert cache.get("a") == (False, None)
+    assert cache.stats().size == 0
+
+
+def test_stats_and_clear() -> None:
+    """Test hits and misses are counted and reset by clear."""
+    cache: TTLCache[int] = TTLCache(maxsize=10, ttl=60)
+    assert cache.stats().hit_ratio is None
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size, stats.maxsize) == (1, 1, 1, 10)
+    assert stats.hit_ratio == 0.5
+
+    cache.clear()
+    assert cache.stats() == type(stats)(0, 0, 0, 10)
+
+
+def test_configure_shrinks_and_disables() -> None:
+    """Test shrinking evicts the oldest entries and size 0 stores nothing."""
+    cache: TTLCache[int] = TTLCache(maxsize=3, ttl=60)
+    for key in "abc":
+        cache.set(key, 1)
+    cache.configure(maxsize=1, ttl=30)
+    assert cache.get("c") == (True, 1)
+    assert cache.stats().size == 1
+    assert cache.ttl == 30
+
+    cache.configure(maxsize=0)
+    cache.set("d", 1)
+    assert cache.stats().size == 0
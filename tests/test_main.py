@@ -1,8 +1,9 @@
 """Tests for the main module."""
 
+import json
 import tempfile
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import ANY, patch
 
 from click.testing import CliRunner
 
@@ -99,7 +100,7 @@ def test_titles_command_with_csv() -> None:
 
             assert result.exit_code == 0
             assert "123456789012: Test Product Title" in result.output
-            mock_fetch.assert_called_once_with("123456789012", timeout=10.0)
+            mock_fetch.assert_called_once_with("123456789012", timeout=10.0, config=ANY)
 
 
 def test_titles_command_product_not_found() -> None:
@@ -171,7 +172,7 @@ def test_titles_command_custom_timeout() -> None:
             result = runner.invoke(cli, ["titles", temp_dir, "--timeout", "5.0"])
 
             assert result.exit_code == 0
-            mock_fetch.assert_called_once_with("123456789012", timeout=5.0)
+            mock_fetch.assert_called_once_with("123456789012", timeout=5.0, config=ANY)
 
 
 def test_upcs_command_empty_csv() -> None:
@@ -318,3 +319,432 @@ def test_titles_command_directory_error() -> None:
 
             assert result.exit_code == 1
             assert "Error: Not a directory" in result.output
+
+
+def test_watch_once_processes_only_new_files() -> None:
+    """Test watch --once skips files recorded in the state file."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        (Path(temp_dir) / "first.csv").write_text("123456789012\n")
+
+        result = runner.invoke(cli, ["watch", temp_dir, "--once"])
+        assert result.exit_code == 0
+        assert "123456789012" in result.output
+
+        (Path(temp_dir) / "second.csv").write_text("987654321098\n")
+        result = runner.invoke(cli, ["watch", temp_dir, "--once", "--verbose"])
+        assert result.exit_code == 0
+        assert "123456789012" not in result.output
+        assert "Processing new CSV" in result.output
+        assert "987654321098" in result.output
+
+
+def test_watch_once_with_titles() -> None:
+    """Test watch --titles looks up titles for new files."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        (Path(temp_dir) / "first.csv").write_text("123456789012\n")
+        state_file = Path(temp_dir) / "state" / "watch.json"
+        state_file.parent.mkdir()
+
+        with patch("csv_upc_omg.main.fetch_product_title_sync") as mock_fetch:
+            mock_fetch.return_value = "Watched Product"
+            result = runner.invoke(
+                cli,
+                ["watch", temp_dir, "--once", "--titles", "--state-file", state_file],
+            )
+
+        assert result.exit_code == 0
+        assert "123456789012: Watched Product" in result.output
+        assert state_file.exists()
+
+
+def test_watch_streams_until_interrupted() -> None:
+    """Test watch mode saves state when interrupted."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_path = Path(temp_dir) / "first.csv"
+        csv_path.write_text("123456789012\n")
+
+        def fake_watch(directory, index, interval, settle):
+            assert settle == 0.5
+            yield csv_path
+            raise KeyboardInterrupt
+
+        with patch("csv_upc_omg.main.watch_directory", side_effect=fake_watch):
+            result = runner.invoke(cli, ["watch", temp_dir, "--settle", "0.5"])
+
+        assert result.exit_code == 0
+        assert "123456789012" in result.output
+        assert (Path(temp_dir) / ".csv-upc-omg-watch.json").exists()
+
+
+def test_watch_error() -> None:
+    """Test watch aborts on a corrupt state file."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        (Path(temp_dir) / ".csv-upc-omg-watch.json").write_text("{bad")
+        result = runner.invoke(cli, ["watch", temp_dir, "--once"])
+
+        assert result.exit_code == 1
+        assert "Error watching directory" in result.output
+
+
+def test_upcs_all_files() -> None:
+    """Test upcs --all emits results for every CSV."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        (Path(temp_dir) / "a.csv").write_text("111111111111\n")
+        (Path(temp_dir) / "b.csv").write_text("222222222222\n")
+
+        result = runner.invoke(cli, ["upcs", temp_dir, "--all", "--workers", "1"])
+
+        assert result.exit_code == 0
+        assert "a.csv <==" in result.output
+        assert "b.csv <==" in result.output
+        assert "111111111111" in result.output
+        assert "222222222222" in result.output
+
+
+def test_all_files_no_csv_files() -> None:
+    """Test --all reports an empty directory on stderr."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for command in (["upcs"], ["titles", "--format", "jsonl"]):
+            result = runner.invoke(cli, [*command, temp_dir, "--all"])
+
+            assert result.exit_code == 0
+            assert result.stdout == ""
+            assert "No CSV files found" in result.stderr
+
+
+def test_titles_all_files_dedups_lookups() -> None:
+    """Test titles --glob looks up shared UPCs once and writes per-file output."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        (Path(temp_dir) / "a.csv").write_text("111111111111\n222222222222\n")
+        (Path(temp_dir) / "b.csv").write_text("222222222222\n")
+        output_dir = Path(temp_dir) / "out"
+
+        with patch("csv_upc_omg.main.fetch_product_title_sync") as mock_fetch:
+            mock_fetch.return_value = "Shared Product"
+            result = runner.invoke(
+                cli,
+                [
+                    "titles",
+                    temp_dir,
+                    "--glob",
+                    "*.csv",
+                    "--workers",
+                    "1",
+                    "--output-dir",
+                    str(output_dir),
+                    "--verbose",
+                ],
+            )
+
+        assert result.exit_code == 0
+        assert "Found 2 unique UPCs" in result.output
+        assert mock_fetch.call_count == 2
+        assert (output_dir / "a.txt").read_text() == (
+            "111111111111: Shared Product\n222222222222: Shared Product\n"
+        )
+        assert (output_dir / "b.txt").read_text() == "222222222222: Shared Product\n"
+
+
+def test_titles_all_files_verbose_error() -> None:
+    """Test titles --all reports lookup errors on stderr in verbose mode."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        (Path(temp_dir) / "a.csv").write_text("111111111111\n")
+
+        with patch("csv_upc_omg.main.fetch_product_title_sync") as mock_fetch:
+            from csv_upc_omg.barcode_lookup import BarcodeAPIError
+
+            mock_fetch.side_effect = BarcodeAPIError("API Error")
+            result = runner.invoke(cli, ["titles", temp_dir, "--all", "--verbose"])
+
+        assert result.exit_code == 0
+        assert "111111111111: Error - API Error" in result.output
+
+
+def test_titles_jsonl_output_file() -> None:
+    """Test titles --format jsonl --output writes structured results."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_path = Path(temp_dir) / "test.csv"
+        csv_path.write_text("123456789012\n987654321098\n")
+        output = Path(temp_dir) / "results.jsonl"
+
+        with patch("csv_upc_omg.main.fetch_product_title_sync") as mock_fetch:
+            mock_fetch.side_effect = ["Test Product Title", None]
+            result = runner.invoke(
+                cli,
+                [
+                    "titles",
+                    temp_dir,
+                    "--format",
+                    "jsonl",
+                    "--output",
+                    str(output),
+                    "--verbose",
+                ],
+            )
+
+        assert result.exit_code == 0
+        rows = [json.loads(line) for line in output.read_text().splitlines()]
+        assert rows[0]["title"] == "Test Product Title"
+        assert rows[1]["status"] == "not_found"
+
+
+def test_titles_csv_to_stdout_keeps_stdout_clean() -> None:
+    """Test structured stdout output is not mixed with progress messages."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        (Path(temp_dir) / "test.csv").write_text("123456789012\n")
+
+        with patch("csv_upc_omg.main.fetch_product_title_sync") as mock_fetch:
+            mock_fetch.return_value = "Test Product Title"
+            result = runner.invoke(
+                cli, ["titles", temp_dir, "--format", "csv", "--verbose"]
+            )
+
+        assert result.exit_code == 0
+        assert result.stdout.splitlines() == [
+            "upc,title,status,error",
+            "123456789012,Test Product Title,success,",
+        ]
+        assert "Processing most recent CSV" in result.stderr
+
+
+def test_titles_parquet_requires_output() -> None:
+    """Test Parquet to stdout is a usage error."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        (Path(temp_dir) / "test.csv").write_text("123456789012\n")
+
+        with patch("csv_upc_omg.main.fetch_product_title_sync"):
+            result = runner.invoke(cli, ["titles", temp_dir, "--format", "parquet"])
+
+        assert result.exit_code == 2
+        assert "--output" in result.output
+
+
+def test_titles_all_files_jsonl_per_file() -> None:
+    """Test --all with --output-dir writes one structured file per CSV."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        (Path(temp_dir) / "a.csv").write_text("111111111111\n")
+        output_dir = Path(temp_dir) / "out"
+
+        with patch("csv_upc_omg.main.fetch_product_title_sync") as mock_fetch:
+            mock_fetch.return_value = "Widget"
+            result = runner.invoke(
+                cli,
+                [
+                    "titles",
+                    temp_dir,
+                    "--all",
+                    "--format",
+                    "jsonl",
+                    "--output-dir",
+                    str(output_dir),
+                ],
+            )
+
+        assert result.exit_code == 0
+        row = json.loads((output_dir / "a.jsonl").read_text())
+        assert row["title"] == "Widget"
+
+
+def test_titles_all_files_jsonl_includes_source() -> None:
+    """Test --all to a single stream tags rows with their source file."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_path = Path(temp_dir) / "a.csv"
+        csv_path.write_text("111111111111\n")
+
+        with patch("csv_upc_omg.main.fetch_product_title_sync") as mock_fetch:
+            mock_fetch.return_value = "Widget"
+            result = runner.invoke(
+                cli, ["titles", temp_dir, "--all", "--format", "jsonl"]
+            )
+
+        assert result.exit_code == 0
+        row = json.loads(result.stdout)
+        assert row["source"] == str(csv_path)
+
+
+def test_titles_all_files_verbose_keeps_stdout_clean() -> None:
+    """Test --all -v keeps progress messages out of structured stdout."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        (Path(temp_dir) / "a.csv").write_text("111111111111\n")
+        (Path(temp_dir) / "b.csv").write_text("222222222222\n")
+
+        with patch("csv_upc_omg.main.fetch_product_title_sync") as mock_fetch:
+            mock_fetch.return_value = "Widget"
+            result = runner.invoke(
+                cli, ["titles", temp_dir, "--all", "--format", "jsonl", "-v"]
+            )
+
+        assert result.exit_code == 0
+        rows = [json.loads(line) for line in result.stdout.splitlines()]
+        assert [row["upc"] for row in rows] == ["111111111111", "222222222222"]
+        assert "Processing 2 CSV files" in result.stderr
+
+
+def test_stats_flag_prints_summary() -> None:
+    """Test --stats reports lookup metrics on stderr and then disables them."""
+    from csv_upc_omg import metrics
+
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        (Path(temp_dir) / "test.csv").write_text("123456789012\n")
+
+        with patch("csv_upc_omg.main.fetch_product_title_sync") as mock_fetch:
+            mock_fetch.return_value = "Test Product Title"
+            result = runner.invoke(cli, ["--stats", "titles", temp_dir])
+
+        assert result.exit_code == 0
+        assert "Lookups:" in result.stderr
+        assert not metrics.is_enabled()
+
+
+def test_cache_options_configure_lookup_cache() -> None:
+    """Test --cache-size and --cache-ttl resize the in-process lookup cache."""
+    from csv_upc_omg import barcode_lookup
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--cache-size", "5", "--cache-ttl", "1.5", "hello"])
+
+    assert result.exit_code == 0
+    assert barcode_lookup.cache_stats().maxsize == 5
+    assert barcode_lookup._cache.ttl == 1.5
+
+
+def test_lookup_options_build_one_config() -> None:
+    """Test the lookup options build a single config shared by every lookup."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        (Path(temp_dir) / "test.csv").write_text("123456789012\n987654321098\n")
+
+        with patch("csv_upc_omg.main.fetch_product_title_sync") as mock_fetch:
+            mock_fetch.return_value = "Test Product Title"
+            result = runner.invoke(
+                cli,
+                [
+                    "--max-response-bytes",
+                    "4096",
+                    "--user-agent",
+                    "first",
+                    "--user-agent",
+                    "second",
+                    "--proxy",
+                    "http://proxy:3128",
+                    "titles",
+                    temp_dir,
+                ],
+            )
+
+        assert result.exit_code == 0
+        first, second = (call.kwargs["config"] for call in mock_fetch.call_args_list)
+        assert first is second
+        assert first.max_response_bytes == 4096
+        assert first.user_agents == ("first", "second")
+        assert first.proxy == "http://proxy:3128"
+
+
+def test_http2_without_h2_is_a_usage_error() -> None:
+    """Test --http2 fails cleanly when the h2 package is missing."""
+    runner = CliRunner()
+    with patch("importlib.util.find_spec", return_value=None):
+        result = runner.invoke(cli, ["--http2", "hello"])
+
+    assert result.exit_code == 2
+    assert "h2 package" in result.output
+
+
+def test_profile_flag_writes_profile() -> None:
+    """Test --profile dumps a profile named after the subcommand."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        profile_dir = Path(temp_dir) / "profiles"
+        result = runner.invoke(
+            cli, ["--profile-memory", "--profile-dir", str(profile_dir), "hello"]
+        )
+
+        assert result.exit_code == 0
+        assert "Profile written to" in result.stderr
+        assert len(list(profile_dir.glob("hello-*.prof"))) == 1
+        assert len(list(profile_dir.glob("hello-*.tracemalloc"))) == 1
+
+
+def test_cli_import_does_not_load_http_stack() -> None:
+    """Test importing the CLI defers httpx and bs4 until a lookup runs."""
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, csv_upc_omg.main; "
+        "print(sorted({'httpx', 'bs4'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_titles_deadline_writes_partial_results() -> None:
+    """Test --deadline stops lookups and reports the UPCs left over."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        (Path(temp_dir) / "test.csv").write_text("123456789012\n987654321098\n")
+
+        with patch("csv_upc_omg.main.fetch_product_title_sync") as mock_fetch:
+            mock_fetch.return_value = "Test Product Title"
+            result = runner.invoke(cli, ["titles", temp_dir, "--deadline", "0"])
+
+        assert result.exit_code == 0
+        assert result.stdout == ""
+        assert "Deadline reached; 2 UPCs were not looked up." in result.stderr
+        mock_fetch.assert_not_called()
+
+
+def test_titles_all_files_deadline_clamps_timeout() -> None:
+    """Test request timeouts are cut to end by the deadline."""
+    runner = CliRunner()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        (Path(temp_dir) / "a.csv").write_text("123456789012\n")
+        (Path(temp_dir) / "b.csv").write_text("987654321098\n")
+
+        with patch("csv_upc_omg.main.fetch_product_title_sync") as mock_fetch:
+            mock_fetch.return_value = "Test Product Title"
+            result = runner.invoke(
+                cli,
+                ["titles", temp_dir, "--all", "--workers", "1", "--deadline", "5"],
+            )
+
+        assert result.exit_code == 0
+        assert mock_fetch.call_count == 2
+        assert all(call.kwargs["timeout"] <= 5 for call in mock_fetch.call_args_list)
+        assert "Deadline reached" not in result.stderr
@@ -0,0 +1,113 @@
+"""Tests for the metrics module."""
+
+from collections.abc import Iterator
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from csv_upc_omg import metrics
+from csv_upc_omg.barcode_lookup import BarcodeAPIError, fetch_product_title_sync
+
+
+@pytest.fixture
+def enabled_metrics() -> Iterator[None]:
+    metrics.REGISTRY.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.REGISTRY.reset()
+
+
+def test_disabled_metrics_record_nothing() -> None:
+    """Test helpers are no-ops while metrics are disabled."""
+    metrics.REGISTRY.reset()
+    with metrics.timed_stage("parse"), metrics.in_flight():
+        pass
+    metrics.record_lookup("success")
+    metrics.record_cache(hit=True)
+
+    assert metrics.STAGE_SECONDS.stats(stage="parse") == (0, 0.0)
+    assert metrics.LOOKUPS_TOTAL.value(status="success") == 0
+
+
+def test_render_prometheus_text(enabled_metrics: None) -> None:
+    """Test counters and histograms render in exposition format."""
+    metrics.record_lookup("success")
+    metrics.observe_stage("parse", 0.003)
+    with metrics.in_flight():
+        assert metrics.LOOKUPS_IN_FLIGHT.value() == 1
+
+    text = metrics.REGISTRY.render()
+    assert "# TYPE csv_upc_omg_lookups_total counter" in text
+    assert 'csv_upc_omg_lookups_total{status="success"} 1.0' in text
+    assert 'csv_upc_omg_lookup_stage_seconds_bucket{stage="parse",le="0.001"} 0' in text
+    assert 'csv_upc_omg_lookup_stage_seconds_bucket{stage="parse",le="0.005"} 1' in text
+    assert 'csv_upc_omg_lookup_stage_seconds_bucket{stage="parse",le="+Inf"} 1' in text
+    assert 'csv_upc_omg_lookup_stage_seconds_count{stage="parse"} 1' in text
+    assert "csv_upc_omg_lookups_in_flight 0.0" in text
+
+
+def test_gauge_set(enabled_metrics: None) -> None:
+    """Test gauges can be set directly."""
+    metrics.LOOKUPS_IN_FLIGHT.set(3)
+    assert metrics.LOOKUPS_IN_FLIGHT.value() == 3
+
+
+def test_stage_tracer_maps_httpcore_events(enabled_metrics: None) -> None:
+    """Test httpcore trace events are timed as lookup stages."""
+    tracer = metrics.StageTracer()
+    tracer("connection.connect_tcp.started", {})
+    tracer("connection.connect_tcp.complete", {})
+    tracer("http11.receive_response_body.started", {})
+    tracer("http11.receive_response_body.failed", {})
+    tracer("http11.send_request_headers.started", {})
+
+    assert metrics.STAGE_SECONDS.stats(stage="connect")[0] == 1
+    assert metrics.STAGE_SECONDS.stats(stage="download")[0] == 1
+
+
+def test_summary_reports_statuses_and_cache(enabled_metrics: None) -> None:
+    """Test the human-readable summary."""
+    metrics.record_lookup("success")
+    metrics.record_lookup("failed")
+    metrics.record_cache(hit=True)
+    metrics.record_cache(hit=False)
+    metrics.observe_stage("server", 0.2)
+
+    data = metrics.summary()
+    assert data["lookups"] == {"success": 1, "not_found": 0, "failed": 1}
+    assert data["cache_hit_ratio"] == 0.5
+    assert data["stages"]["server"]["count"] == 1
+
+    report = metrics.format_summary()
+    assert "Lookups: 2 (success 1, not found 0, failed 1)" in report
+    assert "Cache hit ratio: 50.0%" in report
+    assert "server" in report
+
+
+@patch("csv_upc_omg.barcode_lookup.httpx.Client")
+def test_fetch_records_metrics(mock_client_class, enabled_metrics: None) -> None:
+    """Test fetches record outcome, parse time and pass a trace hook."""
+    page = '<div class="product-details"><h4>Widget</h4></div>'
+    mock_client = MagicMock()
+    mock_client.stream.return_value.__enter__.return_value = httpx.Response(
+        200,
+        stream=httpx.ByteStream(page.encode()),
+        request=httpx.Request("GET", "https://example.com/"),
+    )
+    mock_client_class.return_value = mock_client
+
+    assert fetch_product_title_sync("123456789012") == "Widget"
+
+    extensions = mock_client.stream.call_args[1]["extensions"]
+    assert isinstance(extensions["trace"], metrics.StageTracer)
+    assert metrics.LOOKUPS_TOTAL.value(status="success") == 1
+    assert metrics.STAGE_SECONDS.stats(stage="parse")[0] == 1
+    assert metrics.RESPONSE_BYTES_TOTAL.value() == len(page)
+
+    mock_client.stream.side_effect = Exception("boom")
+    with pytest.raises(BarcodeAPIError):
+        fetch_product_title_sync("210987654321")
+    assert metrics.LOOKUPS_TOTAL.value(status="failed") == 1
+    assert metrics.LOOKUPS_IN_FLIGHT.value() == 0
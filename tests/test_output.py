@@ -0,0 +1,125 @@
+"""Tests for the output module."""
+
+import csv
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import click
+import pytest
+
+from csv_upc_omg.output import LookupResult, open_writer
+
+RESULTS = [
+    LookupResult("111111111111", "Widget", "success"),
+    LookupResult("222222222222", None, "not_found"),
+    LookupResult("333333333333", None, "failed", "HTTP error 500"),
+]
+
+
+def test_lookup_result_text_line() -> None:
+    """Test the legacy text rendering of each status."""
+    assert [r.text_line() for r in RESULTS] == [
+        "111111111111: Widget",
+        "222222222222: Product not found",
+        "333333333333: Lookup failed",
+    ]
+
+
+def test_jsonl_writer(tmp_path: Path) -> None:
+    """Test JSONL output contains one object per result."""
+    path = tmp_path / "out.jsonl"
+    with open_writer("jsonl", path) as writer:
+        for result in RESULTS:
+            writer.write(result)
+
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert rows[0] == {
+        "upc": "111111111111",
+        "title": "Widget",
+        "status": "success",
+        "error": "",
+    }
+    assert rows[2]["error"] == "HTTP error 500"
+
+
+def test_csv_writer_with_source(tmp_path: Path) -> None:
+    """Test CSV output has a header and an optional source column."""
+    path = tmp_path / "out.csv"
+    with open_writer("csv", path, include_source=True, batch_size=2) as writer:
+        for result in RESULTS:
+            result.source = "a.csv"
+            writer.write(result)
+
+    rows = list(csv.reader(path.open()))
+    assert rows[0] == ["upc", "title", "status", "error", "source"]
+    assert len(rows) == 4
+    assert rows[2] == ["222222222222", "", "not_found", "", "a.csv"]
+
+
+def test_writer_batches_stdout_writes() -> None:
+    """Test rows are flushed to stdout once per batch, not once per row."""
+    with patch("csv_upc_omg.output.click.echo") as mock_echo:
+        with open_writer("text", batch_size=2) as writer:
+            writer.begin_file("a.csv")
+            for result in RESULTS:
+                writer.write(result)
+
+    assert mock_echo.call_count == 2
+    first_batch = mock_echo.call_args_list[0][0][0]
+    assert first_batch.startswith("==> a.csv <==\n111111111111: Widget\n")
+
+
+def test_writer_flushes_after_interval() -> None:
+    """Test a slow stream of rows is flushed on time, not only per batch."""
+    clock = iter([0.0, 0.5, 1.5, 1.6])
+    with (
+        patch("csv_upc_omg.output.time.monotonic", side_effect=lambda: next(clock)),
+        patch("csv_upc_omg.output.click.echo") as mock_echo,
+    ):
+        writer = open_writer("jsonl", batch_size=100, flush_interval=1.0)
+        writer.write(RESULTS[0])
+        assert mock_echo.call_count == 0
+        writer.write(RESULTS[1])
+        assert mock_echo.call_count == 1
+
+    assert mock_echo.call_args[0][0].count("\n") == 2
+
+
+def test_text_writer_line_buffers_terminal() -> None:
+    """Test text on an interactive stdout is written as each row arrives."""
+    with (
+        patch("csv_upc_omg.output._stdout_is_tty", return_value=True),
+        patch("csv_upc_omg.output.click.echo") as mock_echo,
+    ):
+        with open_writer("text") as writer:
+            writer.write(RESULTS[0])
+            assert mock_echo.call_count == 1
+            writer.write(RESULTS[1])
+            assert mock_echo.call_count == 2
+
+
+def test_parquet_writer(tmp_path: Path) -> None:
+    """Test Parquet output round-trips through pyarrow."""
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "out.parquet"
+    with open_writer("parquet", path, batch_size=2) as writer:
+        for result in RESULTS:
+            writer.write(result)
+
+    table = pq.read_table(path)
+    assert table.num_rows == 3
+    assert table.column("title").to_pylist() == ["Widget", None, None]
+
+
+def test_parquet_writer_requires_file() -> None:
+    """Test Parquet cannot be streamed to stdout."""
+    with pytest.raises(click.UsageError, match="--output"):
+        open_writer("parquet")
+
+
+def test_parquet_writer_requires_pyarrow(tmp_path: Path) -> None:
+    """Test a helpful error when pyarrow is not installed."""
+    with patch.dict("sys.modules", {"pyarrow": None}):
+        with pytest.raises(click.UsageError, match="pyarrow"):
+            open_writer("parquet", tmp_path / "out.parquet")
@@ -0,0 +1,66 @@
+"""Tests for the profiling module."""
+
+import pstats
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+from csv_upc_omg.profiling import profile_run
+
+
+def test_profile_run_writes_cprofile_stats(tmp_path: Path) -> None:
+    """Test a cProfile dump is written for the run."""
+    with profile_run("unit", tmp_path / "out") as written:
+        sum(range(1000))
+
+    assert len(written) == 1
+    assert written[0].name.startswith("unit-")
+    assert written[0].suffix == ".prof"
+    pstats.Stats(str(written[0]))
+
+
+def test_profile_run_memory_snapshot(tmp_path: Path) -> None:
+    """Test a tracemalloc snapshot is written and tracing is stopped again."""
+    with profile_run("mem", tmp_path, memory=True) as written:
+        [bytes(100) for _ in range(100)]
+
+    assert [path.suffix for path in written] == [".prof", ".tracemalloc"]
+    tracemalloc.Snapshot.load(str(written[1]))
+    assert not tracemalloc.is_tracing()
+
+
+def test_nested_profile_run_is_skipped(tmp_path: Path) -> None:
+    """Test a run inside a profiled run leaves profiling to the outer one."""
+    with profile_run("outer", tmp_path) as outer:
+        with profile_run("inner", tmp_path) as inner:
+            sum(range(1000))
+
+    assert inner == []
+    assert [path.name.split("-")[0] for path in outer] == ["outer"]
+
+
+def test_profile_run_covers_threads(tmp_path: Path) -> None:
+    """Test work done on threads started during the run is in the stats."""
+
+    def threaded_work() -> int:
+        return sum(range(1000))
+
+    with profile_run("threads", tmp_path) as written:
+        with ThreadPoolExecutor(2) as executor:
+            list(executor.map(lambda _: threaded_work(), range(4)))
+
+    functions = {name for _, _, name in pstats.Stats(str(written[0])).stats}
+    assert "threaded_work" in functions
+
+
+def test_profile_runs_in_one_second_do_not_collide(tmp_path: Path) -> None:
+    """Test each run gets its own dump even when started in the same second."""
+    with patch("csv_upc_omg.profiling.time.strftime", return_value="same"):
+        with profile_run("unit", tmp_path) as first:
+            pass
+        with profile_run("unit", tmp_path) as second:
+            pass
+
+    assert first[0] != second[0]
+    assert len(list(tmp_path.iterdir())) == 2
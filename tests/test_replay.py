@@ -0,0 +1,108 @@
+"""Tests for the replay module."""
+
+from pathlib import Path
+
+import httpx
+import pytest
+from click.testing import CliRunner
+
+from csv_upc_omg.barcode_lookup import BarcodeAPIError, fetch_product_title_sync
+from csv_upc_omg.config import LookupConfig
+from csv_upc_omg.main import cli
+from csv_upc_omg.replay import (
+    RecordedResponse,
+    RecordingTransport,
+    ResponseArchive,
+    open_archive,
+)
+
+PAGE = b'<div class="product-details"><h4>Widget</h4></div>'
+
+
+def _site(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/000000000000":
+        return httpx.Response(404)
+    return httpx.Response(
+        200, headers={"Content-Type": "text/html", "Set-Cookie": "x=1"}, content=PAGE
+    )
+
+
+def _record(path: Path, *upcs: str) -> None:
+    with ResponseArchive(path, "a") as archive:
+        transport = RecordingTransport(archive, httpx.MockTransport(_site))
+        config = LookupConfig(transport=transport)
+        for upc in upcs:
+            fetch_product_title_sync(upc, config=config)
+        config.close()
+
+
+def test_archive_round_trip(tmp_path: Path) -> None:
+    """Test responses survive a close and reopen, first recording wins."""
+    path = tmp_path / "responses.zip"
+    with ResponseArchive(path, "a") as archive:
+        assert archive.put("1", RecordedResponse(200, b"one", {"etag": '"a"'}))
+        assert not archive.put("1", RecordedResponse(500, b"two"))
+
+    with ResponseArchive(path) as archive:
+        assert len(archive) == 1
+        assert "1" in archive
+        assert archive.get("1") == RecordedResponse(200, b"one", {"etag": '"a"'})
+        assert archive.get("2") is None
+
+
+def test_record_then_replay_offline(tmp_path: Path) -> None:
+    """Test recorded lookups replay identically without the network."""
+    path = tmp_path / "responses.zip"
+    _record(path, "012345678905", "000000000000")
+
+    with ResponseArchive(path) as archive:
+        assert archive.get("012345678905").headers == {"content-type": "text/html"}
+
+    archive, transport = open_archive(path)
+    config = LookupConfig(transport=transport)
+    try:
+        assert fetch_product_title_sync("012345678905", config=config) == "Widget"
+        assert fetch_product_title_sync("000000000000", config=config) is None
+        with pytest.raises(BarcodeAPIError, match="not in"):
+            fetch_product_title_sync("999999999999", config=config)
+    finally:
+        config.close()
+        archive.close()
+
+
+def test_cli_replay(tmp_path: Path) -> None:
+    """Test the titles command runs against a replay archive."""
+    path = tmp_path / "responses.zip"
+    _record(path, "012345678905")
+    (tmp_path / "test.csv").write_text("012345678905\n")
+
+    result = CliRunner().invoke(cli, ["--replay", str(path), "titles", str(tmp_path)])
+
+    assert result.exit_code == 0
+    assert result.stdout == "012345678905: Widget\n"
+
+
+def test_cli_record_and_replay_are_exclusive(tmp_path: Path) -> None:
+    """Test --record and --replay cannot be combined."""
+    path = tmp_path / "responses.zip"
+    _record(path)
+
+    result = CliRunner().invoke(
+        cli, ["--record", str(path), "--replay", str(path), "hello"]
+    )
+
+    assert result.exit_code == 2
+    assert "cannot be used together" in result.output
+
+
+def test_cli_record(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test --record saves each response and closes the archive on exit."""
+    path = tmp_path / "responses.zip"
+    (tmp_path / "test.csv").write_text("012345678905\n")
+    monkeypatch.setattr(httpx, "HTTPTransport", lambda: httpx.MockTransport(_site))
+
+    result = CliRunner().invoke(cli, ["--record", str(path), "titles", str(tmp_path)])
+
+    assert result.exit_code == 0
+    with ResponseArchive(path) as archive:
+        assert archive.get("012345678905").body == PAGE
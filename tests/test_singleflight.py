@@ -0,0 +1,84 @@
+"""Tests for the singleflight module."""
+
+import threading
+import time
+from collections.abc import Callable
+from unittest.mock import Mock, patch
+
+from csv_upc_omg import metrics
+from csv_upc_omg.barcode_lookup import fetch_product_title_sync
+from csv_upc_omg.singleflight import SingleFlight
+
+
+def _call_during_flight(
+    func: Callable[[], int], followers: int
+) -> tuple[list, SingleFlight[int]]:
+    """Start one call, then more for the same key while it is still running."""
+    flights: SingleFlight[int] = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    outcomes: list = []
+
+    def leader_func() -> int:
+        started.set()
+        release.wait()
+        return func()
+
+    def call(f: Callable[[], int]) -> None:
+        try:
+            outcomes.append(flights.do("key", f))
+        except Exception as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=call, args=(leader_func,))]
+    threads[0].start()
+    started.wait()
+    for _ in range(followers):
+        threads.append(threading.Thread(target=call, args=(func,)))
+        threads[-1].start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    return outcomes, flights
+
+
+def test_concurrent_calls_share_one_result() -> None:
+    """Test callers arriving mid-flight reuse the leader's result."""
+    calls = Mock(return_value=42)
+
+    outcomes, _ = _call_during_flight(calls, followers=4)
+
+    assert calls.call_count == 1
+    assert sorted(outcomes) == [(42, False)] + [(42, True)] * 4
+
+
+def test_waiters_receive_leader_exception() -> None:
+    """Test an error from the shared call is raised in every caller."""
+    outcomes, flights = _call_during_flight(Mock(side_effect=ValueError("boom")), 2)
+
+    assert [str(e) for e in outcomes] == ["boom"] * 3
+    assert flights._calls == {}
+
+
+def test_sequential_calls_are_not_cached() -> None:
+    """Test a finished call is not reused by later callers."""
+    flights: SingleFlight[int] = SingleFlight()
+    calls = Mock(side_effect=[1, 2])
+
+    assert flights.do("key", calls) == (1, False)
+    assert flights.do("key", calls) == (2, False)
+
+
+@patch("csv_upc_omg.barcode_lookup._flights")
+def test_fetch_records_coalesced_lookups(mock_flights: Mock) -> None:
+    """Test a shared fetch is counted in the coalesced metric."""
+    mock_flights.do.return_value = ("Widget", True)
+    metrics.REGISTRY.reset()
+    metrics.enable()
+    try:
+        assert fetch_product_title_sync("012345678905") == "Widget"
+        assert metrics.LOOKUPS_COALESCED_TOTAL.value() == 1
+    finally:
+        metrics.disable()
+        metrics.REGISTRY.reset()
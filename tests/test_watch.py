@@ -0,0 +1,190 @@
+"""Tests for the watch module."""
+
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from csv_upc_omg.watch import ProcessedFileIndex, scan_for_new_csvs, watch_directory
+
+
+def test_scan_for_new_csvs_skips_processed(tmp_path: Path) -> None:
+    """Test that processed files are not returned again."""
+    first = tmp_path / "first.csv"
+    first.write_text("111\n")
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    index = ProcessedFileIndex()
+    assert scan_for_new_csvs(tmp_path, index) == [first]
+
+    index.mark_processed(first)
+    second = tmp_path / "second.csv"
+    second.write_text("222\n")
+    assert scan_for_new_csvs(tmp_path, index) == [second]
+
+
+def test_touched_file_with_same_content_is_not_reprocessed(tmp_path: Path) -> None:
+    """Test that an mtime change alone does not trigger reprocessing."""
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text("111\n")
+    index = ProcessedFileIndex()
+    index.mark_processed(csv_path)
+
+    stat = csv_path.stat()
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert scan_for_new_csvs(tmp_path, index) == []
+
+
+def test_changed_file_is_reprocessed(tmp_path: Path) -> None:
+    """Test that modified contents trigger reprocessing."""
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text("111\n")
+    index = ProcessedFileIndex()
+    index.mark_processed(csv_path)
+
+    csv_path.write_text("111\n222\n")
+    assert scan_for_new_csvs(tmp_path, index) == [csv_path]
+
+
+def test_index_round_trips_through_state_file(tmp_path: Path) -> None:
+    """Test that the processed index persists between runs."""
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text("111\n")
+    state_path = tmp_path / "state.json"
+
+    index = ProcessedFileIndex(state_path)
+    index.mark_processed(csv_path)
+    index.save()
+
+    reloaded = ProcessedFileIndex(state_path)
+    assert len(reloaded) == 1
+    assert scan_for_new_csvs(tmp_path, reloaded) == []
+
+
+def test_index_corrupt_state_file(tmp_path: Path) -> None:
+    """Test that an unreadable state file raises RuntimeError."""
+    state_path = tmp_path / "state.json"
+    state_path.write_text("{not json")
+
+    with pytest.raises(RuntimeError, match="Error reading watch state"):
+        ProcessedFileIndex(state_path)
+
+
+def test_watch_directory_polling_picks_up_new_files(tmp_path: Path) -> None:
+    """Test the polling fallback yields files created after startup."""
+    existing = tmp_path / "existing.csv"
+    existing.write_text("111\n")
+    index = ProcessedFileIndex()
+    later = tmp_path / "later.csv"
+    polls = []
+
+    def should_stop() -> bool:
+        polls.append(None)
+        if len(polls) == 1:
+            later.write_text("222\n")
+        return len(polls) > 1
+
+    seen = []
+    for csv_path in watch_directory(
+        str(tmp_path),
+        index,
+        interval=0,
+        use_inotify=False,
+        should_stop=should_stop,
+        settle=0,
+    ):
+        seen.append(csv_path)
+        index.mark_processed(csv_path)
+
+    assert seen == [existing, later]
+
+
+def test_watch_directory_uses_watchfiles_when_available(tmp_path: Path) -> None:
+    """Test that filesystem events from watchfiles trigger rescans."""
+    csv_path = tmp_path / "event.csv"
+    fake_watchfiles = MagicMock()
+
+    def fake_watch(*args, **kwargs):
+        csv_path.write_text("111\n")
+        yield {("added", str(csv_path))}
+
+    fake_watchfiles.watch.side_effect = fake_watch
+
+    with patch.dict(sys.modules, {"watchfiles": fake_watchfiles}):
+        seen = list(watch_directory(str(tmp_path), ProcessedFileIndex(), settle=0))
+
+    assert seen == [csv_path]
+
+
+def test_watch_directory_only_looks_at_changed_paths(tmp_path: Path) -> None:
+    """Test that filesystem events do not trigger a rescan of the directory."""
+    csv_path = tmp_path / "event.csv"
+    (tmp_path / "elsewhere").mkdir()
+    fake_watchfiles = MagicMock()
+
+    def fake_watch(*args, **kwargs):
+        csv_path.write_text("111\n")
+        (tmp_path / "unreported.csv").write_text("222\n")
+        (tmp_path / "elsewhere" / "nested.csv").write_text("333\n")
+        yield {
+            ("added", str(csv_path)),
+            ("added", str(tmp_path / "elsewhere" / "nested.csv")),
+            ("deleted", str(tmp_path / "gone.csv")),
+        }
+        yield set()
+
+    fake_watchfiles.watch.side_effect = fake_watch
+
+    with (
+        patch.dict(sys.modules, {"watchfiles": fake_watchfiles}),
+        patch(
+            "csv_upc_omg.watch.scan_for_new_csvs", wraps=scan_for_new_csvs
+        ) as mock_scan,
+    ):
+        seen = list(watch_directory(str(tmp_path), ProcessedFileIndex(), settle=0))
+
+    assert seen == [csv_path]
+    mock_scan.assert_called_once()
+    assert fake_watchfiles.watch.call_args.kwargs["recursive"] is False
+
+
+def test_watch_directory_waits_for_file_to_settle(tmp_path: Path) -> None:
+    """Test that a file still being written is held back until it stops changing."""
+    csv_path = tmp_path / "copying.csv"
+    clock = [0.0]
+    seen: list[Path] = []
+    fake_watchfiles = MagicMock()
+
+    def fake_watch(*args, **kwargs):
+        csv_path.write_text("111\n")
+        yield {("added", str(csv_path))}
+        clock[0] = 2.0
+        csv_path.write_text("111\n222\n")
+        yield {("modified", str(csv_path))}
+        clock[0] = 2.5
+        yield set()
+        assert seen == []
+        clock[0] = 3.0
+        yield set()
+
+    fake_watchfiles.watch.side_effect = fake_watch
+
+    with (
+        patch.dict(sys.modules, {"watchfiles": fake_watchfiles}),
+        patch("csv_upc_omg.watch.time.monotonic", side_effect=lambda: clock[0]),
+    ):
+        for path in watch_directory(str(tmp_path), ProcessedFileIndex(), settle=1.0):
+            seen.append(path)
+
+    assert seen == [csv_path]
+
+
+def test_watch_directory_not_a_directory(tmp_path: Path) -> None:
+    """Test that watching a file raises NotADirectoryError."""
+    file_path = tmp_path / "file.csv"
+    file_path.write_text("")
+
+    with pytest.raises(NotADirectoryError):
+        next(watch_directory(str(file_path), ProcessedFileIndex()))
@@ -113,14 +113,122 @@ TAILWIND_CLI_USE_DAISY_UI = True
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+FILE_UPLOAD_HANDLERS = [
+    "inventory.uploadhandlers.StreamingMemoryFileUploadHandler",
+    "inventory.uploadhandlers.StreamingTemporaryFileUploadHandler",
+]
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# The lookup list's covering index only carries non-key columns on
+# PostgreSQL; elsewhere it degrades to a plain index, which is fine.
+SILENCED_SYSTEM_CHECKS = ["models.W040"]
+
+# Parsing and lookups run on separate queues so a burst of slow lookups
+# cannot starve new uploads of parsing workers.
+TASK_QUEUES = ["default", "parsing", "lookups"]
+
 TASKS = {
     "default": {
         "BACKEND": "django_tasks.backends.immediate.ImmediateBackend",
+        "QUEUES": TASK_QUEUES,
     },
 }
 
+# Worker processes per queue started by ``manage.py task_workers``.
+TASK_WORKER_CONCURRENCY = {
+    "parsing": env.int("PARSING_WORKERS", default=1),
+    "lookups": env.int("LOOKUP_WORKERS", default=2),
+}
+
+# (max file size in bytes, priority) tiers; smaller uploads are picked up
+# first so a quick CSV is not stuck behind a huge one. Higher runs first.
+TASK_UPLOAD_PRIORITY_TIERS = [
+    (256 * 1024, 50),
+    (16 * 1024 * 1024, 0),
+]
+TASK_LARGE_UPLOAD_PRIORITY = -50
+
+# Fair-share lookup scheduling. Each slice claims LOOKUP_SLICE_SIZE pending
+# lookups round-robin across users, weighted by LOOKUP_USER_WEIGHTS
+# (username -> records per turn). No user holds more than
+# LOOKUP_MAX_IN_FLIGHT_PER_USER claims at once. Claims left by a crashed
+# worker are released after LOOKUP_LEASE_SECONDS, when a deferred run picks
+# them up.
+LOOKUP_SLICE_SIZE = env.int("LOOKUP_SLICE_SIZE", default=20)
+LOOKUP_MAX_IN_FLIGHT_PER_USER = env.int("LOOKUP_MAX_IN_FLIGHT_PER_USER", default=50)
+LOOKUP_USER_WEIGHTS: dict[str, int] = {}
+LOOKUP_LEASE_SECONDS = env.int("LOOKUP_LEASE_SECONDS", default=300)
+
+# How long the lookup list's total count may be stale.
+LOOKUP_COUNT_CACHE_SECONDS = env.int("LOOKUP_COUNT_CACHE_SECONDS", default=60)
+
+# Exports are read from the database and streamed out this many rows at a time.
+EXPORT_BATCH_SIZE = env.int("EXPORT_BATCH_SIZE", default=2000)
+
+# Failed lookups may be retried (``manage.py retry_failed_lookups``) after an
+# exponential backoff, up to LOOKUP_MAX_ATTEMPTS attempts per record.
+LOOKUP_MAX_ATTEMPTS = env.int("LOOKUP_MAX_ATTEMPTS", default=5)
+LOOKUP_RETRY_BACKOFF_SECONDS = env.int("LOOKUP_RETRY_BACKOFF_SECONDS", default=60)
+LOOKUP_RETRY_MAX_BACKOFF_SECONDS = 6 * 60 * 60
+
+# Each worker keeps up to LOOKUP_CACHE_SIZE recent lookup results in memory
+# for LOOKUP_CACHE_TTL_SECONDS (0 disables the cache).
+LOOKUP_CACHE_SIZE = env.int("LOOKUP_CACHE_SIZE", default=10_000)
+LOOKUP_CACHE_TTL_SECONDS = env.float("LOOKUP_CACHE_TTL_SECONDS", default=3600.0)
+
+# Product pages are read only up to their title, and never past
+# LOOKUP_MAX_RESPONSE_BYTES.
+LOOKUP_MAX_RESPONSE_BYTES = env.int(
+    "LOOKUP_MAX_RESPONSE_BYTES", default=2 * 1024 * 1024
+)
+
+# How each worker reaches the lookup site: User-Agents sent in rotation, an
+# optional proxy URL, the connection pool size and whether to use HTTP/2
+# (needs the package's http2 extra). Read once per process.
+LOOKUP_USER_AGENTS = env.list("LOOKUP_USER_AGENTS", default=[])
+LOOKUP_PROXY = env.str("LOOKUP_PROXY", default="")
+LOOKUP_MAX_CONNECTIONS = env.int("LOOKUP_MAX_CONNECTIONS", default=10)
+LOOKUP_HTTP2 = env.bool("LOOKUP_HTTP2", default=False)
+
+# Lookups sharing a worker's connection pool adapt how many run at once:
+# up to LOOKUP_MAX_CONNECTIONS while responses arrive within
+# LOOKUP_LATENCY_TARGET_SECONDS, backing off on 429s, 5xx and timeouts.
+LOOKUP_ADAPTIVE_CONCURRENCY = env.bool("LOOKUP_ADAPTIVE_CONCURRENCY", default=True)
+LOOKUP_LATENCY_TARGET_SECONDS = env.float("LOOKUP_LATENCY_TARGET_SECONDS", default=2.0)
+
+# Threads each lookup_batch_task looks up on (1 runs lookups one at a time;
+# keep LOOKUP_MAX_CONNECTIONS at least this high). Records are claimed and
+# saved up to LOOKUP_WRITE_BATCH_SIZE at a time, fewer when that many
+# lookups could outlast LOOKUP_LEASE_SECONDS.
+LOOKUP_TASK_THREADS = env.int("LOOKUP_TASK_THREADS", default=1)
+LOOKUP_WRITE_BATCH_SIZE = env.int("LOOKUP_WRITE_BATCH_SIZE", default=100)
+
+# Answer lookups from a response archive recorded with `csv-upc-omg --record`
+# instead of the network (LOOKUP_REPLAY_ARCHIVE), or record into one
+# (LOOKUP_RECORD_ARCHIVE; run a single worker while recording).
+LOOKUP_REPLAY_ARCHIVE = env.str("LOOKUP_REPLAY_ARCHIVE", default="")
+LOOKUP_RECORD_ARCHIVE = env.str("LOOKUP_RECORD_ARCHIVE", default="")
+
+# Workers looking up the same UPC at the same time share one fetch through a
+# lease row. Waiters poll every LOOKUP_COALESCE_POLL_SECONDS; a lease expires
+# LOOKUP_COALESCE_GRACE_SECONDS after the lookup timeout.
+LOOKUP_COALESCE_ACROSS_WORKERS = env.bool(
+    "LOOKUP_COALESCE_ACROSS_WORKERS", default=True
+)
+LOOKUP_COALESCE_POLL_SECONDS = env.float("LOOKUP_COALESCE_POLL_SECONDS", default=0.2)
+LOOKUP_COALESCE_GRACE_SECONDS = env.int("LOOKUP_COALESCE_GRACE_SECONDS", default=5)
+
+# Expose lookup latency/throughput metrics at /metrics (Prometheus format).
+# Each process keeps its own registry, so scrape every worker.
+METRICS_ENABLED = env.bool("METRICS_ENABLED", default=False)
+
+# Dump a cProfile profile (and optionally a tracemalloc snapshot) for every
+# task run, to diagnose slow uploads from real workloads.
+PROFILE_TASKS = env.bool("PROFILE_TASKS", default=False)
+PROFILE_MEMORY = env.bool("PROFILE_MEMORY", default=False)
+PROFILE_DIR = env.path("PROFILE_DIR", default=BASE_DIR / "profiles")
+
 LOGIN_URL = "/admin/login/"
 LOGIN_REDIRECT_URL = "/"
 
@@ -12,6 +12,21 @@ DATABASES = {
     "default": env.db("DATABASE_URL"),  # noqa: F405
 }
 
+# Persist tasks in the database; run workers with ``manage.py task_workers``.
+INSTALLED_APPS += ["django_tasks_db"]  # noqa: F405
+
+TASKS = {
+    "default": {
+        "BACKEND": "django_tasks_db.DatabaseBackend",
+        "QUEUES": TASK_QUEUES,  # noqa: F405
+    },
+}
+
+TASK_WORKER_CONCURRENCY = {
+    "parsing": env.int("PARSING_WORKERS", default=2),
+    "lookups": env.int("LOOKUP_WORKERS", default=4),
+}
+
 SECURE_SSL_REDIRECT = True
 SESSION_COOKIE_SECURE = True
 CSRF_COOKIE_SECURE = True
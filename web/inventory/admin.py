@@ -3,7 +3,7 @@
 from django.contrib import admin
 
 from .models import CSVUpload, LookupRecord
-from .tasks import lookup_batch_task, process_csv_task
+from .tasks import enqueue_retries, enqueue_upload
 
 
 @admin.register(CSVUpload)
@@ -26,15 +26,26 @@ class CSVUploadAdmin(admin.ModelAdmin):
             upload.status = "pending"
             upload.error_message = ""
             upload.save()
-            process_csv_task.enqueue(upload_id=str(upload.id))
-            lookup_batch_task.enqueue(upload_id=str(upload.id))
+            enqueue_upload(upload)
 
-    actions = ["reprocess_failed"]
+    @admin.action(description="Retry failed lookups")
+    def retry_failed_lookups(self, request, queryset):
+        requeued = enqueue_retries(queryset, force=True)
+        self.message_user(request, f"Re-queued {requeued} failed lookups.")
+
+    actions = ["reprocess_failed", "retry_failed_lookups"]
 
 
 @admin.register(LookupRecord)
 class LookupRecordAdmin(admin.ModelAdmin):
-    list_display = ["upc", "csv_upload", "status", "product_title", "created_at"]
+    list_display = [
+        "upc",
+        "csv_upload",
+        "status",
+        "product_title",
+        "attempts",
+        "created_at",
+    ]
     list_filter = ["status", "csv_upload"]
     search_fields = ["upc", "product_title"]
     readonly_fields = ["created_at", "updated_at"]
@@ -3,6 +3,8 @@
 from rest_framework import serializers
 
 from ..models import CSVUpload, LookupRecord
+from ..services import UploadService
+from ..tasks import enqueue_upload
 
 
 class LookupRecordSerializer(serializers.ModelSerializer):
@@ -30,6 +32,7 @@ class CSVUploadSerializer(serializers.ModelSerializer):
             "user",
             "filename",
             "file",
+            "content_hash",
             "status",
             "total_rows",
             "processed_rows",
@@ -38,8 +41,28 @@ class CSVUploadSerializer(serializers.ModelSerializer):
             "updated_at",
             "lookups",
         ]
-        read_only_fields = ["id", "user", "created_at", "updated_at"]
+        read_only_fields = ["id", "user", "content_hash", "created_at", "updated_at"]
 
     def create(self, validated_data):
         validated_data["user"] = self.context["request"].user
-        return super().create(validated_data)
+        validated_data["content_hash"] = UploadService.compute_content_hash(
+            validated_data["file"]
+        )
+        upcs = getattr(validated_data["file"], "upcs", None)
+        try:
+            upload = super().create(validated_data)
+            # UPCs parsed while the file streamed in are queued for the
+            # parsing task straight away; only the lookups are left to ask for.
+            if upcs is not None and not UploadService.reuse_duplicate_results(upload):
+                enqueue_upload(upload, run_lookups=False, upcs=upcs)
+        finally:
+            if upcs is not None:
+                upcs.close()
+        return upload
+
+
+class LookupRequestSerializer(serializers.Serializer):
+    """Options for the ``lookup`` action, in seconds."""
+
+    timeout = serializers.FloatField(min_value=0, default=10.0)
+    deadline = serializers.FloatField(min_value=0, required=False, allow_null=True)
@@ -5,8 +5,13 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from ..models import CSVUpload
-from ..tasks import lookup_batch_task, process_csv_task
-from .serializers import CSVUploadSerializer
+from ..tasks import (
+    enqueue_retries,
+    enqueue_upload,
+    lookup_batch_task,
+    upload_priority,
+)
+from .serializers import CSVUploadSerializer, LookupRequestSerializer
 
 
 class UploadViewSet(viewsets.ModelViewSet):
@@ -25,10 +30,21 @@ class UploadViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=["post"])
     def process(self, request, pk=None):
-        """Process an upload by enqueuing tasks."""
+        """Process an upload by enqueuing tasks.
+
+        Uploads whose records already exist are left alone.
+        """
         upload = self.get_object()
+        if upload.is_ingested:
+            return Response(
+                {
+                    "error": "Upload has already been processed.",
+                    "status": upload.status,
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
         try:
-            result = process_csv_task.enqueue(upload_id=str(upload.id))
+            result = enqueue_upload(upload, run_lookups=False)
             return Response(
                 {
                     "task_id": result.id,
@@ -45,11 +61,13 @@ class UploadViewSet(viewsets.ModelViewSet):
     def lookup(self, request, pk=None):
         """Run barcode lookups for an upload."""
         upload = self.get_object()
+        options = LookupRequestSerializer(data=request.data)
+        options.is_valid(raise_exception=True)
         try:
-            timeout = request.data.get("timeout", 10.0)
-            result = lookup_batch_task.enqueue(
+            result = lookup_batch_task.using(priority=upload_priority(upload)).enqueue(
                 upload_id=str(upload.id),
-                timeout=timeout,
+                timeout=options.validated_data["timeout"],
+                deadline=options.validated_data.get("deadline"),
             )
             return Response(
                 {
@@ -63,3 +81,11 @@ class UploadViewSet(viewsets.ModelViewSet):
                 {"error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+    @action(detail=True, methods=["post"])
+    def retry(self, request, pk=None):
+        """Re-queue only the failed lookups of an upload."""
+        upload = self.get_object()
+        force = str(request.data.get("force", "")).lower() in ("1", "true")
+        requeued = enqueue_retries(CSVUpload.objects.filter(pk=upload.pk), force=force)
+        return Response({"requeued": requeued})
@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "inventory"
+
+    def ready(self):
+        from csv_upc_omg import barcode_lookup
+
+        from . import lookup_config  # noqa: F401 (connects its signal receiver)
+
+        barcode_lookup.configure_cache(
+            maxsize=settings.LOOKUP_CACHE_SIZE,
+            ttl=settings.LOOKUP_CACHE_TTL_SECONDS,
+        )
+        if getattr(settings, "METRICS_ENABLED", False):
+            from csv_upc_omg import metrics
+
+            metrics.enable()
@@ -0,0 +1,146 @@
+"""Coalesce concurrent lookups of one UPC across threads and worker processes."""
+
+import time
+from collections.abc import Callable, Iterable, Mapping
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from csv_upc_omg import metrics
+from csv_upc_omg.singleflight import SingleFlight
+
+from .models import LookupLease
+
+# Threads in this process share one lease attempt per UPC.
+_flights: SingleFlight[dict] = SingleFlight()
+
+
+def _acquire(upc: str, lease: timedelta) -> bool:
+    """Take the lease for ``upc`` unless another worker holds a live one."""
+    now = timezone.now()
+    fresh = {
+        "started_at": now,
+        "expires_at": now + lease,
+        "finished_at": None,
+        "product_title": None,
+        "status": "",
+        "error_message": "",
+    }
+    if (
+        LookupLease.objects.filter(upc=upc)
+        .filter(Q(finished_at__isnull=False) | Q(expires_at__lt=now))
+        .update(**fresh)
+    ):
+        return True
+    try:
+        with transaction.atomic():
+            LookupLease.objects.create(upc=upc, **fresh)
+    except IntegrityError:
+        return False
+    return True
+
+
+def _finish(upc: str, result: dict) -> None:
+    LookupLease.objects.filter(upc=upc).update(
+        finished_at=timezone.now(),
+        product_title=result["title"],
+        status=result["status"],
+        error_message=result["error"],
+    )
+
+
+def _lead(upc: str, timeout: float, lookup: Callable[[str, float], dict]) -> dict:
+    try:
+        result = lookup(upc, timeout)
+    except BaseException:
+        LookupLease.objects.filter(upc=upc).delete()
+        raise
+    _finish(upc, result)
+    return result
+
+
+def _lookup_once(
+    upc: str, timeout: float, lookup: Callable[[str, float], dict]
+) -> dict:
+    lease = timedelta(seconds=timeout + settings.LOOKUP_COALESCE_GRACE_SECONDS)
+    while True:
+        if _acquire(upc, lease):
+            return _lead(upc, timeout, lookup)
+        # Wait for the holder; if its lease lapses or is dropped, try again.
+        while True:
+            time.sleep(settings.LOOKUP_COALESCE_POLL_SECONDS)
+            held = LookupLease.objects.filter(upc=upc).first()
+            if held is None or held.expires_at < timezone.now():
+                break
+            if held.finished_at is not None:
+                metrics.record_coalesced()
+                return {
+                    "title": held.product_title,
+                    "status": held.status,
+                    "error": held.error_message,
+                }
+
+
+def coalesced_lookup(
+    upc: str, timeout: float, lookup: Callable[[str, float], dict]
+) -> dict:
+    """Run ``lookup(upc, timeout)`` at most once at a time per UPC.
+
+    Concurrent callers, whether in this process or in other workers sharing
+    the database, wait for the running lookup and receive its result. A
+    lease outlives ``timeout`` by LOOKUP_COALESCE_GRACE_SECONDS, after which
+    a stuck holder is presumed dead and another worker takes over.
+    """
+    if not settings.LOOKUP_COALESCE_ACROSS_WORKERS:
+        return lookup(upc, timeout)
+    result, _ = _flights.do(upc, lambda: _lookup_once(upc, timeout, lookup))
+    return result
+
+
+def shared_lookup(
+    upc: str, timeout: float, lookup: Callable[[str, float], dict]
+) -> dict:
+    """Run ``lookup(upc, timeout)`` at most once at a time per UPC in this process.
+
+    Unlike :func:`coalesced_lookup` this never touches the database, so it
+    is safe on pool threads; pair it with :func:`acquire_leases` and
+    :func:`settle_leases` on the thread that owns the connection.
+    """
+    result, _ = _flights.do(upc, lambda: lookup(upc, timeout))
+    return result
+
+
+def acquire_leases(upcs: Iterable[str], seconds: float) -> set[str]:
+    """Lease each UPC no other worker is looking up, for ``seconds``.
+
+    Returns the UPCs this caller now leads; the rest are being looked up
+    elsewhere and are best left to :func:`coalesced_lookup`. With
+    LOOKUP_COALESCE_ACROSS_WORKERS off every UPC is returned and no lease
+    rows are written.
+    """
+    upcs = set(upcs)
+    if not settings.LOOKUP_COALESCE_ACROSS_WORKERS:
+        return upcs
+    lease = timedelta(seconds=seconds + settings.LOOKUP_COALESCE_GRACE_SECONDS)
+    return {upc for upc in upcs if _acquire(upc, lease)}
+
+
+def settle_leases(upcs: Iterable[str], results: Mapping[str, dict]) -> None:
+    """Publish ``results`` on leases from :func:`acquire_leases`.
+
+    Leases of UPCs without a result are dropped, so another worker can
+    take them over straight away.
+    """
+    if not settings.LOOKUP_COALESCE_ACROSS_WORKERS:
+        return
+    unfinished = []
+    for upc in upcs:
+        if upc in results:
+            _finish(upc, results[upc])
+        else:
+            unfinished.append(upc)
+    if unfinished:
+        LookupLease.objects.filter(upc__in=unfinished).delete()
@@ -0,0 +1,150 @@
+"""Streamed exports of lookup records as CSV, gzipped CSV, JSONL or Parquet.
+
+Each export is a generator of byte chunks, built from the database a batch of
+rows at a time, so a response can start before the last row is read and
+memory stays flat however many lookups a user has.
+"""
+
+import csv
+import io
+import json
+import zlib
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+# Columns of a single upload's export; cross-upload exports add ``filename``.
+FIELDS = ("upc", "product_title", "status", "error_message")
+
+
+class ExportError(Exception):
+    """Raised when an export cannot be produced in the requested format."""
+
+
+@dataclass(frozen=True)
+class ExportFormat:
+    content_type: str
+    extension: str
+
+
+FORMATS = {
+    "csv": ExportFormat("text/csv", "csv"),
+    "csv.gz": ExportFormat("application/gzip", "csv.gz"),
+    "jsonl": ExportFormat("application/x-ndjson", "jsonl"),
+    "parquet": ExportFormat("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def stream_export(
+    records: QuerySet, fmt: str, fields: tuple[str, ...] = FIELDS
+) -> Iterator[bytes]:
+    """Encode ``records`` in ``fmt``, a batch of rows per chunk.
+
+    ``fields`` are looked up with ``values_list``, so related columns such as
+    ``csv_upload__filename`` work; they are named after their last part.
+
+    Raises:
+        ExportError: For an unknown format, or Parquet without pyarrow. Raised
+            here rather than on first iteration, so a view can still answer
+            with an error page.
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown export format: {fmt}")
+    columns = [field.rpartition("__")[2] for field in fields]
+    rows = records.values_list(*fields).iterator(chunk_size=settings.EXPORT_BATCH_SIZE)
+    batches = _batched(rows, settings.EXPORT_BATCH_SIZE)
+    if fmt == "parquet":
+        return _parquet(columns, batches)
+    if fmt == "jsonl":
+        return _jsonl(columns, batches)
+    chunks = _csv(columns, batches)
+    return _gzip(chunks) if fmt == "csv.gz" else chunks
+
+
+def _batched(rows: Iterable[tuple], size: int) -> Iterator[list[tuple]]:
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _csv(columns: list[str], batches: Iterable[list[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows([value or "" for value in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only: no rows to export.
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _jsonl(columns: list[str], batches: Iterable[list[tuple]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, row))) + "\n" for row in batch
+        ).encode("utf-8")
+
+
+def _gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    # wbits=31 writes a gzip header and trailer around the deflate stream.
+    compressor = zlib.compressobj(level=6, wbits=31)
+    for chunk in chunks:
+        if compressed := compressor.compress(chunk):
+            yield compressed
+    yield compressor.flush()
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands its bytes over on each :meth:`drain`."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _parquet(columns: list[str], batches: Iterable[list[tuple]]) -> Iterator[bytes]:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ExportError(
+            "Parquet export requires pyarrow: pip install 'csv-upc-omg[parquet]'"
+        ) from e
+
+    schema = pa.schema([(column, pa.string()) for column in columns])
+
+    def chunks() -> Iterator[bytes]:
+        # One row group per batch; the footer goes out when the writer closes.
+        sink = _Sink()
+        with pq.ParquetWriter(sink, schema) as writer:
+            for batch in batches:
+                writer.write_table(
+                    pa.Table.from_pylist(
+                        [dict(zip(columns, row)) for row in batch], schema=schema
+                    )
+                )
+                yield sink.drain()
+        yield sink.drain()
+
+    return chunks()
@@ -0,0 +1,59 @@
+"""The lookup client configuration for this process, built from settings."""
+
+import atexit
+import functools
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from csv_upc_omg.adaptive import AdaptiveLimiter
+from csv_upc_omg.config import DEFAULT_USER_AGENT, LookupConfig
+
+
+@functools.cache
+def lookup_config() -> LookupConfig:
+    """Build the LookupConfig from settings on first use and reuse it.
+
+    With LOOKUP_REPLAY_ARCHIVE or LOOKUP_RECORD_ARCHIVE set, lookups go
+    through that archive, which is closed when the process exits. With
+    LOOKUP_ADAPTIVE_CONCURRENCY, every thread using the config shares one
+    adaptive limiter.
+    """
+    limiter = None
+    if settings.LOOKUP_ADAPTIVE_CONCURRENCY:
+        limiter = AdaptiveLimiter(
+            maximum=settings.LOOKUP_MAX_CONNECTIONS,
+            latency_target=settings.LOOKUP_LATENCY_TARGET_SECONDS,
+        )
+    transport = None
+    archive_path = settings.LOOKUP_RECORD_ARCHIVE or settings.LOOKUP_REPLAY_ARCHIVE
+    if archive_path:
+        from csv_upc_omg.replay import open_archive
+
+        archive, transport = open_archive(
+            archive_path, record=bool(settings.LOOKUP_RECORD_ARCHIVE)
+        )
+        atexit.register(archive.close)
+
+    config = LookupConfig(
+        user_agents=tuple(settings.LOOKUP_USER_AGENTS) or (DEFAULT_USER_AGENT,),
+        proxy=settings.LOOKUP_PROXY or None,
+        max_connections=settings.LOOKUP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LOOKUP_MAX_CONNECTIONS,
+        http2=settings.LOOKUP_HTTP2,
+        max_response_bytes=settings.LOOKUP_MAX_RESPONSE_BYTES,
+        transport=transport,
+        limiter=limiter,
+    )
+    # Registered after the archive's, so it runs first and flushes into it.
+    atexit.register(config.close)
+    return config
+
+
+@receiver(setting_changed)
+def _reset_lookup_config(setting, **kwargs):
+    """Rebuild the config when tests override a LOOKUP_* setting."""
+    if setting.startswith("LOOKUP_") and lookup_config.cache_info().currsize:
+        lookup_config().close()
+        lookup_config.cache_clear()
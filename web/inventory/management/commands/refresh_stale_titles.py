@@ -0,0 +1,61 @@
+"""Revalidate old product titles with conditional requests."""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from inventory.lookup_config import lookup_config
+from inventory.models import CSVUpload
+from inventory.services import UploadService
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-check titles fetched more than --days ago. Pages that have not "
+        "changed (HTTP 304) cost no download."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=float,
+            default=30,
+            help="Refresh titles older than this many days (default: 30)",
+        )
+        parser.add_argument(
+            "--upload",
+            action="append",
+            dest="uploads",
+            metavar="ID",
+            help="Only refresh this upload (repeatable; default: all uploads)",
+        )
+        parser.add_argument(
+            "--timeout", type=float, default=10.0, help="Request timeout in seconds"
+        )
+        parser.add_argument(
+            "--deadline",
+            type=float,
+            default=None,
+            help="Stop starting new requests after this many seconds",
+        )
+
+    def handle(self, *args, **options):
+        uploads = CSVUpload.objects.all()
+        if options["uploads"]:
+            uploads = uploads.filter(pk__in=options["uploads"])
+
+        results = UploadService.refresh_stale_titles(
+            uploads,
+            timedelta(days=options["days"]),
+            timeout=options["timeout"],
+            deadline=options["deadline"],
+            config=lookup_config(),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {sum(results.values())} UPCs: "
+                f"{results['not_modified']} unchanged, "
+                f"{results['success'] + results['not_found']} refetched, "
+                f"{results['failed']} failed."
+            )
+        )
@@ -0,0 +1,35 @@
+"""Retry failed lookups without re-parsing their uploads."""
+
+from django.core.management.base import BaseCommand
+
+from inventory.models import CSVUpload
+from inventory.tasks import enqueue_retries
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-queue failed lookups whose retry backoff has elapsed and run them "
+        "on the lookup workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--upload",
+            action="append",
+            dest="uploads",
+            metavar="ID",
+            help="Only retry this upload (repeatable; default: all uploads)",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Retry immediately, ignoring the backoff",
+        )
+
+    def handle(self, *args, **options):
+        uploads = CSVUpload.objects.all()
+        if options["uploads"]:
+            uploads = uploads.filter(pk__in=options["uploads"])
+
+        requeued = enqueue_retries(uploads, force=options["force"])
+        self.stdout.write(self.style.SUCCESS(f"Re-queued {requeued} failed lookups."))
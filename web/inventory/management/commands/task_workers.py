@@ -0,0 +1,104 @@
+"""Run a supervised pool of database task workers, one pool per queue."""
+
+import signal
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Start db_worker processes for each task queue (per "
+        "TASK_WORKER_CONCURRENCY) and restart any that exit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--queue",
+            action="append",
+            dest="queues",
+            metavar="NAME[=N]",
+            help="Queue to serve, optionally with a worker count "
+            "(repeatable; default: every queue in TASK_WORKER_CONCURRENCY)",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds each worker waits between polls for new tasks",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Do not restart workers that exit",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = self._concurrency(options["queues"])
+        interval = options["interval"]
+        self._stopping = False
+
+        workers = {}
+        for queue, count in concurrency.items():
+            for index in range(count):
+                workers[(queue, index)] = self._spawn(queue, index, interval)
+
+        previous_handlers = {
+            sig: signal.signal(sig, self._stop)
+            for sig in (signal.SIGINT, signal.SIGTERM)
+        }
+        try:
+            while workers and not self._stopping:
+                for key, process in list(workers.items()):
+                    if process.poll() is None:
+                        continue
+                    queue, index = key
+                    if options["once"]:
+                        del workers[key]
+                        continue
+                    self.stderr.write(
+                        f"Worker {queue}-{index} exited ({process.returncode}); "
+                        "restarting"
+                    )
+                    workers[key] = self._spawn(queue, index, interval)
+                time.sleep(interval)
+        finally:
+            for process in workers.values():
+                if process.poll() is None:
+                    process.terminate()
+            for process in workers.values():
+                process.wait()
+            for sig, handler in previous_handlers.items():
+                signal.signal(sig, handler)
+
+    def _concurrency(self, queues):
+        if not queues:
+            return dict(settings.TASK_WORKER_CONCURRENCY)
+        concurrency = {}
+        for spec in queues:
+            name, _, count = spec.partition("=")
+            default = settings.TASK_WORKER_CONCURRENCY.get(name, 1)
+            concurrency[name] = int(count) if count else default
+        return concurrency
+
+    def _spawn(self, queue, index, interval):
+        self.stdout.write(f"Starting worker {queue}-{index}")
+        return subprocess.Popen(
+            [
+                sys.executable,
+                sys.argv[0],
+                "db_worker",
+                "--queue-name",
+                queue,
+                "--interval",
+                str(interval),
+                "--worker-id",
+                f"{queue}-{index}",
+            ]
+        )
+
+    def _stop(self, signum, frame):
+        self._stopping = True
@@ -1,9 +1,12 @@
 """Look up product titles for UPCs in a directory."""
 
+from concurrent.futures import ThreadPoolExecutor
+
 from django.core.management.base import BaseCommand
 
 from csv_upc_omg.barcode_lookup import BarcodeAPIError, fetch_product_title_sync
 from csv_upc_omg.csv_utils import extract_upcs_from_csv, find_most_recent_csv
+from inventory.lookup_config import lookup_config
 
 
 class Command(BaseCommand):
@@ -25,11 +28,18 @@ class Command(BaseCommand):
             type=float,
             help="Request timeout in seconds",
         )
+        parser.add_argument(
+            "--workers",
+            default=1,
+            type=int,
+            help="Threads to run lookups on (default: 1)",
+        )
 
     def handle(self, *args, **options):
         directory = options["directory"]
         verbose = options["verbose"]
         timeout = options["timeout"]
+        workers = max(options["workers"], 1)
 
         csv_path = find_most_recent_csv(directory)
 
@@ -51,16 +61,28 @@ class Command(BaseCommand):
         if verbose:
             self.stdout.write(f"Found {len(upc_list)} UPCs, fetching product titles...")
 
-        for upc in upc_list:
+        config = lookup_config()
+
+        def lookup(upc):
             try:
-                title = fetch_product_title_sync(upc, timeout=timeout)
-                if title:
+                return (
+                    upc,
+                    fetch_product_title_sync(upc, timeout=timeout, config=config),
+                    None,
+                )
+            except BarcodeAPIError as e:
+                return upc, None, e
+
+        # Every thread shares the config's pooled client; results are
+        # printed in file order.
+        with ThreadPoolExecutor(workers, thread_name_prefix="lookup") as executor:
+            for upc, title, error in executor.map(lookup, upc_list):
+                if error is not None:
+                    if verbose:
+                        self.stderr.write(f"{upc}: Error - {error}")
+                    else:
+                        self.stdout.write(f"{upc}: Lookup failed")
+                elif title:
                     self.stdout.write(f"{upc}: {title}")
                 else:
                     self.stdout.write(f"{upc}: Product not found")
-
-            except BarcodeAPIError as e:
-                if verbose:
-                    self.stderr.write(f"{upc}: Error - {e}")
-                else:
-                    self.stdout.write(f"{upc}: Lookup failed")
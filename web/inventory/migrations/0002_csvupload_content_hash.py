@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="csvupload",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name="csvupload",
+            index=models.Index(
+                fields=["user", "content_hash"], name="inventory_c_user_id_2bc0ca_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0002_csvupload_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lookuprecord",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
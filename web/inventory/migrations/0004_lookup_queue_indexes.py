@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0003_lookuprecord_claimed_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="lookuprecord",
+            name="csv_upload",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="lookups",
+                to="inventory.csvupload",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lookuprecord",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["csv_upload", "created_at"],
+                name="lookup_pending_idx",
+            ),
+        ),
+    ]
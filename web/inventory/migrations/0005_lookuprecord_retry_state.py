@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0004_lookup_queue_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lookuprecord",
+            name="attempts",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="lookuprecord",
+            name="next_retry_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
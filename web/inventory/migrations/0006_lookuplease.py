@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0005_lookuprecord_retry_state"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LookupLease",
+            fields=[
+                (
+                    "upc",
+                    models.CharField(max_length=14, primary_key=True, serialize=False),
+                ),
+                ("started_at", models.DateTimeField()),
+                ("expires_at", models.DateTimeField()),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "product_title",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("status", models.CharField(blank=True, default="", max_length=20)),
+                ("error_message", models.TextField(blank=True, default="")),
+            ],
+        ),
+    ]
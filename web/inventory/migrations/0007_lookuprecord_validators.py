@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0006_lookuplease"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lookuprecord",
+            name="etag",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="lookuprecord",
+            name="fetched_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="lookuprecord",
+            name="last_modified",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+    ]
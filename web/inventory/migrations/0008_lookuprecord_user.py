@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_upload_owner(apps, schema_editor):
+    CSVUpload = apps.get_model("inventory", "CSVUpload")
+    LookupRecord = apps.get_model("inventory", "LookupRecord")
+    LookupRecord.objects.update(
+        user=Subquery(
+            CSVUpload.objects.filter(pk=OuterRef("csv_upload")).values("user")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0007_lookuprecord_validators"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lookuprecord",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="lookup_records",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(copy_upload_owner, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="lookuprecord",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="lookup_records",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lookuprecord",
+            index=models.Index(
+                fields=["csv_upload", "created_at"], name="lookup_upload_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lookuprecord",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"],
+                include=("csv_upload", "upc", "product_title", "status"),
+                name="lookup_list_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0008_lookuprecord_user"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="csvupload",
+            name="last_claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="csvupload",
+            index=models.Index(
+                condition=models.Q(("status__in", ["pending_lookups", "processing"])),
+                fields=["created_at"],
+                name="upload_active_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lookuprecord",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["claimed_at", "user"],
+                name="lookup_claimed_idx",
+            ),
+        ),
+    ]
@@ -11,6 +11,7 @@ class CSVUpload(models.Model):
     )
     file = models.FileField(upload_to="uploads/%Y/%m/%d/")
     filename = models.CharField(max_length=255)
+    content_hash = models.CharField(max_length=64, blank=True, default="")
     status = models.CharField(
         max_length=20,
         choices=[
@@ -25,6 +26,8 @@ class CSVUpload(models.Model):
     total_rows = models.IntegerField(default=0)
     processed_rows = models.IntegerField(default=0)
     error_message = models.TextField(blank=True, default="")
+    # When the fair-share scheduler last claimed some of its records.
+    last_claimed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -32,16 +35,45 @@ class CSVUpload(models.Model):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["user", "-created_at"]),
+            models.Index(fields=["user", "content_hash"]),
+            # Only uploads with lookups to run, which the scheduler plans from.
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(status__in=["pending_lookups", "processing"]),
+                name="upload_active_idx",
+            ),
         ]
 
     def __str__(self):
         return f"{self.filename} ({self.get_status_display()})"
 
+    @property
+    def is_ingested(self) -> bool:
+        """Whether the upload's records exist, or are being created."""
+        return self.status in ("processing", "pending_lookups", "completed")
+
+
+class LookupRecordQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for record in objs:
+            record.fill_user()
+        return super().bulk_create(objs, *args, **kwargs)
+
 
 class LookupRecord(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Indexed by the composite indexes below, which all lead with csv_upload.
     csv_upload = models.ForeignKey(
-        CSVUpload, on_delete=models.CASCADE, related_name="lookups"
+        CSVUpload, on_delete=models.CASCADE, related_name="lookups", db_index=False
+    )
+    # The upload's owner, copied in so a user's lookups across all their
+    # uploads can be listed newest first straight from lookup_list_idx.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="lookup_records",
+        db_index=False,
     )
     upc = models.CharField(max_length=14)
     product_title = models.CharField(max_length=255, null=True, blank=True)
@@ -57,6 +89,14 @@ class LookupRecord(models.Model):
     )
     error_message = models.TextField(blank=True, default="")
     raw_response = models.TextField(blank=True, default="")
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_retry_at = models.DateTimeField(null=True, blank=True)
+    # When the title was last fetched or revalidated, and the page's HTTP
+    # validators for revalidating it cheaply next time.
+    fetched_at = models.DateTimeField(null=True, blank=True)
+    etag = models.CharField(max_length=255, blank=True, default="")
+    last_modified = models.CharField(max_length=64, blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -70,7 +110,61 @@ class LookupRecord(models.Model):
         ]
         indexes = [
             models.Index(fields=["csv_upload", "status"]),
+            # Only pending rows: the lookup queue stays small however many
+            # finished records accumulate.
+            models.Index(
+                fields=["csv_upload", "created_at"],
+                condition=models.Q(status="pending"),
+                name="lookup_pending_idx",
+            ),
+            # Claims still out, for counting each user's lookups in flight.
+            models.Index(
+                fields=["claimed_at", "user"],
+                condition=models.Q(status="pending"),
+                name="lookup_claimed_idx",
+            ),
+            # An upload's records in file order, for its detail page and export.
+            models.Index(fields=["csv_upload", "created_at"], name="lookup_upload_idx"),
+            # A user's records newest first across all their uploads, in the
+            # lookup list's keyset order, so each page reads only its own rows.
+            # Covers every column the list selects, so PostgreSQL can answer
+            # with an index-only scan.
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                include=["csv_upload", "upc", "product_title", "status"],
+                name="lookup_list_idx",
+            ),
         ]
 
+    objects = LookupRecordQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.upc} - {self.get_status_display()}"
+
+    def fill_user(self) -> None:
+        """Copy the upload's owner onto the record if it is not set yet."""
+        if self.user_id is None:
+            self.user_id = self.csv_upload.user_id
+
+    def save(self, *args, **kwargs):
+        self.fill_user()
+        super().save(*args, **kwargs)
+
+
+class LookupLease(models.Model):
+    """A worker's claim on fetching one UPC, shared with concurrent workers.
+
+    Whoever holds an unexpired, unfinished lease does the network fetch;
+    other workers wait for it to finish and reuse the stored result.
+    """
+
+    upc = models.CharField(max_length=14, primary_key=True)
+    started_at = models.DateTimeField()
+    expires_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    product_title = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=20, blank=True, default="")
+    error_message = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return self.upc
@@ -0,0 +1,255 @@
+"""Fair-share scheduling of pending lookups across users and uploads."""
+
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Exists, F, Min, OuterRef, Q, QuerySet
+from django.utils import timezone
+
+from .models import CSVUpload, LookupRecord
+
+# Upload statuses whose records can be waiting for a lookup.
+ACTIVE_STATUSES = ("pending_lookups", "processing")
+
+
+def claimable(now: datetime, lease: timedelta) -> Q:
+    """Pending records that nobody holds, or whose lease has run out."""
+    return Q(status="pending") & (
+        Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - lease)
+    )
+
+
+def lease_records(records: QuerySet, count: int, now: datetime) -> list[LookupRecord]:
+    """Claim up to ``count`` of ``records``, oldest first, as of ``now``.
+
+    ``records`` should already be limited to claimable ones.
+    """
+    records = records.order_by("created_at")
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            # Concurrent workers skip each other's rows instead of claiming
+            # the same records twice.
+            records = records.select_for_update(skip_locked=True)
+        claimed = list(records[:count])
+        LookupRecord.objects.filter(pk__in=[record.pk for record in claimed]).update(
+            claimed_at=now
+        )
+    for record in claimed:
+        record.claimed_at = now
+    return claimed
+
+
+def still_held(records: Iterable[LookupRecord]) -> list[LookupRecord]:
+    """Those of ``records`` whose claim nobody has taken over since.
+
+    A record whose lease ran out may have been claimed again, and looked up,
+    by another worker. Call this inside a transaction: where the database
+    supports it, the held rows stay locked until the caller has saved them.
+    """
+    records = list(records)
+    current = LookupRecord.objects.filter(
+        pk__in=[record.pk for record in records], status="pending"
+    )
+    if connection.features.has_select_for_update:
+        current = current.select_for_update()
+    claims = dict(current.values_list("pk", "claimed_at"))
+    return [
+        record
+        for record in records
+        if record.pk in claims and claims[record.pk] == record.claimed_at
+    ]
+
+
+def release_records(records: Iterable[LookupRecord]) -> int:
+    """Hand back claims on records that are still pending."""
+    return LookupRecord.objects.filter(
+        pk__in=[record.pk for record in records], status="pending"
+    ).update(claimed_at=None)
+
+
+def _round_robin(
+    upload_ids: list[UUID], remaining: Callable[[UUID], int]
+) -> Iterator[UUID]:
+    """Yield upload ids one record at a time, cycling through the uploads.
+
+    ``remaining`` is asked for an upload's backlog when the cycle first
+    reaches it, so uploads that never get a turn are never counted.
+    """
+    left: dict[UUID, int] = {}
+    order = list(upload_ids)
+    while order:
+        for upload_id in list(order):
+            if upload_id not in left:
+                left[upload_id] = remaining(upload_id)
+            if left[upload_id] > 0:
+                yield upload_id
+                left[upload_id] -= 1
+            if left[upload_id] <= 0:
+                order.remove(upload_id)
+
+
+class FairShareScheduler:
+    """Hands out pending lookups in weighted round-robin order across users.
+
+    Each claim takes up to ``slice_size`` records. Users take turns, getting
+    ``weight`` records per turn (default 1), and the users served least
+    recently go first. Within a user, records are spread across their uploads,
+    smallest backlog first, so a small CSV gets its first results quickly
+    even while the same user has a huge one in progress. A user never holds
+    more than ``max_in_flight`` unfinished claims. ``upload_ids`` limits the
+    scheduler to some uploads.
+
+    Planning reads the active uploads and the records currently claimed,
+    never the whole backlog, so a slice costs the same however many lookups
+    are waiting.
+
+    Claims are leases: a record whose worker died becomes claimable again
+    after ``lease_seconds``.
+    """
+
+    def __init__(
+        self,
+        slice_size: int | None = None,
+        max_in_flight: int | None = None,
+        weights: dict[str, int] | None = None,
+        lease_seconds: int | None = None,
+        upload_ids: Iterable[UUID | str] | None = None,
+    ):
+        self.slice_size = slice_size or settings.LOOKUP_SLICE_SIZE
+        self.max_in_flight = max_in_flight or settings.LOOKUP_MAX_IN_FLIGHT_PER_USER
+        self.weights = settings.LOOKUP_USER_WEIGHTS if weights is None else weights
+        self.lease = timedelta(
+            seconds=lease_seconds or settings.LOOKUP_LEASE_SECONDS,
+        )
+        self.upload_ids = None if upload_ids is None else list(upload_ids)
+
+    def _claimable(self, now: datetime) -> Q:
+        return claimable(now, self.lease)
+
+    def _active_uploads(self, now: datetime) -> QuerySet:
+        uploads = CSVUpload.objects.filter(status__in=ACTIVE_STATUSES)
+        if self.upload_ids is not None:
+            uploads = uploads.filter(pk__in=self.upload_ids)
+        return uploads.filter(
+            Exists(
+                LookupRecord.objects.filter(
+                    self._claimable(now), csv_upload=OuterRef("pk")
+                )
+            )
+        )
+
+    def _remaining(self, now: datetime) -> Callable[[UUID], int]:
+        def remaining(upload_id: UUID) -> int:
+            # A slice never takes more than slice_size from one upload, so
+            # counting further would only read rows for nothing.
+            return (
+                LookupRecord.objects.filter(
+                    self._claimable(now), csv_upload_id=upload_id
+                )[: self.slice_size]
+                .values("pk")
+                .count()
+            )
+
+        return remaining
+
+    def plan(self, now: datetime | None = None) -> list[UUID]:
+        """Return the upload id of each record to claim next, in serving order."""
+        now = now or timezone.now()
+
+        in_flight = dict(
+            LookupRecord.objects.filter(
+                status="pending", claimed_at__gte=now - self.lease
+            )
+            .values_list("user__username")
+            .annotate(Count("pk"))
+            .order_by()
+        )
+
+        uploads_by_user: dict[str, list[dict]] = defaultdict(list)
+        for row in self._active_uploads(now).values(
+            "pk",
+            "user__username",
+            "created_at",
+            "last_claimed_at",
+            backlog=F("total_rows") - F("processed_rows"),
+        ):
+            uploads_by_user[row["user__username"]].append(row)
+
+        remaining = self._remaining(now)
+        allowance = {}
+        streams = {}
+        for user, uploads in uploads_by_user.items():
+            allowance[user] = self.max_in_flight - in_flight.get(user, 0)
+            if allowance[user] > 0:
+                uploads.sort(key=lambda row: (row["backlog"], row["created_at"]))
+                streams[user] = _round_robin([row["pk"] for row in uploads], remaining)
+
+        never = datetime.min.replace(tzinfo=now.tzinfo)
+
+        def turn_order(user: str) -> tuple:
+            uploads = uploads_by_user[user]
+            return (
+                in_flight.get(user, 0) / self.weights.get(user, 1),
+                max(row["last_claimed_at"] or never for row in uploads),
+                min(row["created_at"] for row in uploads),
+            )
+
+        picks: list[UUID] = []
+        users = sorted(streams, key=turn_order)
+        while users and len(picks) < self.slice_size:
+            for user in list(users):
+                for _ in range(self.weights.get(user, 1)):
+                    upload_id = next(streams[user], None)
+                    if upload_id is None or allowance[user] <= 0:
+                        users.remove(user)
+                        break
+                    picks.append(upload_id)
+                    allowance[user] -= 1
+                    if len(picks) >= self.slice_size:
+                        return picks
+        return picks
+
+    def claim(self, now: datetime | None = None) -> list[LookupRecord]:
+        """Lease the next slice of pending lookups, in serving order."""
+        now = now or timezone.now()
+        picks = self.plan(now)
+        wanted: dict[UUID, int] = defaultdict(int)
+        for upload_id in picks:
+            wanted[upload_id] += 1
+
+        records: dict[UUID, list[LookupRecord]] = {}
+        with transaction.atomic():
+            for upload_id, count in wanted.items():
+                records[upload_id] = lease_records(
+                    LookupRecord.objects.filter(
+                        self._claimable(now), csv_upload_id=upload_id
+                    ),
+                    count,
+                    now,
+                )
+            CSVUpload.objects.filter(pk__in=wanted).update(last_claimed_at=now)
+
+        ordered = []
+        for upload_id in picks:
+            if records[upload_id]:
+                ordered.append(records[upload_id].pop(0))
+        return ordered
+
+    def lease_expiry(self, now: datetime | None = None) -> datetime | None:
+        """When the first claim still held by a worker runs out, if any.
+
+        A worker that dies leaves its claims behind; nothing picks them up
+        until then.
+        """
+        now = now or timezone.now()
+        records = LookupRecord.objects.filter(
+            status="pending", claimed_at__gte=now - self.lease
+        )
+        if self.upload_ids is not None:
+            records = records.filter(csv_upload__in=self.upload_ids)
+        first = records.aggregate(first=Min("claimed_at"))["first"]
+        return None if first is None else first + self.lease
@@ -1,34 +1,340 @@
 """Service layer wrapping core library for Django app."""
 
 import csv
+import functools
+import hashlib
 import io
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime, timedelta
+from itertools import islice
 from pathlib import Path
 
 from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Q
+from django.db.models.constants import OnConflict
+from django.utils import timezone
 
-from csv_upc_omg.barcode_lookup import BarcodeAPIError, fetch_product_title_sync
-from csv_upc_omg.csv_utils import extract_upcs_from_csv
+from csv_upc_omg import metrics
+from csv_upc_omg.barcode_lookup import (
+    BarcodeAPIError,
+    Validators,
+    cached_title,
+    fetch_product_page,
+)
+from csv_upc_omg.config import LookupConfig
+from csv_upc_omg.csv_utils import iter_upcs_from_csv
+from csv_upc_omg.deadline import Deadline
 
+from .coalescing import (
+    acquire_leases,
+    coalesced_lookup,
+    settle_leases,
+    shared_lookup,
+)
+from .exports import FIELDS as EXPORT_FIELDS
+from .exports import stream_export
+from .lookup_config import lookup_config
 from .models import CSVUpload, LookupRecord
+from .scheduling import claimable, lease_records, release_records, still_held
+
+# SQL expressions that mint a fresh UUID primary key inside INSERT ... SELECT,
+# matching how each backend stores UUIDField values.
+UUID_SQL = {
+    "postgresql": "gen_random_uuid()",
+    "mysql": "REPLACE(UUID(), '-', '')",
+    "sqlite": "LOWER(HEX(RANDOMBLOB(16)))",
+}
+
+RESULT_FIELDS = [
+    "product_title",
+    "status",
+    "error_message",
+    "attempts",
+    "next_retry_at",
+    "fetched_at",
+    "etag",
+    "last_modified",
+]
+
+
+def retry_backoff(attempts: int) -> timedelta:
+    """Exponential delay before a lookup that failed ``attempts`` times retries."""
+    seconds = settings.LOOKUP_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.LOOKUP_RETRY_MAX_BACKOFF_SECONDS))
+
+
+# Columns set for the new upload rather than copied by _insert_records_sql.
+_NEW_RECORD_FIELDS = ("csv_upload", "user", "created_at", "updated_at")
+
+# Rows per bulk_create batch or COPY chunk when ingesting an upload; bounds
+# memory regardless of file size.
+INGEST_CHUNK_SIZE = 10_000
+
+
+def _chunks(items: Iterable[str], size: int) -> Iterator[list[str]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _claim_pending(upload: CSVUpload, size: int) -> Iterator[LookupRecord]:
+    """Claim an upload's pending records ``size`` at a time and yield them.
+
+    Records someone else has claimed, such as a fair-share worker, are
+    skipped until their lease runs out. Claims on records still pending
+    when the generator is closed early are handed back.
+    """
+    lease = timedelta(seconds=settings.LOOKUP_LEASE_SECONDS)
+    while True:
+        now = timezone.now()
+        chunk = lease_records(upload.lookups.filter(claimable(now, lease)), size, now)
+        if not chunk:
+            return
+        try:
+            yield from chunk
+        except GeneratorExit:
+            release_records(chunk)
+            raise
+
+
+def _insert_records_sql(
+    upload: CSVUpload,
+    source: str,
+    source_params: list,
+    selects: dict[str, tuple[str, list]] | None = None,
+    now: datetime | None = None,
+) -> tuple[str, list]:
+    """Build an INSERT ... SELECT creating ``upload``'s records from ``source``.
+
+    ``source`` is the SQL after FROM. Each record gets a new id, the upload
+    and its owner, and ``now`` (default: the current time) as timestamps.
+    ``selects`` maps other field names to an SQL expression and its params.
+    Without ``selects`` the remaining columns are copied from ``source``'s
+    rows; with it, fields it does not name take their defaults. Rows whose
+    UPC the upload already has are skipped.
+    """
+    now = now or timezone.now()
+    columns = []
+    expressions = []
+    params: list = []
+    for field in LookupRecord._meta.concrete_fields:
+        columns.append(connection.ops.quote_name(field.column))
+        if field.primary_key:
+            expressions.append(UUID_SQL[connection.vendor])
+        elif selects is not None and field.name in selects:
+            expression, values = selects[field.name]
+            expressions.append(expression)
+            params.extend(values)
+        elif selects is None and field.name not in _NEW_RECORD_FIELDS:
+            expressions.append(connection.ops.quote_name(field.column))
+        else:
+            value = {
+                "csv_upload": upload.pk,
+                "user": upload.user_id,
+                "created_at": now,
+                "updated_at": now,
+            }.get(field.name, field.get_default())
+            expressions.append("%s")
+            params.append(field.get_db_prep_save(value, connection))
+
+    table = connection.ops.quote_name(LookupRecord._meta.db_table)
+    sql = (
+        f"{connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)} "
+        f"{table} ({', '.join(columns)}) "
+        f"SELECT {', '.join(expressions)} FROM {source} "
+        + connection.ops.on_conflict_suffix_sql(
+            LookupRecord._meta.concrete_fields, OnConflict.IGNORE, None, None
+        )
+    )
+    return sql, params + source_params
+
+
+def _copy_from(cursor, sql: str, data: str) -> None:
+    """Run a COPY ... FROM STDIN with either psycopg driver."""
+    raw = cursor.cursor
+    if hasattr(raw, "copy_expert"):
+        raw.copy_expert(sql, io.StringIO(data))
+    else:
+        with raw.copy(sql) as copy:
+            copy.write(data)
 
 
 class UploadService:
     """Service layer for processing CSV uploads and barcode lookups."""
 
     @staticmethod
-    def process_upload(upload: CSVUpload) -> int:
-        """Read CSV, create LookupRecords, return count of UPCs found."""
-        file_path = Path(upload.file.path)
-        upcs = extract_upcs_from_csv(file_path)
-        upload.total_rows = len(upcs)
+    def compute_content_hash(file) -> str:
+        """Return the SHA-256 of an uploaded file.
+
+        Uses the digest recorded by the hashing upload handlers when present,
+        falling back to a single pass over the file's chunks.
+        """
+        content_hash = getattr(file, "content_hash", None)
+        if content_hash:
+            return content_hash
+
+        hasher = hashlib.sha256()
+        for chunk in file.chunks():
+            hasher.update(chunk)
+        file.seek(0)
+        return hasher.hexdigest()
+
+    @staticmethod
+    def find_duplicate_upload(upload: CSVUpload) -> CSVUpload | None:
+        """Return the user's latest completed upload with identical content."""
+        if not upload.content_hash:
+            return None
+        return (
+            CSVUpload.objects.filter(
+                user=upload.user,
+                content_hash=upload.content_hash,
+                status="completed",
+            )
+            .exclude(pk=upload.pk)
+            .order_by("-created_at")
+            .first()
+        )
+
+    @staticmethod
+    def copy_results(source: CSVUpload, target: CSVUpload) -> int:
+        """Copy source's LookupRecords onto target with one INSERT ... SELECT.
+
+        UPCs the target already has a record for are skipped, so copying
+        again (e.g. when a failed upload is reprocessed) does not fail.
+        """
+        fk_field = LookupRecord._meta.get_field("csv_upload")
+        table = connection.ops.quote_name(LookupRecord._meta.db_table)
+        sql, params = _insert_records_sql(
+            target,
+            f"{table} WHERE {connection.ops.quote_name(fk_field.column)} = %s",
+            [fk_field.get_db_prep_value(source.pk, connection)],
+        )
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                copied = cursor.rowcount
+
+            target.total_rows = source.total_rows
+            target.processed_rows = source.processed_rows
+            target.status = "completed"
+            target.save(update_fields=["total_rows", "processed_rows", "status"])
+        return copied
+
+    @staticmethod
+    def reuse_duplicate_results(upload: CSVUpload) -> bool:
+        """Short-circuit an upload whose content was already processed.
+
+        A completed upload already has its results (say, reused when it was
+        created) and is left as it is, so calling this again is harmless.
+        """
+        if upload.status == "completed":
+            return True
+        source = UploadService.find_duplicate_upload(upload)
+        if source is None:
+            return False
+        UploadService.copy_results(source, upload)
+        return True
+
+    @staticmethod
+    def process_upload(upload: CSVUpload, upcs: Iterable[str] | None = None) -> int:
+        """Read CSV, create LookupRecords, return count of UPCs found.
+
+        The file is streamed in chunks unless ``upcs`` were already parsed
+        (by the streaming upload handlers). PostgreSQL loads each chunk with
+        COPY; other databases fall back to chunked bulk_create.
+        """
+        if upcs is None:
+            upcs = iter_upcs_from_csv(Path(upload.file.path))
+        if connection.vendor == "postgresql":
+            count = UploadService.ingest_with_copy(upload, upcs)
+        else:
+            count = UploadService.ingest_with_bulk_create(upload, upcs)
+
+        upload.total_rows = count
         upload.save(update_fields=["total_rows"])
+        return count
 
-        records = [
-            LookupRecord(csv_upload=upload, upc=upc, status="pending") for upc in upcs
-        ]
-        LookupRecord.objects.bulk_create(records, ignore_conflicts=True)
-        return len(records)
+    @staticmethod
+    def ingest_with_bulk_create(
+        upload: CSVUpload, upcs: Iterable[str], chunk_size: int = INGEST_CHUNK_SIZE
+    ) -> int:
+        """Create pending LookupRecords one bulk_create batch at a time."""
+        count = 0
+        with transaction.atomic():
+            for chunk in _chunks(upcs, chunk_size):
+                LookupRecord.objects.bulk_create(
+                    [
+                        LookupRecord(
+                            csv_upload=upload,
+                            user_id=upload.user_id,
+                            upc=upc,
+                            status="pending",
+                        )
+                        for upc in chunk
+                    ],
+                    ignore_conflicts=True,
+                )
+                count += len(chunk)
+        return count
+
+    @staticmethod
+    def ingest_with_copy(
+        upload: CSVUpload, upcs: Iterable[str], chunk_size: int = INGEST_CHUNK_SIZE
+    ) -> int:
+        """COPY UPCs into a staging table, then merge them in one INSERT.
+
+        PostgreSQL only. Duplicate UPCs are dropped by ``ON CONFLICT DO
+        NOTHING``. ``created_at`` is offset by each row's position in the file,
+        so records keep the file order.
+        """
+        count = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE upc_staging "
+                "(seq bigserial, upc text) ON COMMIT DROP"
+            )
+            for chunk in _chunks(upcs, chunk_size):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows([upc] for upc in chunk)
+                _copy_from(
+                    cursor,
+                    "COPY upc_staging (upc) FROM STDIN WITH (FORMAT csv)",
+                    buffer.getvalue(),
+                )
+                count += len(chunk)
+
+            sql, params = UploadService._merge_staging_sql(upload)
+            cursor.execute(sql, params)
+            # ON COMMIT DROP only fires when the outermost transaction ends;
+            # drop it now so another ingest in the same transaction can
+            # create it again.
+            cursor.execute("DROP TABLE upc_staging")
+        return count
+
+    @staticmethod
+    def _merge_staging_sql(upload: CSVUpload) -> tuple[str, list]:
+        """Build the INSERT ... SELECT that moves staged UPCs into records."""
+        now = timezone.now()
+        return _insert_records_sql(
+            upload,
+            "upc_staging ORDER BY seq",
+            [],
+            # The other columns take their defaults; created_at is offset
+            # by each row's position in the file.
+            {
+                "upc": ("upc", []),
+                "created_at": ("%s + seq * INTERVAL '1 microsecond'", [now]),
+            },
+            now,
+        )
 
     @staticmethod
     async def aprocess_upload(upload: CSVUpload) -> int:
@@ -36,75 +342,409 @@ class UploadService:
         return await sync_to_async(UploadService.process_upload)(upload)
 
     @staticmethod
-    def lookup_upc(upc: str, timeout: float = 10.0) -> dict:
-        """Call barcode_lookup, return dict with title/status/error."""
+    def lookup_upc(
+        upc: str, timeout: float = 10.0, config: LookupConfig | None = None
+    ) -> dict:
+        """Call barcode_lookup, return dict with title/status/error.
+
+        Results cached in this worker are returned without touching the
+        database; otherwise concurrent lookups of the same UPC share one
+        fetch (see coalescing). ``config`` defaults to the one built from
+        settings.
+        """
+        return UploadService._lookup(upc, timeout, config, coalesced_lookup)
+
+    @staticmethod
+    def _lookup(
+        upc: str,
+        timeout: float,
+        config: LookupConfig | None,
+        coalesce: Callable[[str, float, Callable[[str, float], dict]], dict],
+    ) -> dict:
+        hit, title = cached_title(upc)
+        if hit:
+            return UploadService._title_result(title)
+        fetch = functools.partial(
+            UploadService._fetch_result, config=config or lookup_config()
+        )
+        return coalesce(upc, timeout, fetch)
+
+    @staticmethod
+    def _title_result(title: str | None) -> dict:
+        if title:
+            return {"title": title, "status": "success", "error": ""}
+        return {"title": None, "status": "not_found", "error": ""}
+
+    @staticmethod
+    def _fetch_result(upc: str, timeout: float, config: LookupConfig) -> dict:
         try:
-            title = fetch_product_title_sync(upc, timeout=timeout)
-            if title:
-                return {"title": title, "status": "success", "error": ""}
-            return {"title": None, "status": "not_found", "error": ""}
+            page = fetch_product_page(upc, timeout=timeout, config=config)
         except BarcodeAPIError as e:
             return {"title": None, "status": "failed", "error": str(e)}
+        # Kept so refresh_stale_titles can revalidate the page cheaply.
+        return {
+            **UploadService._title_result(page.title),
+            "etag": page.validators.etag or "",
+            "last_modified": page.validators.last_modified or "",
+        }
 
     @staticmethod
-    async def alookup_upc(upc: str, timeout: float = 10.0) -> dict:
+    async def alookup_upc(
+        upc: str, timeout: float = 10.0, config: LookupConfig | None = None
+    ) -> dict:
         """Async version of lookup_upc."""
         return await sync_to_async(UploadService.lookup_upc, thread_sensitive=True)(
-            upc, timeout
+            upc, timeout, config
         )
 
     @staticmethod
-    def batch_lookup(upload: CSVUpload, timeout: float = 10.0) -> dict:
-        """Process all pending lookups for an upload."""
-        pending = upload.lookups.filter(status="pending")
+    def _apply_result(record: LookupRecord, lookup_result: dict) -> None:
+        """Store a lookup outcome on its record and schedule any retry."""
+        record.product_title = lookup_result["title"]
+        record.status = lookup_result["status"]
+        record.error_message = lookup_result["error"]
+        record.attempts += 1
+        # Results from the cache or another worker's lease carry no validators.
+        record.etag = lookup_result.get("etag", "")
+        record.last_modified = lookup_result.get("last_modified", "")
+        now = timezone.now()
+        if record.status == "failed":
+            record.next_retry_at = now + retry_backoff(record.attempts)
+        else:
+            record.next_retry_at = None
+            record.fetched_at = now
+
+    @staticmethod
+    def batch_lookup(
+        upload: CSVUpload,
+        timeout: float = 10.0,
+        deadline: float | None = None,
+        config: LookupConfig | None = None,
+        workers: int = 1,
+    ) -> dict:
+        """Process all pending lookups for an upload.
+
+        With a ``deadline`` (seconds), lookups stop once it passes; records
+        not yet looked up stay pending, are counted under "pending", and the
+        upload is left in pending_lookups. With more than one worker, lookups
+        run on that many threads sharing the config's client, and results
+        are saved a claim at a time.
+
+        Records are claimed like the fair-share scheduler's, so the two
+        never look up the same record at once. Each claim is no bigger than
+        the workers can get through within LOOKUP_LEASE_SECONDS; a record
+        whose lease ran out and was claimed again regardless is left to the
+        worker that has it now.
+        """
+        results = {"success": 0, "not_found": 0, "failed": 0, "pending": 0}
+        budget = Deadline(deadline)
+        config = config or lookup_config()
+        size = UploadService._claim_size(timeout, workers)
+        with closing(_claim_pending(upload, size)) as pending:
+            if workers > 1:
+                batches = UploadService._lookup_in_threads(
+                    pending, timeout, budget, config, workers, size
+                )
+            else:
+                batches = UploadService._lookup_serially(
+                    pending, timeout, budget, config
+                )
+            for batch in batches:
+                UploadService._save_results(upload, batch, results)
+
+        # Includes records another worker still holds, as well as any left
+        # over at the deadline.
+        results["pending"] = upload.lookups.filter(status="pending").count()
+        upload.status = "pending_lookups" if results["pending"] else "completed"
+        upload.save(update_fields=["status"])
+        return results
+
+    @staticmethod
+    def _claim_size(timeout: float, workers: int) -> int:
+        """Records to claim at once, so they are all done within the lease.
+
+        Each worker looks up a record at a time, which can take ``timeout``.
+        Claims never exceed LOOKUP_WRITE_BATCH_SIZE.
+        """
+        size = settings.LOOKUP_WRITE_BATCH_SIZE
+        if timeout > 0:
+            size = min(size, int(settings.LOOKUP_LEASE_SECONDS // timeout) * workers)
+        return max(1, size)
+
+    @staticmethod
+    def _save_results(
+        upload: CSVUpload, batch: list[tuple[LookupRecord, dict]], results: dict
+    ) -> None:
+        """Save a batch of lookups on the records this worker still holds."""
+        with metrics.timed_stage("db_write"), transaction.atomic():
+            held = {record.pk for record in still_held(r for r, _ in batch)}
+            saved = []
+            for record, lookup_result in batch:
+                if record.pk in held:
+                    UploadService._apply_result(record, lookup_result)
+                    results[lookup_result["status"]] += 1
+                    saved.append(record)
+            LookupRecord.objects.bulk_update(saved, RESULT_FIELDS)
+            CSVUpload.objects.filter(pk=upload.pk).update(
+                processed_rows=F("processed_rows") + len(saved)
+            )
+        upload.processed_rows += len(saved)
+
+    @staticmethod
+    def _lookup_serially(
+        records: Iterable[LookupRecord],
+        timeout: float,
+        budget: Deadline,
+        config: LookupConfig,
+    ) -> Iterator[list[tuple[LookupRecord, dict]]]:
+        """Look records up one at a time, yielding each as its own batch."""
+        for record in records:
+            if budget.expired:
+                return
+            lookup_result = UploadService.lookup_upc(
+                record.upc, budget.clamp(timeout), config
+            )
+            if lookup_result["status"] == "failed" and budget.expired:
+                # Most likely cut short by the deadline; try it next run.
+                return
+            yield [(record, lookup_result)]
+
+    @staticmethod
+    def _lookup_in_threads(
+        records: Iterable[LookupRecord],
+        timeout: float,
+        budget: Deadline,
+        config: LookupConfig,
+        workers: int,
+        batch_size: int,
+    ) -> Iterator[list[tuple[LookupRecord, dict]]]:
+        """Look records up on a thread pool, yielding ``batch_size`` at a time.
+
+        Only the lookups run on the pool, coalesced within this process.
+        Each batch comes back to the calling thread, which does every
+        database write over its own connection: it leases the batch's UPCs
+        before handing them to the pool and publishes the results after.
+        UPCs another worker is already looking up are waited for on the
+        calling thread. Records reached after the deadline, and failures
+        once it has passed, are left out.
+        """
+
+        def lookup(
+            record: LookupRecord, coalesce=shared_lookup
+        ) -> tuple[LookupRecord, dict] | None:
+            if budget.expired:
+                return None
+            lookup_result = UploadService._lookup(
+                record.upc, budget.clamp(timeout), config, coalesce
+            )
+            if lookup_result["status"] == "failed" and budget.expired:
+                return None
+            return record, lookup_result
+
+        records = iter(records)
+        with ThreadPoolExecutor(workers, thread_name_prefix="lookup") as executor:
+            while chunk := list(islice(records, batch_size)):
+                # Long enough for every round of lookups the pool runs.
+                rounds = -(-len(chunk) // workers)
+                led = acquire_leases((record.upc for record in chunk), timeout * rounds)
+                batch: list[tuple[LookupRecord, dict]] = []
+                try:
+                    for done in executor.map(
+                        lookup, [record for record in chunk if record.upc in led]
+                    ):
+                        if done:
+                            batch.append(done)
+                finally:
+                    settle_leases(led, {record.upc: result for record, result in batch})
+                for record in chunk:
+                    if record.upc not in led and (
+                        done := lookup(record, coalesced_lookup)
+                    ):
+                        batch.append(done)
+                yield batch
+                if budget.expired:
+                    return
+
+    @staticmethod
+    def run_claimed_lookups(
+        records: list[LookupRecord],
+        timeout: float = 10.0,
+        config: LookupConfig | None = None,
+    ) -> dict:
+        """Look up records claimed by the scheduler, across any uploads.
+
+        Uploads are marked completed once none of their records are pending.
+        """
         results = {"success": 0, "not_found": 0, "failed": 0}
+        per_upload: Counter = Counter()
+        config = config or lookup_config()
 
-        for record in pending:
-            lookup_result = UploadService.lookup_upc(record.upc, timeout)
-            record.product_title = lookup_result["title"]
-            record.status = lookup_result["status"]
-            record.error_message = lookup_result["error"]
-            record.save(update_fields=["product_title", "status", "error_message"])
+        CSVUpload.objects.filter(
+            pk__in={record.csv_upload_id for record in records},
+            status="pending_lookups",
+        ).update(status="processing")
+
+        for record in records:
+            lookup_result = UploadService.lookup_upc(record.upc, timeout, config)
+            with metrics.timed_stage("db_write"), transaction.atomic():
+                if not still_held([record]):
+                    # The lease ran out and another worker has the record now.
+                    continue
+                UploadService._apply_result(record, lookup_result)
+                record.save(update_fields=RESULT_FIELDS)
             results[lookup_result["status"]] += 1
-            upload.processed_rows += 1
-            upload.save(update_fields=["processed_rows"])
+            per_upload[record.csv_upload_id] += 1
 
-        upload.status = "completed"
-        upload.save(update_fields=["status"])
+        with metrics.timed_stage("db_write"):
+            for upload_id, count in per_upload.items():
+                CSVUpload.objects.filter(pk=upload_id).update(
+                    processed_rows=F("processed_rows") + count
+                )
+            CSVUpload.objects.filter(pk__in=per_upload).exclude(
+                lookups__status="pending"
+            ).update(status="completed")
         return results
 
     @staticmethod
-    async def abatch_lookup(upload: CSVUpload, timeout: float = 10.0) -> dict:
+    def retry_failed_lookups(uploads, force: bool = False) -> int:
+        """Re-queue failed lookups of the given uploads, leaving the rest alone.
+
+        Only records whose backoff has elapsed and that have attempts left
+        are reset to pending; ``force`` ignores the backoff. Affected uploads
+        go back to ``pending_lookups``. Returns the number of records re-queued.
+        """
+        failed = LookupRecord.objects.filter(
+            csv_upload__in=uploads,
+            status="failed",
+            attempts__lt=settings.LOOKUP_MAX_ATTEMPTS,
+        )
+        if not force:
+            failed = failed.filter(
+                Q(next_retry_at__isnull=True) | Q(next_retry_at__lte=timezone.now())
+            )
+
+        with transaction.atomic():
+            per_upload = Counter(
+                dict(
+                    failed.values_list("csv_upload")
+                    .annotate(count=Count("pk"))
+                    .order_by()
+                )
+            )
+            requeued = failed.update(
+                status="pending", error_message="", next_retry_at=None, claimed_at=None
+            )
+            for upload_id, count in per_upload.items():
+                CSVUpload.objects.filter(pk=upload_id).update(
+                    status="pending_lookups",
+                    processed_rows=F("processed_rows") - count,
+                )
+        return requeued
+
+    @staticmethod
+    def refresh_stale_titles(
+        uploads,
+        older_than: timedelta,
+        timeout: float = 10.0,
+        deadline: float | None = None,
+        config: LookupConfig | None = None,
+    ) -> dict:
+        """Revalidate titles of the given uploads fetched before ``older_than``.
+
+        Each stale UPC is requested once, conditionally on the ETag and
+        Last-Modified stored from its last fetch, and the answer is applied
+        to every stale record with that UPC. A 304 only bumps fetched_at.
+        Lookups that fail leave their records untouched. Stops starting new
+        requests once ``deadline`` seconds have passed.
+        """
+        now = timezone.now()
+        cutoff = now - older_than
+        stale = LookupRecord.objects.filter(
+            Q(fetched_at__lt=cutoff)
+            | Q(fetched_at__isnull=True, updated_at__lt=cutoff),
+            csv_upload__in=uploads,
+            status__in=["success", "not_found"],
+        )
+        by_upc = (
+            stale.values("upc")
+            .annotate(etag=Max("etag"), last_modified=Max("last_modified"))
+            .order_by()
+        )
+        results = {"not_modified": 0, "success": 0, "not_found": 0, "failed": 0}
+        budget = Deadline(deadline)
+        config = config or lookup_config()
+
+        for row in by_upc:
+            if budget.expired:
+                break
+            validators = Validators(row["etag"] or None, row["last_modified"] or None)
+            try:
+                page = fetch_product_page(
+                    row["upc"], budget.clamp(timeout), validators, config=config
+                )
+            except BarcodeAPIError:
+                results["failed"] += 1
+                continue
+
+            refreshed = timezone.now()
+            fields = {"fetched_at": refreshed, "updated_at": refreshed}
+            if page.not_modified:
+                results["not_modified"] += 1
+            else:
+                status = "success" if page.title else "not_found"
+                results[status] += 1
+                fields.update(
+                    product_title=page.title,
+                    status=status,
+                    etag=page.validators.etag or "",
+                    last_modified=page.validators.last_modified or "",
+                )
+            with metrics.timed_stage("db_write"):
+                stale.filter(upc=row["upc"]).update(**fields)
+        return results
+
+    @staticmethod
+    async def abatch_lookup(
+        upload: CSVUpload,
+        timeout: float = 10.0,
+        deadline: float | None = None,
+        config: LookupConfig | None = None,
+    ) -> dict:
         """Async version of batch_lookup."""
         return await sync_to_async(UploadService.batch_lookup, thread_sensitive=True)(
-            upload, timeout
+            upload, timeout, deadline, config
         )
 
     @staticmethod
     def export_to_csv(upload: CSVUpload) -> io.BytesIO:
         """Generate enriched CSV with UPC + title + status."""
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["upc", "product_title", "status", "error_message"])
-
-        for record in upload.lookups.all():
-            writer.writerow(
-                [
-                    record.upc,
-                    record.product_title or "",
-                    record.status,
-                    record.error_message,
-                ]
-            )
+        return io.BytesIO(b"".join(UploadService.export_upload(upload, "csv")))
 
-        output.seek(0)
-        return io.BytesIO(output.getvalue().encode("utf-8"))
+    @staticmethod
+    def export_upload(upload: CSVUpload, fmt: str) -> Iterator[bytes]:
+        """Stream an upload's lookups in one of ``exports.FORMATS``."""
+        return stream_export(upload.lookups.all(), fmt)
+
+    @staticmethod
+    def export_user_lookups(user: User, fmt: str) -> Iterator[bytes]:
+        """Stream every lookup across a user's uploads, naming each upload."""
+        records = LookupRecord.objects.filter(user=user).order_by("created_at", "id")
+        return stream_export(records, fmt, (*EXPORT_FIELDS, "csv_upload__filename"))
+
+    @staticmethod
+    def get_lookup_count(user: User) -> int:
+        """Count a user's lookups, cached briefly to spare repeated COUNT(*)s."""
+        return cache.get_or_set(
+            f"inventory:lookup-count:{user.pk}",
+            lambda: LookupRecord.objects.filter(user=user).count(),
+            settings.LOOKUP_COUNT_CACHE_SECONDS,
+        )
 
     @staticmethod
     def get_dashboard_stats(user: User) -> dict:
         """Aggregate stats for dashboard view."""
         uploads = CSVUpload.objects.filter(user=user)
-        total_lookups = LookupRecord.objects.filter(csv_upload__in=uploads)
+        total_lookups = LookupRecord.objects.filter(user=user)
         success_count = total_lookups.filter(status="success").count()
         total_count = total_lookups.count()
 
@@ -1,42 +1,191 @@
 """Background tasks using django-tasks."""
 
+import functools
+
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django_tasks import task
+from django_tasks.backends.immediate import ImmediateBackend
+
+from csv_upc_omg.profiling import profile_run
 
+from .lookup_config import lookup_config
 from .models import CSVUpload
+from .scheduling import FairShareScheduler
 from .services import UploadService
+from .uploadhandlers import stored_upcs
 
 
-@task
-def process_csv_task(upload_id: str) -> int:
-    """Process uploaded CSV and create LookupRecords."""
-    upload = CSVUpload.objects.get(id=upload_id)
+def profiled(func):
+    """Profile each run of a task when PROFILE_TASKS is enabled."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not settings.PROFILE_TASKS:
+            return func(*args, **kwargs)
+        with profile_run(
+            func.__name__, settings.PROFILE_DIR, memory=settings.PROFILE_MEMORY
+        ):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def upload_priority(upload: CSVUpload) -> int:
+    """Rank small uploads ahead of large ones; higher runs first."""
+    try:
+        size = upload.file.size
+    except (ValueError, OSError):
+        return 0
+    for max_bytes, priority in settings.TASK_UPLOAD_PRIORITY_TIERS:
+        if size <= max_bytes:
+            return priority
+    return settings.TASK_LARGE_UPLOAD_PRIORITY
+
+
+def enqueue_upload(upload: CSVUpload, run_lookups: bool = True, upcs=None):
+    """Queue parsing for an upload, followed by its lookups.
+
+    Lookups are enqueued by the parsing task once it succeeds, so with
+    separate worker pools they can never start on a half-parsed upload.
+    UPCs already parsed by the streaming upload handlers are stored for the
+    parsing task, which then skips a second read of the file; ``upcs`` is
+    closed once stored. Records are never created in the caller's request.
+    """
+    spool = None
+    if upcs is not None:
+        spool = upcs.save(f"spools/{upload.pk}.txt")
+    return process_csv_task.using(priority=upload_priority(upload)).enqueue(
+        upload_id=str(upload.id), run_lookups=run_lookups, spool=spool
+    )
+
+
+def enqueue_lookups(uploads, priority: int = 0):
+    """Schedule a fair-share lookup run for uploads that have new pending records.
+
+    A worker run serves every user's backlog. A backend that runs tasks
+    inline, in the request that queued them, only gets ``uploads``, so one
+    upload's request does not do every other user's lookups as well.
+    """
+    task = fair_share_lookup_task.using(priority=priority)
+    if isinstance(task.get_backend(), ImmediateBackend):
+        return task.enqueue(upload_ids=[str(upload.pk) for upload in uploads])
+    return task.enqueue()
+
+
+def ingest_upload(upload: CSVUpload, upcs=None) -> int:
+    """Create an upload's LookupRecords, tracking its status."""
     upload.status = "processing"
     upload.save(update_fields=["status"])
 
     try:
-        count = UploadService.process_upload(upload)
+        count = UploadService.process_upload(upload, upcs)
         upload.status = "pending_lookups"
         upload.save(update_fields=["status"])
-        return count
     except Exception as e:
         upload.status = "failed"
         upload.error_message = str(e)
         upload.save(update_fields=["status", "error_message"])
         raise
+    return count
+
+
+@task(queue_name="parsing")
+@profiled
+def process_csv_task(
+    upload_id: str, run_lookups: bool = False, spool: str | None = None
+) -> int:
+    """Process uploaded CSV and create LookupRecords.
+
+    ``spool`` names UPCs stored by :func:`enqueue_upload`, read in place of
+    the file and deleted afterwards.
+    """
+    try:
+        upload = CSVUpload.objects.get(id=upload_id)
+        if upload.is_ingested or UploadService.reuse_duplicate_results(upload):
+            return upload.total_rows
+
+        upcs = None if spool is None else stored_upcs(spool)
+        count = ingest_upload(upload, upcs)
+    finally:
+        if spool is not None:
+            default_storage.delete(spool)
+    if run_lookups:
+        enqueue_lookups([upload], priority=upload_priority(upload))
+    return count
 
 
-@task
-def lookup_batch_task(upload_id: str, timeout: float = 10.0) -> dict:
-    """Run barcode lookups for all rows in an upload."""
+@task(queue_name="lookups")
+@profiled
+def lookup_batch_task(
+    upload_id: str,
+    timeout: float = 10.0,
+    deadline: float | None = None,
+    workers: int | None = None,
+) -> dict:
+    """Run barcode lookups for all rows in an upload, within ``deadline``.
+
+    ``workers`` threads share the lookups (default: LOOKUP_TASK_THREADS).
+    """
     upload = CSVUpload.objects.get(id=upload_id)
     upload.status = "processing"
     upload.save(update_fields=["status"])
 
     try:
-        results = UploadService.batch_lookup(upload, timeout)
+        results = UploadService.batch_lookup(
+            upload,
+            timeout,
+            deadline,
+            lookup_config(),
+            workers or settings.LOOKUP_TASK_THREADS,
+        )
         return results
     except Exception as e:
         upload.status = "failed"
         upload.error_message = str(e)
         upload.save(update_fields=["status", "error_message"])
         raise
+
+
+@task(queue_name="lookups")
+@profiled
+def fair_share_lookup_task(
+    timeout: float = 10.0, upload_ids: list[str] | None = None
+) -> dict:
+    """Work through every user's pending lookups in fair-share slices.
+
+    Each slice is re-planned, so uploads queued while this runs get their
+    turn straight away. Several of these can run at once on the lookups
+    pool; each exits once nothing is left to claim. ``upload_ids`` limits
+    the run to some uploads.
+
+    Claims still held by other workers when this runs out of work may
+    belong to a worker that died, so another run is deferred to when
+    their leases expire, where the backend supports it.
+    """
+    scheduler = FairShareScheduler(upload_ids=upload_ids)
+    config = lookup_config()
+    results = {"success": 0, "not_found": 0, "failed": 0}
+    while records := scheduler.claim():
+        for status, count in UploadService.run_claimed_lookups(
+            records, timeout, config
+        ).items():
+            results[status] += count
+
+    expiry = scheduler.lease_expiry()
+    if expiry and fair_share_lookup_task.get_backend().supports_defer:
+        fair_share_lookup_task.using(run_after=expiry).enqueue(
+            timeout=timeout, upload_ids=upload_ids
+        )
+    return results
+
+
+def enqueue_retries(uploads, force: bool = False) -> int:
+    """Re-queue the failed lookups of some uploads and schedule a run for them.
+
+    Only the failed records are looked up again; the CSVs are not re-parsed.
+    """
+    requeued = UploadService.retry_failed_lookups(uploads, force=force)
+    if requeued:
+        enqueue_lookups(uploads)
+    return requeued
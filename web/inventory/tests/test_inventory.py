@@ -2,13 +2,19 @@
 
 import csv
 import io
-from unittest.mock import patch
+import tempfile
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import ANY, patch
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
 
-from csv_upc_omg.barcode_lookup import BarcodeAPIError
+from csv_upc_omg import metrics
+from csv_upc_omg.barcode_lookup import BarcodeAPIError, ProductPage, Validators
 from inventory.models import CSVUpload, LookupRecord
 from inventory.services import UploadService
 
@@ -29,6 +35,10 @@ CSV_FIVE_UNIQUE = b"""000000000001
 CSV_EMPTY = b""
 
 
+def product_page(title, etag=None, last_modified=None):
+    return ProductPage(title, Validators(etag, last_modified))
+
+
 def make_uploaded_csv(filename="test.csv", content=CSV_WITH_UPCS_IN_COL_0):
     return SimpleUploadedFile(filename, content, content_type="text/csv")
 
@@ -110,38 +120,154 @@ class UploadServiceTests(TestCase):
         UploadService.process_upload(upload2)
         self.assertEqual(LookupRecord.objects.filter(csv_upload=upload2).count(), 3)
 
-    @patch("inventory.services.fetch_product_title_sync")
+    def test_bulk_create_ingest_in_chunks(self):
+        upcs = ["012345678905", "071710276009", "012345678905", "000000000001"]
+        count = UploadService.ingest_with_bulk_create(self.upload, upcs, chunk_size=2)
+        self.assertEqual(count, 4)
+        self.assertEqual(
+            list(self.upload.lookups.values_list("upc", flat=True)),
+            ["012345678905", "071710276009", "000000000001"],
+        )
+
+    @patch.object(UploadService, "ingest_with_copy", return_value=5)
+    @patch("inventory.services.connection")
+    def test_process_upload_uses_copy_on_postgres(self, mock_connection, mock_copy):
+        mock_connection.vendor = "postgresql"
+        self.assertEqual(UploadService.process_upload(self.upload), 5)
+        self.assertEqual(
+            list(mock_copy.call_args.args[1]),
+            ["012345678905", "071710276009", "INVALID", "071710276009", "012345678905"],
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "COPY is PostgreSQL only")
+    def test_copy_ingest_twice_in_one_transaction(self):
+        upload2 = CSVUpload.objects.create(
+            user=self.user, filename="second.csv", status="pending"
+        )
+        # The test case's transaction stays open across both ingests.
+        upcs = ["012345678905", "071710276009", "012345678905"]
+        self.assertEqual(UploadService.ingest_with_copy(self.upload, upcs), 3)
+        self.assertEqual(UploadService.ingest_with_copy(upload2, upcs[:1]), 1)
+        self.assertEqual(
+            list(
+                self.upload.lookups.order_by("created_at").values_list("upc", flat=True)
+            ),
+            ["012345678905", "071710276009"],
+        )
+        self.assertEqual(upload2.lookups.count(), 1)
+
+    def test_merge_staging_sql_fills_every_column(self):
+        sql, params = UploadService._merge_staging_sql(self.upload)
+        fields = LookupRecord._meta.concrete_fields
+        self.assertEqual(sql.count("%s"), len(params))
+        self.assertEqual(sql.split(") SELECT ")[0].count(",") + 1, len(fields))
+        # Shares copy_results' builder, duplicates skipped the backend's way.
+        if connection.vendor == "postgresql":
+            self.assertTrue(sql.endswith("ON CONFLICT DO NOTHING"))
+        else:
+            self.assertTrue(sql.startswith("INSERT OR IGNORE INTO"))
+        self.assertIn("FROM upc_staging ORDER BY seq", sql)
+
+    @patch("inventory.services.fetch_product_page")
     def test_lookup_upc_success(self, mock_fetch):
-        mock_fetch.return_value = "Test Widget"
+        mock_fetch.return_value = product_page("Test Widget")
         result = UploadService.lookup_upc("012345678905")
         self.assertEqual(result["status"], "success")
         self.assertEqual(result["title"], "Test Widget")
 
-    @patch("inventory.services.fetch_product_title_sync")
+    @patch("inventory.services.fetch_product_page")
     def test_lookup_upc_not_found(self, mock_fetch):
-        mock_fetch.return_value = None
+        mock_fetch.return_value = product_page(None)
         result = UploadService.lookup_upc("000000000000")
         self.assertEqual(result["status"], "not_found")
         self.assertIsNone(result["title"])
 
-    @patch("inventory.services.fetch_product_title_sync")
+    @patch("inventory.services.fetch_product_page")
     def test_lookup_upc_api_error(self, mock_fetch):
         mock_fetch.side_effect = BarcodeAPIError("Rate limited")
         result = UploadService.lookup_upc("012345678905")
         self.assertEqual(result["status"], "failed")
         self.assertIn("Rate limited", result["error"])
 
-    @patch("inventory.services.fetch_product_title_sync")
+    @patch("inventory.services.fetch_product_page")
+    def test_lookup_upc_served_from_worker_cache(self, mock_fetch):
+        from csv_upc_omg import barcode_lookup
+        from inventory.models import LookupLease
+
+        barcode_lookup._cache.set("012345678905", "Cached Widget")
+        try:
+            result = UploadService.lookup_upc("012345678905")
+        finally:
+            barcode_lookup.clear_cache()
+        self.assertEqual(result["title"], "Cached Widget")
+        mock_fetch.assert_not_called()
+        self.assertFalse(LookupLease.objects.exists())
+
+    def test_lookup_upc_replays_recorded_archive(self):
+        from csv_upc_omg.replay import RecordedResponse, ResponseArchive
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "responses.zip"
+            with ResponseArchive(path, "a") as archive:
+                page = b'<div class="product-details"><h4>Replayed</h4></div>'
+                archive.put("012345678905", RecordedResponse(200, page))
+
+            with override_settings(LOOKUP_REPLAY_ARCHIVE=str(path)):
+                result = UploadService.lookup_upc("012345678905")
+        self.assertEqual(result["title"], "Replayed")
+
+    @override_settings(
+        LOOKUP_USER_AGENTS=["agent-a", "agent-b"],
+        LOOKUP_PROXY="http://proxy:3128",
+        LOOKUP_MAX_CONNECTIONS=3,
+    )
+    def test_lookup_config_built_once_from_settings(self):
+        from inventory.lookup_config import lookup_config
+
+        config = lookup_config()
+        self.assertIs(lookup_config(), config)
+        self.assertEqual(config.user_agents, ("agent-a", "agent-b"))
+        self.assertEqual(config.proxy, "http://proxy:3128")
+        self.assertEqual(config.max_connections, 3)
+
+    @override_settings(LOOKUP_MAX_CONNECTIONS=6, LOOKUP_LATENCY_TARGET_SECONDS=0.5)
+    def test_lookup_config_shares_adaptive_limiter(self):
+        from inventory.lookup_config import lookup_config
+
+        limiter = lookup_config().limiter
+        self.assertEqual((limiter.maximum, limiter.latency_target), (6, 0.5))
+        with override_settings(LOOKUP_ADAPTIVE_CONCURRENCY=False):
+            self.assertIsNone(lookup_config().limiter)
+
+    @patch("inventory.services.fetch_product_page")
+    def test_batch_lookup_shares_one_config(self, mock_fetch):
+        from csv_upc_omg.config import LookupConfig
+
+        mock_fetch.return_value = product_page("Widget")
+        UploadService.process_upload(self.upload)
+        config = LookupConfig()
+        UploadService.batch_lookup(self.upload, config=config)
+        self.assertTrue(mock_fetch.call_args_list)
+        for call in mock_fetch.call_args_list:
+            self.assertIs(call.kwargs["config"], config)
+
+    @patch("inventory.services.fetch_product_page")
     def test_batch_lookup_updates_records(self, mock_fetch):
         rec = LookupRecord.objects.create(
             csv_upload=self.upload, upc="012345678905", status="pending"
         )
-        mock_fetch.return_value = "Found Product"
+        mock_fetch.return_value = product_page(
+            "Found Product", '"v1"', "Mon, 19 Oct 2026 00:00:00 GMT"
+        )
         results = UploadService.batch_lookup(self.upload)
         self.assertEqual(results["success"], 1)
         rec.refresh_from_db()
         self.assertEqual(rec.product_title, "Found Product")
         self.assertEqual(rec.status, "success")
+        # The page's validators are kept for revalidating it later.
+        self.assertEqual(
+            (rec.etag, rec.last_modified), ('"v1"', "Mon, 19 Oct 2026 00:00:00 GMT")
+        )
         self.upload.refresh_from_db()
         self.assertEqual(self.upload.status, "completed")
 
@@ -175,6 +301,1333 @@ class UploadServiceTests(TestCase):
         self.assertGreaterEqual(len(stats["recent_uploads"]), 1)
 
 
+# ── upload deduplication ────────────────────────────────────────────
+
+
+class UploadDeduplicationTests(TestCase):
+    """Identical re-uploads reuse results instead of re-running lookups."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass")
+        self.client.login(username="tester", password="pass")
+
+    def _completed_upload(self):
+        upload = CSVUpload.objects.create(
+            user=self.user,
+            filename="first.csv",
+            status="completed",
+            total_rows=2,
+            processed_rows=2,
+            content_hash=UploadService.compute_content_hash(
+                make_uploaded_csv(content=CSV_FIVE_UNIQUE)
+            ),
+        )
+        LookupRecord.objects.create(
+            csv_upload=upload, upc="000000000001", status="success", product_title="A"
+        )
+        LookupRecord.objects.create(
+            csv_upload=upload, upc="000000000002", status="not_found"
+        )
+        return upload
+
+    def test_upload_handler_hash_matches_fallback(self):
+        self.client.post(
+            "/uploads/create/", {"file": make_uploaded_csv(content=CSV_FIVE_UNIQUE)}
+        )
+        upload = CSVUpload.objects.get()
+        self.assertEqual(
+            upload.content_hash,
+            UploadService.compute_content_hash(
+                make_uploaded_csv(content=CSV_FIVE_UNIQUE)
+            ),
+        )
+
+    def test_copy_results_inserts_records_for_target(self):
+        source = self._completed_upload()
+        target = CSVUpload.objects.create(
+            user=self.user, filename="again.csv", content_hash=source.content_hash
+        )
+        self.assertTrue(UploadService.reuse_duplicate_results(target))
+        target.refresh_from_db()
+        self.assertEqual(target.status, "completed")
+        self.assertEqual(target.total_rows, 2)
+        copied = {r.upc: r for r in target.lookups.all()}
+        self.assertEqual(copied["000000000001"].product_title, "A")
+        self.assertEqual(copied["000000000002"].status, "not_found")
+        self.assertEqual(source.lookups.count(), 2)
+
+    def test_copy_results_again_skips_existing_records(self):
+        source = self._completed_upload()
+        target = CSVUpload.objects.create(
+            user=self.user, filename="again.csv", content_hash=source.content_hash
+        )
+        self.assertEqual(UploadService.copy_results(source, target), 2)
+        self.assertEqual(UploadService.copy_results(source, target), 0)
+        self.assertEqual(target.lookups.count(), 2)
+
+    def test_api_process_after_reused_create(self):
+        """The documented create-then-process flow does not copy twice."""
+        source = self._completed_upload()
+        resp = self.client.post(
+            "/api/v1/uploads/",
+            {
+                "file": make_uploaded_csv(content=CSV_FIVE_UNIQUE),
+                "filename": "again.csv",
+            },
+        )
+        self.assertEqual(resp.status_code, 201)
+        upload = CSVUpload.objects.exclude(pk=source.pk).get()
+        self.assertEqual(upload.status, "completed")
+
+        resp = self.client.post(f"/api/v1/uploads/{upload.id}/process/")
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.json()["status"], "completed")
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, "completed")
+        self.assertEqual(upload.lookups.count(), 2)
+
+    def test_duplicate_requires_same_user(self):
+        source = self._completed_upload()
+        other = User.objects.create_user(username="other", password="pass")
+        target = CSVUpload.objects.create(
+            user=other, filename="theirs.csv", content_hash=source.content_hash
+        )
+        self.assertFalse(UploadService.reuse_duplicate_results(target))
+
+    @patch("inventory.views.enqueue_upload")
+    def test_reupload_skips_tasks(self, mock_enqueue):
+        self._completed_upload()
+        self.client.post(
+            "/uploads/create/", {"file": make_uploaded_csv(content=CSV_FIVE_UNIQUE)}
+        )
+        mock_enqueue.assert_not_called()
+        latest = CSVUpload.objects.order_by("-created_at").first()
+        self.assertEqual(latest.lookups.count(), 2)
+
+
+# ── streaming uploads ───────────────────────────────────────────────
+
+
+class StreamingUploadTests(TestCase):
+    """UPCs are parsed while the upload streams in, never re-read from disk."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass")
+        self.client.login(username="tester", password="pass")
+
+    def _handled_file(self, filename, content, chunk_size=4):
+        from django.core.files.uploadhandler import StopFutureHandlers
+
+        from inventory.uploadhandlers import StreamingMemoryFileUploadHandler
+
+        handler = StreamingMemoryFileUploadHandler()
+        handler.handle_raw_input(None, {}, len(content), "boundary")
+        with self.assertRaises(StopFutureHandlers):
+            # The memory handler claims the file for the handlers after it.
+            handler.new_file("file", filename, "text/csv", len(content))
+        for start in range(0, len(content), chunk_size):
+            handler.receive_data_chunk(content[start : start + chunk_size], start)
+        return handler.file_complete(len(content))
+
+    def test_handler_parses_chunks(self):
+        file_obj = self._handled_file("test.csv", CSV_WITH_UPCS_IN_COL_0)
+        self.assertEqual(
+            list(file_obj.upcs),
+            [
+                "012345678905",
+                "071710276009",
+                "INVALID",
+                "071710276009",
+                "012345678905",
+            ],
+        )
+        self.assertEqual(
+            file_obj.content_hash,
+            UploadService.compute_content_hash(make_uploaded_csv()),
+        )
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=16)
+    def test_parsed_upcs_spill_to_disk(self):
+        from inventory.uploadhandlers import SpooledUPCs
+
+        upcs = SpooledUPCs()
+        parsed = CSV_FIVE_UNIQUE.decode().split() * 4
+        upcs.extend(parsed)
+        self.assertTrue(upcs._file._rolled)
+        self.assertEqual(list(upcs), parsed)
+        upcs.close()
+
+    def test_handler_skips_undecodable_files(self):
+        self.assertIsNone(self._handled_file("bad.csv", b"\xff\xfe1234\n").upcs)
+        self.assertIsNone(self._handled_file("notes.txt", b"1234\n").upcs)
+
+    @patch("inventory.services.iter_upcs_from_csv")
+    @patch("inventory.tasks.fair_share_lookup_task")
+    def test_view_ingests_without_rereading(self, mock_lookups, mock_iter):
+        self.client.post(
+            "/uploads/create/", {"file": make_uploaded_csv(content=CSV_FIVE_UNIQUE)}
+        )
+        upload = CSVUpload.objects.get()
+        mock_iter.assert_not_called()
+        self.assertEqual(upload.status, "pending_lookups")
+        self.assertEqual(upload.total_rows, 5)
+        self.assertEqual(upload.lookups.count(), 5)
+        mock_lookups.using.return_value.enqueue.assert_called_once()
+
+    def test_view_queues_parsed_upcs(self):
+        from django.core.files.storage import default_storage
+
+        from inventory.tasks import process_csv_task
+
+        with (
+            patch("inventory.tasks.process_csv_task") as mock_parse,
+            patch.object(UploadService, "process_upload") as mock_process,
+        ):
+            self.client.post(
+                "/uploads/create/",
+                {"file": make_uploaded_csv(content=CSV_FIVE_UNIQUE)},
+            )
+        # The request only stored the parsed UPCs and queued them.
+        mock_process.assert_not_called()
+        upload = CSVUpload.objects.get()
+        self.assertEqual(upload.lookups.count(), 0)
+        enqueue = mock_parse.using.return_value.enqueue
+        enqueue.assert_called_once_with(
+            upload_id=str(upload.id), run_lookups=True, spool=ANY
+        )
+
+        spool = enqueue.call_args.kwargs["spool"]
+        with patch("inventory.services.iter_upcs_from_csv") as mock_iter:
+            process_csv_task.call(str(upload.id), spool=spool)
+        mock_iter.assert_not_called()
+        self.assertEqual(upload.lookups.count(), 5)
+        self.assertFalse(default_storage.exists(spool))
+
+    @patch("inventory.services.iter_upcs_from_csv")
+    def test_api_create_ingests_records(self, mock_iter):
+        resp = self.client.post(
+            "/api/v1/uploads/",
+            {"file": make_uploaded_csv(content=CSV_FIVE_UNIQUE), "filename": "a.csv"},
+        )
+        self.assertEqual(resp.status_code, 201)
+        mock_iter.assert_not_called()
+        upload = CSVUpload.objects.get()
+        self.assertEqual(upload.status, "pending_lookups")
+        self.assertEqual(upload.lookups.count(), 5)
+
+
+# ── task profiling ──────────────────────────────────────────────────
+
+
+class TaskProfilingTests(TestCase):
+    """PROFILE_TASKS dumps a profile per task run."""
+
+    def test_process_task_writes_profile(self):
+        from inventory.tasks import process_csv_task
+
+        user = User.objects.create_user(username="tester", password="pass")
+        upload = CSVUpload.objects.create(
+            user=user, filename="test.csv", file=make_uploaded_csv()
+        )
+        with tempfile.TemporaryDirectory() as profile_dir:
+            with override_settings(PROFILE_TASKS=True, PROFILE_DIR=profile_dir):
+                process_csv_task.enqueue(upload_id=str(upload.id))
+            profiles = list(Path(profile_dir).glob("process_csv_task-*.prof"))
+        self.assertEqual(len(profiles), 1)
+
+    @patch("inventory.services.fetch_product_page")
+    def test_inline_lookup_task_inside_profiled_task(self, mock_fetch):
+        from inventory.tasks import process_csv_task
+
+        mock_fetch.return_value = product_page("Widget")
+        user = User.objects.create_user(username="tester", password="pass")
+        upload = CSVUpload.objects.create(
+            user=user, filename="test.csv", file=make_uploaded_csv()
+        )
+        with tempfile.TemporaryDirectory() as profile_dir:
+            with override_settings(PROFILE_TASKS=True, PROFILE_DIR=profile_dir):
+                process_csv_task.enqueue(upload_id=str(upload.id), run_lookups=True)
+            profiles = [path.name for path in Path(profile_dir).iterdir()]
+        # The lookups ran inline, inside the parsing task's profile.
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].startswith("process_csv_task-"))
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, "completed")
+
+
+# ── task queues ─────────────────────────────────────────────────────
+
+
+class TaskQueueTests(TestCase):
+    """Parsing and lookups run on separate queues; small uploads go first."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass")
+
+    def _upload(self, content=CSV_FIVE_UNIQUE):
+        return CSVUpload.objects.create(
+            user=self.user, filename="test.csv", file=make_uploaded_csv(content=content)
+        )
+
+    def test_tasks_use_separate_queues(self):
+        from inventory.tasks import lookup_batch_task, process_csv_task
+
+        self.assertEqual(process_csv_task.queue_name, "parsing")
+        self.assertEqual(lookup_batch_task.queue_name, "lookups")
+
+    @override_settings(
+        TASK_UPLOAD_PRIORITY_TIERS=[(10, 50), (100, 0)],
+        TASK_LARGE_UPLOAD_PRIORITY=-50,
+    )
+    def test_upload_priority_favours_small_files(self):
+        from inventory.tasks import upload_priority
+
+        self.assertEqual(upload_priority(self._upload(b"1\n")), 50)
+        self.assertEqual(upload_priority(self._upload(CSV_FIVE_UNIQUE)), 0)
+        self.assertEqual(upload_priority(self._upload(CSV_FIVE_UNIQUE * 10)), -50)
+
+    @patch("inventory.services.fetch_product_page")
+    def test_enqueue_upload_runs_lookups_after_parsing(self, mock_fetch):
+        from inventory.tasks import enqueue_upload
+
+        mock_fetch.return_value = product_page("Widget")
+        upload = self._upload()
+        enqueue_upload(upload)
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, "completed")
+        self.assertEqual(mock_fetch.call_count, 5)
+
+    @patch("inventory.services.fetch_product_page")
+    def test_api_process_only_parses(self, mock_fetch):
+        upload = self._upload()
+        self.client.login(username="tester", password="pass")
+        resp = self.client.post(f"/api/v1/uploads/{upload.id}/process/")
+        self.assertEqual(resp.status_code, 200)
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, "pending_lookups")
+        mock_fetch.assert_not_called()
+
+        # A second request leaves the ingested records alone.
+        resp = self.client.post(f"/api/v1/uploads/{upload.id}/process/")
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(upload.lookups.count(), 5)
+
+    def test_parsing_task_skips_ingested_upload(self):
+        from inventory.tasks import process_csv_task
+
+        upload = self._upload()
+        process_csv_task.call(str(upload.id))
+        with patch("inventory.tasks.ingest_upload") as mock_ingest:
+            self.assertEqual(process_csv_task.call(str(upload.id)), 5)
+        mock_ingest.assert_not_called()
+
+    @patch("inventory.management.commands.task_workers.time.sleep")
+    @patch("inventory.management.commands.task_workers.subprocess.Popen")
+    def test_task_workers_starts_configured_pools(self, mock_popen, mock_sleep):
+        from django.core.management import call_command
+
+        mock_popen.return_value.poll.return_value = 0
+        with override_settings(TASK_WORKER_CONCURRENCY={"parsing": 1, "lookups": 2}):
+            call_command("task_workers", "--once", stdout=io.StringIO())
+
+        queues = [call.args[0][4] for call in mock_popen.call_args_list]
+        self.assertEqual(queues, ["parsing", "lookups", "lookups"])
+
+
+# ── fair-share scheduling ───────────────────────────────────────────
+
+
+class FairShareSchedulerTests(TestCase):
+    """Pending lookups are interleaved across users with a per-user cap."""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username="alice", password="pass")
+        self.bob = User.objects.create_user(username="bob", password="pass")
+        self.big = self._upload(self.alice, 10)
+        self.small = self._upload(self.bob, 2)
+
+    def _upload(self, user, rows):
+        upload = CSVUpload.objects.create(
+            user=user, filename="test.csv", status="pending_lookups", total_rows=rows
+        )
+        LookupRecord.objects.bulk_create(
+            LookupRecord(csv_upload=upload, upc=f"{i:012d}") for i in range(rows)
+        )
+        return upload
+
+    def _scheduler(self, **kwargs):
+        from inventory.scheduling import FairShareScheduler
+
+        options = {"slice_size": 6, "max_in_flight": 50, "weights": {}}
+        options.update(kwargs)
+        return FairShareScheduler(**options)
+
+    def _owners(self, picks):
+        names = {self.big.pk: "alice", self.small.pk: "bob"}
+        return [names[upload_id] for upload_id in picks]
+
+    def test_plan_interleaves_users(self):
+        picks = self._scheduler().plan()
+        self.assertEqual(
+            self._owners(picks), ["alice", "bob", "alice", "bob", "alice", "alice"]
+        )
+
+    def test_plan_honours_weights(self):
+        picks = self._scheduler(weights={"alice": 2}).plan()
+        self.assertEqual(self._owners(picks)[:3], ["alice", "alice", "bob"])
+
+    def test_in_flight_cap_limits_user(self):
+        scheduler = self._scheduler(max_in_flight=3, slice_size=2)
+        first = scheduler.claim()
+        second = scheduler.claim()
+        alice_claims = [r for r in first + second if r.csv_upload_id == self.big.pk]
+        self.assertEqual(len(alice_claims), 2)
+        self.assertEqual(self._owners(scheduler.plan()), ["alice"])
+
+    def test_expired_claims_are_reclaimable(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        scheduler = self._scheduler(slice_size=12, lease_seconds=60)
+        self.assertEqual(len(scheduler.claim()), 12)
+        self.assertEqual(scheduler.claim(), [])
+        later = timezone.now() + timedelta(seconds=61)
+        self.assertEqual(len(scheduler.claim(now=later)), 12)
+
+    @patch("inventory.services.fetch_product_page")
+    def test_fair_share_task_completes_all_uploads(self, mock_fetch):
+        from inventory.tasks import fair_share_lookup_task
+
+        mock_fetch.return_value = product_page("Widget")
+        with override_settings(LOOKUP_SLICE_SIZE=4):
+            result = fair_share_lookup_task.enqueue()
+        self.assertEqual(result.return_value["success"], 12)
+        for upload in (self.big, self.small):
+            upload.refresh_from_db()
+            self.assertEqual(upload.status, "completed")
+            self.assertEqual(upload.processed_rows, upload.total_rows)
+
+    def test_plan_reads_only_uploads_it_serves(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        for _ in range(20):
+            self._upload(self.bob, 50)
+        with CaptureQueriesContext(connection) as queries:
+            picks = self._scheduler().plan()
+        self.assertEqual(len(picks), 6)
+        # In-flight counts and active uploads, then one capped count per
+        # upload the slice reaches.
+        self.assertLessEqual(len(queries), 2 + 6)
+
+    @patch("inventory.services.fetch_product_page")
+    def test_batch_lookup_skips_claimed_records(self, mock_fetch):
+        mock_fetch.return_value = product_page("Widget")
+        claimed = self._scheduler(slice_size=1).claim()
+        self.assertEqual(claimed[0].csv_upload_id, self.big.pk)
+
+        results = UploadService.batch_lookup(self.big)
+
+        self.assertEqual((results["success"], results["pending"]), (9, 1))
+        self.assertEqual(mock_fetch.call_count, 9)
+        claimed[0].refresh_from_db()
+        self.assertEqual(claimed[0].status, "pending")
+        self.big.refresh_from_db()
+        self.assertEqual(self.big.status, "pending_lookups")
+
+    @override_settings(LOOKUP_LEASE_SECONDS=30)
+    @patch("inventory.services.fetch_product_page")
+    def test_lease_taken_over_mid_chunk_is_not_saved_twice(self, mock_fetch):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        taken = []
+
+        def fetch(upc, timeout, validators=None, config=None):
+            if not taken:
+                # Three 10s lookups fit in the 30s lease, so only three are
+                # claimed. The lease then runs out and a fair-share worker
+                # claims every pending record.
+                self.assertEqual(
+                    self.big.lookups.filter(claimed_at__isnull=False).count(), 3
+                )
+                later = timezone.now() + timedelta(seconds=31)
+                taken.extend(self._scheduler(slice_size=20).claim(now=later))
+            return product_page("Widget")
+
+        mock_fetch.side_effect = fetch
+        results = UploadService.batch_lookup(self.big, timeout=10.0)
+        self.assertEqual((results["success"], results["pending"]), (0, 10))
+
+        UploadService.run_claimed_lookups(taken)
+        self.big.refresh_from_db()
+        self.assertEqual(self.big.processed_rows, 10)
+        self.assertEqual(self.big.status, "completed")
+        self.assertEqual(set(self.big.lookups.values_list("attempts", flat=True)), {1})
+
+    @patch("inventory.services.fetch_product_page")
+    def test_run_is_deferred_until_outstanding_claims_expire(self, mock_fetch):
+        from datetime import timedelta
+
+        from django.conf import settings
+
+        from inventory import tasks
+
+        mock_fetch.return_value = product_page("Widget")
+        held = self._scheduler(slice_size=1).claim()[0]
+        run = tasks.fair_share_lookup_task.func
+        with patch("inventory.tasks.fair_share_lookup_task") as mock_task:
+            mock_task.get_backend.return_value.supports_defer = True
+            result = run()
+
+        self.assertEqual(result["success"], 11)
+        expiry = held.claimed_at + timedelta(seconds=settings.LOOKUP_LEASE_SECONDS)
+        mock_task.using.assert_called_once_with(run_after=expiry)
+        mock_task.using.return_value.enqueue.assert_called_once_with(
+            timeout=10.0, upload_ids=None
+        )
+
+    @patch("inventory.services.fetch_product_page")
+    def test_no_deferred_run_without_outstanding_claims(self, mock_fetch):
+        from inventory import tasks
+
+        mock_fetch.return_value = product_page("Widget")
+        run = tasks.fair_share_lookup_task.func
+        with patch("inventory.tasks.fair_share_lookup_task") as mock_task:
+            mock_task.get_backend.return_value.supports_defer = True
+            run()
+        mock_task.using.assert_not_called()
+
+    @patch("inventory.services.fetch_product_page")
+    def test_inline_run_only_serves_its_upload(self, mock_fetch):
+        from inventory.tasks import enqueue_lookups
+
+        mock_fetch.return_value = product_page("Widget")
+        enqueue_lookups([self.small])
+
+        self.small.refresh_from_db()
+        self.assertEqual(self.small.status, "completed")
+        self.assertEqual(self.big.lookups.filter(status="pending").count(), 10)
+
+
+# ── retrying failed lookups ─────────────────────────────────────────
+
+
+class RetryFailedLookupsTests(TestCase):
+    """Only failed records are looked up again, with backoff between tries."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass")
+        self.upload = CSVUpload.objects.create(
+            user=self.user, filename="test.csv", status="pending_lookups", total_rows=3
+        )
+        for upc in ("000000000001", "000000000002", "000000000003"):
+            LookupRecord.objects.create(csv_upload=self.upload, upc=upc)
+
+    def _fail_one(self, mock_fetch):
+        def fetch(upc, timeout, validators=None, config=None):
+            if upc == "000000000002":
+                raise BarcodeAPIError("Rate limited")
+            return product_page("Widget")
+
+        mock_fetch.side_effect = fetch
+        UploadService.batch_lookup(self.upload)
+        return LookupRecord.objects.get(upc="000000000002")
+
+    @patch("inventory.services.fetch_product_page")
+    def test_failure_records_attempt_and_backoff(self, mock_fetch):
+        failed = self._fail_one(mock_fetch)
+        self.assertEqual(failed.status, "failed")
+        self.assertEqual(failed.attempts, 1)
+        self.assertIsNotNone(failed.next_retry_at)
+        self.assertEqual(
+            LookupRecord.objects.get(upc="000000000001").next_retry_at, None
+        )
+
+    @patch("inventory.services.fetch_product_page")
+    def test_retry_waits_for_backoff_unless_forced(self, mock_fetch):
+        self._fail_one(mock_fetch)
+        uploads = CSVUpload.objects.all()
+        self.assertEqual(UploadService.retry_failed_lookups(uploads), 0)
+        self.assertEqual(UploadService.retry_failed_lookups(uploads, force=True), 1)
+
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.status, "pending_lookups")
+        self.assertEqual(self.upload.processed_rows, 2)
+
+    @patch("inventory.services.fetch_product_page")
+    def test_retry_looks_up_only_failed_records(self, mock_fetch):
+        from inventory.tasks import enqueue_retries
+
+        self._fail_one(mock_fetch)
+        mock_fetch.reset_mock(side_effect=True)
+        mock_fetch.return_value = product_page("Recovered")
+
+        self.assertEqual(enqueue_retries(CSVUpload.objects.all(), force=True), 1)
+        mock_fetch.assert_called_once_with("000000000002", timeout=10.0, config=ANY)
+        retried = LookupRecord.objects.get(upc="000000000002")
+        self.assertEqual(retried.product_title, "Recovered")
+        self.assertEqual(retried.attempts, 2)
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.status, "completed")
+        self.assertEqual(self.upload.processed_rows, 3)
+
+    @override_settings(LOOKUP_MAX_ATTEMPTS=1)
+    @patch("inventory.services.fetch_product_page")
+    def test_retry_gives_up_after_max_attempts(self, mock_fetch):
+        self._fail_one(mock_fetch)
+        requeued = UploadService.retry_failed_lookups(
+            CSVUpload.objects.all(), force=True
+        )
+        self.assertEqual(requeued, 0)
+
+    @patch("inventory.api.views.enqueue_retries", return_value=1)
+    def test_api_retry_action(self, mock_retry):
+        self.client.login(username="tester", password="pass")
+        resp = self.client.post(
+            f"/api/v1/uploads/{self.upload.id}/retry/", {"force": "true"}
+        )
+        self.assertEqual(resp.json(), {"requeued": 1})
+
+    @patch("inventory.services.fetch_product_page")
+    def test_retry_command(self, mock_fetch):
+        from django.core.management import call_command
+
+        self._fail_one(mock_fetch)
+        out = io.StringIO()
+        call_command(
+            "retry_failed_lookups",
+            "--upload",
+            str(self.upload.id),
+            "--force",
+            stdout=out,
+        )
+        self.assertIn("Re-queued 1 failed lookups.", out.getvalue())
+
+
+# ── refreshing stale titles ─────────────────────────────────────────
+
+
+class RefreshStaleTitlesTests(TestCase):
+    """Old titles are revalidated with one conditional request per UPC."""
+
+    UPC = "012345678905"
+
+    def setUp(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        self.user = User.objects.create_user(username="tester", password="pass")
+        old = timezone.now() - timedelta(days=40)
+        for name in ("a.csv", "b.csv"):
+            upload = CSVUpload.objects.create(user=self.user, filename=name)
+            LookupRecord.objects.create(
+                csv_upload=upload,
+                upc=self.UPC,
+                status="success",
+                product_title="Old Widget",
+                fetched_at=old,
+                etag='"v1"',
+            )
+        LookupRecord.objects.create(
+            csv_upload=upload,
+            upc="071710276009",
+            status="success",
+            product_title="Fresh",
+            fetched_at=timezone.now(),
+        )
+
+    def _refresh(self):
+        from datetime import timedelta
+
+        return UploadService.refresh_stale_titles(
+            CSVUpload.objects.all(), timedelta(days=30)
+        )
+
+    @patch("inventory.services.fetch_product_page")
+    def test_not_modified_keeps_title(self, mock_page):
+        from csv_upc_omg.barcode_lookup import ProductPage, Validators
+
+        mock_page.return_value = ProductPage(
+            None, Validators('"v1"'), not_modified=True
+        )
+        results = self._refresh()
+
+        self.assertEqual(results["not_modified"], 1)
+        mock_page.assert_called_once_with(
+            self.UPC, 10.0, Validators('"v1"'), config=ANY
+        )
+        for record in LookupRecord.objects.filter(upc=self.UPC):
+            self.assertEqual(record.product_title, "Old Widget")
+            self.assertGreater(record.fetched_at, record.created_at)
+        self.assertEqual(self._refresh()["not_modified"], 0)
+
+    @patch("inventory.services.fetch_product_page")
+    def test_changed_page_updates_title_and_validators(self, mock_page):
+        from csv_upc_omg.barcode_lookup import ProductPage, Validators
+
+        mock_page.return_value = ProductPage("New Widget", Validators('"v2"'))
+        results = self._refresh()
+
+        self.assertEqual(results["success"], 1)
+        titles = set(
+            LookupRecord.objects.filter(upc=self.UPC).values_list(
+                "product_title", "etag"
+            )
+        )
+        self.assertEqual(titles, {("New Widget", '"v2"')})
+
+    @patch("inventory.services.fetch_product_page")
+    def test_failure_leaves_records_alone(self, mock_page):
+        mock_page.side_effect = BarcodeAPIError("Rate limited")
+        results = self._refresh()
+
+        self.assertEqual(results["failed"], 1)
+        self.assertEqual(
+            LookupRecord.objects.filter(product_title="Old Widget").count(), 2
+        )
+
+    @patch("inventory.services.fetch_product_page")
+    def test_refresh_command(self, mock_page):
+        from django.core.management import call_command
+
+        from csv_upc_omg.barcode_lookup import ProductPage, Validators
+
+        mock_page.return_value = ProductPage(
+            None, Validators('"v1"'), not_modified=True
+        )
+        out = io.StringIO()
+        call_command("refresh_stale_titles", "--days", "30", stdout=out)
+        self.assertIn("Checked 1 UPCs: 1 unchanged", out.getvalue())
+
+    @patch("inventory.services.fetch_product_page")
+    def test_lookup_records_fetch_time(self, mock_fetch):
+        mock_fetch.return_value = product_page("Widget")
+        upload = CSVUpload.objects.create(user=self.user, filename="c.csv")
+        record = LookupRecord.objects.create(csv_upload=upload, upc="000000000001")
+        UploadService.batch_lookup(upload)
+        record.refresh_from_db()
+        self.assertIsNotNone(record.fetched_at)
+
+
+# ── lookup deadlines ────────────────────────────────────────────────
+
+
+class LookupDeadlineTests(TestCase):
+    """A batch stops at its deadline, leaving the rest pending."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass")
+        self.upload = CSVUpload.objects.create(
+            user=self.user, filename="test.csv", status="pending_lookups", total_rows=3
+        )
+        for upc in ("000000000001", "000000000002", "000000000003"):
+            LookupRecord.objects.create(csv_upload=self.upload, upc=upc)
+
+    @staticmethod
+    def _slow(outcome):
+        def fetch(upc, timeout, validators=None, config=None):
+            import time
+
+            time.sleep(0.06)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        return fetch
+
+    @patch("inventory.services.fetch_product_page")
+    def test_batch_stops_at_deadline(self, mock_fetch):
+        mock_fetch.side_effect = self._slow(product_page("Widget"))
+        results = UploadService.batch_lookup(self.upload, deadline=0.05)
+
+        self.assertEqual(results["success"], 1)
+        self.assertEqual(results["pending"], 2)
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.status, "pending_lookups")
+        self.assertEqual(self.upload.processed_rows, 1)
+
+    @patch("inventory.services.fetch_product_page")
+    def test_failure_at_deadline_stays_pending(self, mock_fetch):
+        mock_fetch.side_effect = self._slow(BarcodeAPIError("Timeout"))
+        results = UploadService.batch_lookup(self.upload, deadline=0.05)
+
+        self.assertEqual(results["failed"], 0)
+        self.assertEqual(results["pending"], 3)
+        record = LookupRecord.objects.get(upc="000000000001")
+        self.assertEqual((record.status, record.attempts), ("pending", 0))
+        # Claims are handed back, so the next run need not wait out the lease.
+        self.assertFalse(self.upload.lookups.filter(claimed_at__isnull=False).exists())
+
+    @patch("inventory.services.fetch_product_page")
+    def test_request_timeout_clamped_to_deadline(self, mock_fetch):
+        mock_fetch.return_value = product_page("Widget")
+        UploadService.batch_lookup(self.upload, timeout=10.0, deadline=5.0)
+
+        for call in mock_fetch.call_args_list:
+            self.assertLessEqual(call.kwargs["timeout"], 5.0)
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.status, "completed")
+
+    @patch("inventory.services.fetch_product_page")
+    def test_api_lookup_passes_deadline(self, mock_fetch):
+        self.client.login(username="tester", password="pass")
+        resp = self.client.post(
+            f"/api/v1/uploads/{self.upload.id}/lookup/",
+            {"deadline": 0},
+            content_type="application/json",
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["results"]["pending"], 3)
+        mock_fetch.assert_not_called()
+
+    @patch("inventory.services.fetch_product_page")
+    def test_api_lookup_parses_form_encoded_deadline(self, mock_fetch):
+        self.client.login(username="tester", password="pass")
+        resp = self.client.post(
+            f"/api/v1/uploads/{self.upload.id}/lookup/", {"deadline": "0"}
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["results"]["pending"], 3)
+
+    def test_api_lookup_rejects_bad_deadline(self):
+        self.client.login(username="tester", password="pass")
+        for deadline in ("soon", "-1"):
+            resp = self.client.post(
+                f"/api/v1/uploads/{self.upload.id}/lookup/", {"deadline": deadline}
+            )
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn("deadline", resp.json())
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.status, "pending_lookups")
+
+
+# ── lookup coalescing ───────────────────────────────────────────────
+
+
+class LookupCoalescingTests(TestCase):
+    """Workers looking up one UPC at once share a single fetch."""
+
+    UPC = "012345678905"
+
+    def _lease(self, **fields):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from inventory.models import LookupLease
+
+        now = timezone.now()
+        defaults = {"started_at": now, "expires_at": now + timedelta(minutes=1)}
+        return LookupLease.objects.create(upc=self.UPC, **{**defaults, **fields})
+
+    @patch("inventory.services.fetch_product_page")
+    def test_leader_stores_result_on_lease(self, mock_fetch):
+        from inventory.models import LookupLease
+
+        mock_fetch.return_value = product_page("Widget")
+        result = UploadService.lookup_upc(self.UPC)
+
+        self.assertEqual(result["title"], "Widget")
+        lease = LookupLease.objects.get(upc=self.UPC)
+        self.assertIsNotNone(lease.finished_at)
+        self.assertEqual((lease.product_title, lease.status), ("Widget", "success"))
+
+    @patch("inventory.services.fetch_product_page")
+    def test_waiter_reuses_result_of_live_lease(self, mock_fetch):
+        from django.utils import timezone
+
+        from inventory.models import LookupLease
+
+        self._lease()
+
+        def holder_finishes(seconds):
+            LookupLease.objects.filter(upc=self.UPC).update(
+                finished_at=timezone.now(), product_title="Shared", status="success"
+            )
+
+        with patch("inventory.coalescing.time.sleep", side_effect=holder_finishes):
+            result = UploadService.lookup_upc(self.UPC)
+
+        mock_fetch.assert_not_called()
+        self.assertEqual(result, {"title": "Shared", "status": "success", "error": ""})
+
+    @patch("inventory.services.fetch_product_page")
+    def test_expired_lease_is_taken_over(self, mock_fetch):
+        from django.utils import timezone
+
+        self._lease(expires_at=timezone.now())
+        mock_fetch.return_value = product_page("Widget")
+
+        result = UploadService.lookup_upc(self.UPC)
+
+        mock_fetch.assert_called_once()
+        self.assertEqual(result["status"], "success")
+
+    @patch("inventory.services.fetch_product_page")
+    def test_lease_dropped_when_lookup_raises(self, mock_fetch):
+        from inventory.models import LookupLease
+
+        mock_fetch.side_effect = RuntimeError("worker crashed")
+        with self.assertRaises(RuntimeError):
+            UploadService.lookup_upc(self.UPC)
+        self.assertFalse(LookupLease.objects.exists())
+
+    @override_settings(LOOKUP_COALESCE_ACROSS_WORKERS=False)
+    @patch("inventory.services.fetch_product_page")
+    def test_disabled_skips_lease(self, mock_fetch):
+        from inventory.models import LookupLease
+
+        mock_fetch.return_value = product_page("Widget")
+        UploadService.lookup_upc(self.UPC)
+        self.assertFalse(LookupLease.objects.exists())
+
+
+# ── threaded lookups ────────────────────────────────────────────────
+
+
+class ThreadedLookupTests(TestCase):
+    """Lookups run on a thread pool; the calling thread saves results in bulk.
+
+    Pool threads never touch the database: their own connections could not
+    write to SQLite's test database while the test's transaction is open.
+    """
+
+    UPCS = [f"{i:012d}" for i in range(1, 6)]
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass")
+        self.upload = CSVUpload.objects.create(
+            user=self.user, filename="test.csv", status="pending_lookups", total_rows=5
+        )
+        for upc in self.UPCS:
+            LookupRecord.objects.create(csv_upload=self.upload, upc=upc)
+
+    @override_settings(LOOKUP_WRITE_BATCH_SIZE=2)
+    @patch("inventory.services.fetch_product_page")
+    def test_batch_lookup_on_threads_writes_in_batches(self, mock_fetch):
+        import threading
+
+        lookup_threads = set()
+
+        def fetch(upc, timeout, validators=None, config=None):
+            lookup_threads.add(threading.current_thread().name)
+            return product_page(None if upc.endswith("3") else f"Widget {upc}")
+
+        mock_fetch.side_effect = fetch
+        bulk_update = LookupRecord.objects.bulk_update
+        with patch.object(
+            LookupRecord.objects, "bulk_update", side_effect=bulk_update
+        ) as mock_bulk:
+            results = UploadService.batch_lookup(self.upload, workers=3)
+
+        self.assertEqual(
+            results, {"success": 4, "not_found": 1, "failed": 0, "pending": 0}
+        )
+        self.assertEqual(mock_bulk.call_count, 3)
+        self.assertTrue(all(name.startswith("lookup") for name in lookup_threads))
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.status, "completed")
+        self.assertEqual(self.upload.processed_rows, 5)
+        record = LookupRecord.objects.get(upc="000000000001")
+        self.assertEqual(
+            (record.product_title, record.attempts), ("Widget 000000000001", 1)
+        )
+        self.assertIsNotNone(record.fetched_at)
+
+    @patch("inventory.services.fetch_product_page")
+    def test_threaded_batch_publishes_leases_from_calling_thread(self, mock_fetch):
+        from inventory.models import LookupLease
+
+        mock_fetch.side_effect = lambda upc, **kwargs: product_page(f"Widget {upc}")
+        results = UploadService.batch_lookup(self.upload, workers=3)
+
+        self.assertEqual(results["success"], 5)
+        leases = LookupLease.objects.order_by("upc")
+        self.assertEqual(
+            [(lease.upc, lease.product_title) for lease in leases],
+            [(upc, f"Widget {upc}") for upc in self.UPCS],
+        )
+        self.assertTrue(all(lease.finished_at for lease in leases))
+
+    @patch("inventory.services.fetch_product_page")
+    def test_threaded_batch_waits_for_lease_held_elsewhere(self, mock_fetch):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from inventory.models import LookupLease
+
+        now = timezone.now()
+        LookupLease.objects.create(
+            upc=self.UPCS[0], started_at=now, expires_at=now + timedelta(minutes=1)
+        )
+
+        def holder_finishes(seconds):
+            LookupLease.objects.filter(upc=self.UPCS[0]).update(
+                finished_at=timezone.now(), product_title="Shared", status="success"
+            )
+
+        mock_fetch.side_effect = lambda upc, **kwargs: product_page(f"Widget {upc}")
+        with patch("inventory.coalescing.time.sleep", side_effect=holder_finishes):
+            results = UploadService.batch_lookup(self.upload, workers=2)
+
+        self.assertEqual(results["success"], 5)
+        self.assertEqual(mock_fetch.call_count, 4)
+        record = LookupRecord.objects.get(upc=self.UPCS[0])
+        self.assertEqual(record.product_title, "Shared")
+
+    @patch("inventory.services.fetch_product_page")
+    def test_threaded_batch_leaves_rest_pending_at_deadline(self, mock_fetch):
+        from inventory.models import LookupLease
+
+        mock_fetch.return_value = product_page("Widget")
+        results = UploadService.batch_lookup(self.upload, deadline=0, workers=2)
+
+        self.assertEqual(results["pending"], 5)
+        mock_fetch.assert_not_called()
+        # Unused leases are dropped for other workers to take.
+        self.assertFalse(LookupLease.objects.exists())
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.status, "pending_lookups")
+
+    @override_settings(LOOKUP_TASK_THREADS=4)
+    @patch("inventory.services.UploadService.batch_lookup", return_value={})
+    def test_lookup_task_uses_configured_threads(self, mock_batch):
+        from inventory.tasks import lookup_batch_task
+
+        lookup_batch_task.call(str(self.upload.id))
+        self.assertEqual(mock_batch.call_args.args[4], 4)
+
+    @patch("inventory.management.commands.titles.fetch_product_title_sync")
+    def test_titles_command_workers_keep_file_order(self, mock_fetch):
+        from django.core.management import call_command
+
+        mock_fetch.side_effect = lambda upc, **kwargs: f"Widget {upc}"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            Path(temp_dir, "test.csv").write_text("\n".join(self.UPCS) + "\n")
+            out = io.StringIO()
+            call_command("titles", temp_dir, "--workers", "3", stdout=out)
+
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            [f"{upc}: Widget {upc}" for upc in self.UPCS],
+        )
+
+
+# ── lookup list ─────────────────────────────────────────────────────
+
+
+class LookupListTests(TestCase):
+    """The lookup list pages with a keyset cursor and a cached count."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="pass")
+        self.client.login(username="tester", password="pass")
+        upload = CSVUpload.objects.create(user=self.user, filename="test.csv")
+        LookupRecord.objects.bulk_create(
+            LookupRecord(csv_upload=upload, upc=f"{i:012d}", status="success")
+            for i in range(30)
+        )
+
+    def _upcs(self, resp):
+        return [record.upc for record in resp.context["table"].data]
+
+    def test_keyset_pages_cover_all_records_newest_first(self):
+        first = self.client.get("/lookups/")
+        self.assertEqual(len(self._upcs(first)), 25)
+        self.assertEqual(self._upcs(first)[0], f"{29:012d}")
+
+        cursor = first.context["next_cursor"]
+        second = self.client.get("/lookups/", {"cursor": cursor})
+        self.assertEqual(self._upcs(second), [f"{i:012d}" for i in range(4, -1, -1)])
+        self.assertIsNone(second.context["next_cursor"])
+
+    def test_count_is_cached(self):
+        resp = self.client.get("/lookups/")
+        self.assertEqual(resp.context["lookup_count"], 30)
+        LookupRecord.objects.filter(upc=f"{0:012d}").delete()
+        resp = self.client.get("/lookups/")
+        self.assertEqual(resp.context["lookup_count"], 30)
+
+    def test_malformed_cursor_shows_first_page(self):
+        resp = self.client.get("/lookups/", {"cursor": "garbage"})
+        self.assertEqual(self._upcs(resp)[0], f"{29:012d}")
+
+    def test_sorted_list_uses_lazy_pages(self):
+        resp = self.client.get("/lookups/", {"sort": "upc", "page": 2})
+        rows = resp.context["table"].page.object_list
+        self.assertEqual(
+            [row.record.upc for row in rows], [f"{i:012d}" for i in range(25, 30)]
+        )
+
+    def test_list_spans_uploads_newest_first(self):
+        later = CSVUpload.objects.create(user=self.user, filename="later.csv")
+        LookupRecord.objects.create(csv_upload=later, upc="999999999999")
+        other = User.objects.create_user(username="other", password="x")
+        theirs = CSVUpload.objects.create(user=other, filename="theirs.csv")
+        LookupRecord.objects.create(csv_upload=theirs, upc="888888888888")
+
+        resp = self.client.get("/lookups/")
+        self.assertEqual(self._upcs(resp)[:2], ["999999999999", f"{29:012d}"])
+        self.assertNotIn("888888888888", self._upcs(resp))
+
+    def test_records_carry_upload_owner(self):
+        upload = CSVUpload.objects.create(
+            user=self.user, filename="more.csv", file=make_uploaded_csv()
+        )
+        UploadService.process_upload(upload)
+        copy = CSVUpload.objects.create(user=self.user, filename="copy.csv")
+        UploadService.copy_results(upload, copy)
+
+        self.assertFalse(LookupRecord.objects.exclude(user=self.user).exists())
+        self.assertEqual(
+            LookupRecord.objects.filter(csv_upload__in=[upload, copy]).count(), 6
+        )
+
+    def test_list_loads_only_displayed_columns(self):
+        resp = self.client.get("/lookups/")
+        record = resp.context["table"].data[0]
+        self.assertIn("raw_response", record.get_deferred_fields())
+
+
+# ── query plans ─────────────────────────────────────────────────────
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN guards for the hot lookup queries.
+
+    On PostgreSQL the plans must use the dedicated indexes. SQLite cannot
+    match partial indexes against bound parameters, so there the pending
+    queue is only guarded against full scans and sorts. SQLite also ignores
+    INCLUDE columns, so whether the list index covers the list query is
+    checked against the model instead of the plan.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass")
+        self.upload = CSVUpload.objects.create(user=self.user, filename="test.csv")
+        LookupRecord.objects.bulk_create(
+            LookupRecord(
+                csv_upload=self.upload,
+                upc=f"{i:012d}",
+                status="pending" if i % 10 == 0 else "success",
+            )
+            for i in range(200)
+        )
+
+    def _plan(self, queryset):
+        if connection.vendor == "postgresql":
+            # Tiny fixtures make sequential scans look cheapest.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def _assert_pending_plan(self, plan):
+        if connection.vendor == "postgresql":
+            self.assertIn("lookup_pending_idx", plan)
+        else:
+            self.assertNotIn("SCAN inventory_lookuprecord", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_pending_lookups_use_pending_index(self):
+        self._assert_pending_plan(
+            self._plan(self.upload.lookups.filter(status="pending"))
+        )
+
+    def test_scheduler_claim_uses_pending_index(self):
+        from django.utils import timezone
+
+        from inventory.scheduling import FairShareScheduler
+
+        scheduler = FairShareScheduler(slice_size=5, max_in_flight=5, weights={})
+        queryset = LookupRecord.objects.filter(
+            scheduler._claimable(timezone.now()), csv_upload=self.upload
+        ).order_by("created_at")[:5]
+        self._assert_pending_plan(self._plan(queryset))
+
+    def _lookup_list_queryset(self):
+        from inventory.views import LookupListView
+
+        view = LookupListView()
+        view.request = type("Request", (), {"user": self.user})()
+        return view.get_queryset().order_by("-created_at", "-pk")
+
+    def test_lookup_list_pages_from_index_without_sorting(self):
+        plan = self._plan(self._lookup_list_queryset()[:25])
+        if connection.vendor == "postgresql":
+            self.assertIn("Index Only Scan using lookup_list_idx", plan)
+            self.assertNotIn("Sort", plan)
+        else:
+            self.assertIn("USING INDEX lookup_list_idx", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_lookup_list_index_covers_selected_columns(self):
+        index = next(
+            index
+            for index in LookupRecord._meta.indexes
+            if index.name == "lookup_list_idx"
+        )
+        covered = {field.lstrip("-") for field in index.fields} | set(index.include)
+        select, _, _ = (
+            self._lookup_list_queryset()
+            .query.get_compiler(using="default")
+            .get_select()
+        )
+        selected = {
+            column.target.name
+            for column, _, _ in select
+            if column.target.model is LookupRecord
+        }
+        self.assertLessEqual(selected, covered)
+
+
+# ── exports ─────────────────────────────────────────────────────────
+
+
+@override_settings(EXPORT_BATCH_SIZE=2)
+class ExportTests(TestCase):
+    """Streamed exports in every format, per upload and across uploads."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass")
+        self.client.login(username="tester", password="pass")
+        self.upload = CSVUpload.objects.create(
+            user=self.user, filename="first.csv", status="completed"
+        )
+        for upc, title in [("111", "Widget"), ("222", None), ("333", "Gadget")]:
+            LookupRecord.objects.create(
+                csv_upload=self.upload,
+                upc=upc,
+                status="success" if title else "not_found",
+                product_title=title,
+            )
+        self.second = CSVUpload.objects.create(
+            user=self.user, filename="second.csv", status="completed"
+        )
+        LookupRecord.objects.create(
+            csv_upload=self.second, upc="444", status="failed", error_message="boom"
+        )
+        other = User.objects.create_user(username="other", password="x")
+        self.foreign = CSVUpload.objects.create(
+            user=other, filename="foreign.csv", status="completed"
+        )
+        LookupRecord.objects.create(csv_upload=self.foreign, upc="999")
+
+    def download(self, url, **params):
+        resp = self.client.get(url, params)
+        self.assertEqual(resp.status_code, 200)
+        return resp, b"".join(resp.streaming_content)
+
+    def test_csv_is_streamed_in_batches(self):
+        chunks = list(UploadService.export_upload(self.upload, "csv"))
+        self.assertEqual(len(chunks), 2)
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+        self.assertEqual(
+            rows,
+            [
+                ["upc", "product_title", "status", "error_message"],
+                ["111", "Widget", "success", ""],
+                ["222", "", "not_found", ""],
+                ["333", "Gadget", "success", ""],
+            ],
+        )
+
+    def test_empty_csv_still_has_header(self):
+        self.upload.lookups.all().delete()
+        output = UploadService.export_to_csv(self.upload)
+        self.assertEqual(
+            output.getvalue(), b"upc,product_title,status,error_message\r\n"
+        )
+
+    def test_gzip_csv_matches_plain_csv(self):
+        import gzip
+
+        resp, body = self.download(
+            f"/uploads/{self.upload.pk}/export/", format="csv.gz"
+        )
+        self.assertEqual(resp["Content-Type"], "application/gzip")
+        self.assertIn('filename="first.csv_export.csv.gz"', resp["Content-Disposition"])
+        plain = UploadService.export_to_csv(self.upload).getvalue()
+        self.assertEqual(gzip.decompress(body), plain)
+
+    def test_jsonl_keeps_missing_titles_as_null(self):
+        import json
+
+        resp, body = self.download(f"/uploads/{self.upload.pk}/export/", format="jsonl")
+        self.assertEqual(resp["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(
+            rows[1],
+            {
+                "upc": "222",
+                "product_title": None,
+                "status": "not_found",
+                "error_message": "",
+            },
+        )
+
+    def test_parquet_has_one_row_group_per_batch(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+
+        resp, body = self.download(
+            f"/uploads/{self.upload.pk}/export/", format="parquet"
+        )
+        self.assertIn(
+            'filename="first.csv_export.parquet"', resp["Content-Disposition"]
+        )
+        parquet = pq.ParquetFile(io.BytesIO(body))
+        self.assertEqual(parquet.metadata.num_row_groups, 2)
+        table = parquet.read()
+        self.assertEqual(table.column("upc").to_pylist(), ["111", "222", "333"])
+        self.assertEqual(table.column("product_title")[1].as_py(), None)
+
+    def test_parquet_without_pyarrow_shows_an_error(self):
+        with patch.dict("sys.modules", {"pyarrow": None}):
+            resp = self.client.get(
+                f"/uploads/{self.upload.pk}/export/", {"format": "parquet"}, follow=True
+            )
+        self.assertRedirects(resp, f"/uploads/{self.upload.pk}/")
+        self.assertContains(resp, "requires pyarrow")
+
+    def test_unknown_format_redirects(self):
+        resp = self.client.get(f"/uploads/{self.upload.pk}/export/", {"format": "xml"})
+        self.assertRedirects(resp, f"/uploads/{self.upload.pk}/")
+
+    def test_other_users_upload_is_not_exported(self):
+        resp = self.client.get(f"/uploads/{self.foreign.pk}/export/")
+        self.assertEqual(resp.status_code, 404)
+
+    def test_user_export_spans_own_uploads_only(self):
+        resp, body = self.download("/lookups/export/")
+        self.assertIn('filename="lookups_export.csv"', resp["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        self.assertEqual(
+            [(row["upc"], row["filename"]) for row in rows],
+            [
+                ("111", "first.csv"),
+                ("222", "first.csv"),
+                ("333", "first.csv"),
+                ("444", "second.csv"),
+            ],
+        )
+        self.assertEqual(rows[3]["error_message"], "boom")
+
+    def test_user_export_unknown_format_redirects(self):
+        resp = self.client.get("/lookups/export/", {"format": "xml"})
+        self.assertRedirects(resp, "/lookups/")
+
+
 # ── view integration ────────────────────────────────────────────────
 
 
@@ -230,6 +1683,29 @@ class ViewIntegrationTests(TestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(CSVUpload.objects.count(), before + 1)
 
+    def test_metrics_endpoint_disabled_by_default(self):
+        resp = self.client.get("/metrics")
+        self.assertEqual(resp.status_code, 404)
+
+    @patch("inventory.services.fetch_product_page")
+    def test_metrics_endpoint_exposes_db_write_stage(self, mock_fetch):
+        mock_fetch.return_value = product_page("Widget")
+        LookupRecord.objects.create(
+            csv_upload=self.upload, upc="071710276009", status="pending"
+        )
+        metrics.REGISTRY.reset()
+        metrics.enable()
+        self.addCleanup(metrics.disable)
+
+        UploadService.batch_lookup(self.upload)
+        resp = self.client.get("/metrics")
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(
+            'csv_upc_omg_lookup_stage_seconds_count{stage="db_write"} 1',
+            resp.content.decode(),
+        )
+
     def test_auth_required_for_all_views(self):
         """All inventory views require authentication."""
         for path in ["/", "/uploads/", "/uploads/create/", "/lookups/"]:
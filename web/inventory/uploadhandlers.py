@@ -0,0 +1,148 @@
+"""Upload handlers that fingerprint and parse CSV files as they are received."""
+
+import csv
+import hashlib
+import tempfile
+from collections.abc import Iterable, Iterator
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+
+from csv_upc_omg.csv_utils import IncrementalUPCParser
+
+
+class HashingMixin:
+    """Compute a SHA-256 of the upload while the chunks stream in.
+
+    The digest is attached to the resulting file object as ``content_hash`` so
+    callers never need to re-read the file to fingerprint it.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # Set up before super(), which may raise StopFutureHandlers.
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        result = super().receive_data_chunk(raw_data, start)
+        # A handler that passes the chunk along has not claimed the file;
+        # only the handler that keeps the data should hash it.
+        if result is None:
+            self.hasher.update(raw_data)
+        return result
+
+    def file_complete(self, file_size):
+        file_obj = super().file_complete(file_size)
+        if file_obj is not None:
+            file_obj.content_hash = self.hasher.hexdigest()
+        return file_obj
+
+
+class HashingMemoryFileUploadHandler(HashingMixin, MemoryFileUploadHandler):
+    """In-memory upload handler that records a content hash."""
+
+
+class HashingTemporaryFileUploadHandler(HashingMixin, TemporaryFileUploadHandler):
+    """Temporary-file upload handler that records a content hash."""
+
+
+class SpooledUPCs:
+    """UPCs written one per line to a temporary file, read back in order.
+
+    The file stays in memory up to FILE_UPLOAD_MAX_MEMORY_SIZE and moves to
+    disk beyond that, so a large upload's UPCs never sit in a list. It is
+    deleted once closed or garbage-collected.
+    """
+
+    def __init__(self) -> None:
+        self._file = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE, mode="w+", encoding="utf-8"
+        )
+
+    def extend(self, upcs: Iterable[str]) -> None:
+        self._file.writelines(f"{upc}\n" for upc in upcs)
+
+    def __iter__(self) -> Iterator[str]:
+        self._file.seek(0)
+        return (line.rstrip("\n") for line in self._file)
+
+    def save(self, name: str) -> str:
+        """Store the UPCs in the default storage as ``name`` and close the spool.
+
+        Returns the name actually used, for :func:`stored_upcs`.
+        """
+        try:
+            self._file.seek(0)
+            return default_storage.save(name, File(self._file))
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def stored_upcs(name: str) -> Iterator[str]:
+    """Read back UPCs stored by :meth:`SpooledUPCs.save`, in order."""
+    with default_storage.open(name, "r") as stored:
+        for line in stored:
+            yield line.rstrip("\n")
+
+
+class ParsingMixin:
+    """Extract UPCs from a CSV upload while the chunks stream in.
+
+    The UPCs are attached to the file object as ``upcs``, spooled by
+    :class:`SpooledUPCs`, so records can be created without reading the
+    file back from disk. Non-CSV or undecodable uploads get ``upcs = None``
+    and are parsed from disk as before, which reports the error.
+    """
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        # Set up before super(), which may raise StopFutureHandlers.
+        self.parser = None
+        self.upcs = None
+        if file_name.lower().endswith(".csv"):
+            self.parser = IncrementalUPCParser()
+            self.upcs = SpooledUPCs()
+        super().new_file(field_name, file_name, *args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        result = super().receive_data_chunk(raw_data, start)
+        if result is None and self.parser is not None:
+            try:
+                self.upcs.extend(self.parser.feed(raw_data))
+            except (UnicodeDecodeError, csv.Error):
+                self.parser = None
+                self.upcs.close()
+        return result
+
+    def file_complete(self, file_size):
+        file_obj = super().file_complete(file_size)
+        if file_obj is None:
+            return None
+        file_obj.upcs = None
+        if self.parser is not None:
+            try:
+                self.upcs.extend(self.parser.close())
+            except (UnicodeDecodeError, csv.Error):
+                self.upcs.close()
+                return file_obj
+            file_obj.upcs = self.upcs
+        return file_obj
+
+
+class StreamingMemoryFileUploadHandler(
+    ParsingMixin, HashingMixin, MemoryFileUploadHandler
+):
+    """In-memory upload handler that records a content hash and parses UPCs."""
+
+
+class StreamingTemporaryFileUploadHandler(
+    ParsingMixin, HashingMixin, TemporaryFileUploadHandler
+):
+    """Temporary-file upload handler that records a content hash and parses UPCs."""
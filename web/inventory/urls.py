@@ -15,4 +15,6 @@ urlpatterns = [
         name="upload-export",
     ),
     path("lookups/", views.LookupListView.as_view(), name="lookup-list"),
+    path("lookups/export/", views.export_lookups, name="lookup-export"),
+    path("metrics", views.metrics, name="metrics"),
 ]
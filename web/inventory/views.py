@@ -3,17 +3,22 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, DetailView
 from django_tables2 import SingleTableView
+from django_tables2.paginators import LazyPaginator
 
+from csv_upc_omg import metrics as lookup_metrics
+
+from .exports import FORMATS, ExportError
 from .forms import UploadForm
 from .models import CSVUpload, LookupRecord
+from .pagination import keyset_page
 from .services import UploadService
 from .tables import LookupTable, UploadTable
-from .tasks import lookup_batch_task, process_csv_task
+from .tasks import enqueue_upload
 
 
 @login_required
@@ -22,6 +27,16 @@ def dashboard(request):
     return render(request, "dashboard/index.html", {"stats": stats})
 
 
+def metrics(request):
+    """Serve lookup metrics in the Prometheus text exposition format."""
+    if not lookup_metrics.is_enabled():
+        raise Http404("Metrics are disabled.")
+    return HttpResponse(
+        lookup_metrics.REGISTRY.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 class UploadListView(LoginRequiredMixin, SingleTableView):
     model = CSVUpload
     template_name = "uploads/list.html"
@@ -40,19 +55,32 @@ class UploadCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.user = self.request.user
+        form.instance.content_hash = UploadService.compute_content_hash(
+            form.cleaned_data["file"]
+        )
 
+        upcs = getattr(form.cleaned_data["file"], "upcs", None)
         try:
             response = super().form_valid(form)
 
-            process_csv_task.enqueue(upload_id=str(self.object.id))
-            lookup_batch_task.enqueue(upload_id=str(self.object.id))
+            if UploadService.reuse_duplicate_results(self.object):
+                messages.success(
+                    self.request,
+                    "Identical CSV already processed; reused previous results.",
+                )
+                return response
 
-            messages.success(self.request, "CSV processed and lookups completed!")
+            enqueue_upload(self.object, upcs=upcs)
+
+            messages.success(self.request, "CSV uploaded and queued for lookups.")
             return response
         except Exception as e:
             messages.error(self.request, f"Processing failed: {e}")
             context = self.get_context_data(form=form)
             return self.render_to_response(context)
+        finally:
+            if upcs is not None:
+                upcs.close()
 
 
 class UploadDetailView(LoginRequiredMixin, DetailView):
@@ -68,10 +96,25 @@ class UploadDetailView(LoginRequiredMixin, DetailView):
         return context
 
 
+def export_response(chunks, filename: str, fmt: str) -> StreamingHttpResponse:
+    """Stream an export as a download named ``filename`` plus the extension."""
+    export_format = FORMATS[fmt]
+    response = StreamingHttpResponse(chunks, content_type=export_format.content_type)
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{export_format.extension}"'
+    )
+    return response
+
+
 class UploadExportView(LoginRequiredMixin, DetailView):
+    """Download an upload's lookups; ``?format=`` picks one of FORMATS."""
+
     model = CSVUpload
     template_name = "uploads/export.html"
 
+    def get_queryset(self):
+        return CSVUpload.objects.filter(user=self.request.user)
+
     def get(self, request, *args, **kwargs):
         upload = self.get_object()
 
@@ -79,24 +122,72 @@ class UploadExportView(LoginRequiredMixin, DetailView):
             messages.error(request, "Upload must be completed before exporting.")
             return redirect("upload-detail", pk=upload.id)
 
+        fmt = request.GET.get("format", "csv")
         try:
-            csv_file = UploadService.export_to_csv(upload)
-            response = HttpResponse(csv_file.getvalue(), content_type="text/csv")
-            response["Content-Disposition"] = (
-                f'attachment; filename="{upload.filename}_export.csv"'
-            )
-            return response
-        except Exception as e:
+            chunks = UploadService.export_upload(upload, fmt)
+        except ExportError as e:
             messages.error(request, f"Export failed: {e}")
             return redirect("upload-detail", pk=upload.id)
+        return export_response(chunks, f"{upload.filename}_export", fmt)
+
+
+@login_required
+def export_lookups(request):
+    """Download all of the user's lookups across uploads, in ``?format=``."""
+    fmt = request.GET.get("format", "csv")
+    try:
+        chunks = UploadService.export_user_lookups(request.user, fmt)
+    except ExportError as e:
+        messages.error(request, f"Export failed: {e}")
+        return redirect("lookup-list")
+    return export_response(chunks, "lookups_export", fmt)
 
 
 class LookupListView(LoginRequiredMixin, SingleTableView):
+    """A user's lookups, newest first.
+
+    The default ordering is paged with a keyset cursor along lookup_list_idx
+    and the total is a cached count, so any page, first or deep, reads only
+    its own rows however many records the user has across their uploads.
+    Sorting by another column falls back to page numbers, without a COUNT(*).
+    """
+
     model = LookupRecord
     template_name = "lookups/list.html"
     table_class = LookupTable
+    table_pagination = {"per_page": 25, "paginator_class": LazyPaginator}
 
     def get_queryset(self):
-        return LookupRecord.objects.filter(
-            csv_upload__user=self.request.user
-        ).select_related("csv_upload")
+        return (
+            LookupRecord.objects.filter(user=self.request.user)
+            .select_related("csv_upload")
+            .only(
+                *LookupTable.Meta.fields, "csv_upload__filename", "csv_upload__status"
+            )
+        )
+
+    @property
+    def uses_keyset(self):
+        return "sort" not in self.request.GET
+
+    def get_table_data(self):
+        if not self.uses_keyset:
+            return super().get_table_data()
+        self.keyset = keyset_page(
+            self.get_queryset(),
+            self.request.GET.get("cursor"),
+            self.table_pagination["per_page"],
+        )
+        return self.keyset.rows
+
+    def get_table_pagination(self, table):
+        if self.uses_keyset:
+            return False
+        return super().get_table_pagination(table)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["lookup_count"] = UploadService.get_lookup_count(self.request.user)
+        if self.uses_keyset:
+            context["next_cursor"] = self.keyset.next_cursor
+        return context